@@ -0,0 +1,282 @@
+import argparse
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_rule_parser import write_synthetic_rules
+from concurrent_checker import DEFAULT_MAX_WORKERS, DEFAULT_MAX_PER_HOST
+
+# Perfis de host do simulador local. Cada host é um endereço de loopback próprio (127.<10+perfil>.0.<n>),
+# de forma que o limite de concorrência por host do script funcione como com hosts reais (Linux).
+PROFILES = ('fast', 'slow', 'hanging', 'refused', 'redirect_loop', 'unavailable')
+DEFAULT_MIX = {'fast': 70, 'slow': 10, 'hanging': 2, 'refused': 6, 'redirect_loop': 6, 'unavailable': 6}
+DEFAULT_HOSTS_PER_PROFILE = 8
+DEFAULT_SLOW_DELAY = 0.5   # Atraso (s) dos hosts lentos
+HANG_SECONDS = 3600        # Hosts "hanging" aceitam a conexão e nunca respondem
+
+FAST_BODY = b'<html><head><title>Simulador</title></head><body>ok</body></html>'
+UNAVAILABLE_BODY = b'<html><head><title>503 Service Unavailable</title></head><body>indisponivel</body></html>'
+
+# Endereço de loopback do host n de um perfil
+def profile_address(profile, host_index):
+    return f"127.{10 + PROFILES.index(profile)}.0.{host_index + 1}"
+
+# Handler do simulador: o comportamento depende do perfil do servidor que recebeu a conexão
+class _SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body):
+        profile = self.server.profile
+        if profile == 'hanging':
+            time.sleep(HANG_SECONDS)
+            return
+        if profile == 'slow':
+            time.sleep(self.server.slow_delay)
+
+        if profile == 'redirect_loop':
+            status, headers, body = 302, {'Location': self.path}, b''
+        elif profile == 'unavailable':
+            status, headers, body = 503, {'Content-Type': 'text/html', 'Retry-After': '30'}, UNAVAILABLE_BODY
+        else:
+            status, headers, body = 200, {'Content-Type': 'text/html'}, FAST_BODY
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+# Servidor HTTPS de um host do simulador. O handshake TLS acontece na thread da conexão,
+# para que um cliente lento não bloqueie o accept dos demais.
+class _SimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, profile, ssl_context, slow_delay):
+        super().__init__(address, _SimulatorHandler)
+        self.profile = profile
+        self.ssl_context = ssl_context
+        self.slow_delay = slow_delay
+
+    def finish_request(self, request, client_address):
+        request = self.ssl_context.wrap_socket(request, server_side=True)
+        super().finish_request(request, client_address)
+
+    def handle_error(self, request, client_address):
+        pass  # Conexões encerradas pelo cliente (timeouts) são esperadas
+
+# Processo do simulador: sobe um servidor por host (exceto os "refused", sem nada escutando)
+def _serve(addresses, port, cert_path, key_path, slow_delay, ready):
+    ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ssl_context.load_cert_chain(cert_path, key_path)
+    for profile, profile_addresses in addresses.items():
+        if profile == 'refused':
+            continue
+        for address in profile_addresses:
+            server = _SimulatorServer((address, port), profile, ssl_context, slow_delay)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+    ready.set()
+    threading.Event().wait()
+
+# Gera um certificado autoassinado válido para todos os endereços do simulador (requer o openssl)
+def generate_certificate(work_dir, addresses):
+    if shutil.which('openssl') is None:
+        raise RuntimeError("O openssl é necessário para gerar o certificado do simulador HTTPS.")
+    cert_path = os.path.join(work_dir, 'simulator_cert.pem')
+    key_path = os.path.join(work_dir, 'simulator_key.pem')
+    subject_alt_names = ','.join(f"IP:{address}" for address in addresses)
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1', '-nodes',
+         '-keyout', key_path, '-out', cert_path, '-days', '1', '-subj', '/CN=bench-simulator',
+         '-addext', f"subjectAltName={subject_alt_names}"],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return cert_path, key_path
+
+# Escolhe uma porta livre no primeiro endereço do simulador
+def _free_port(address):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((address, 0))
+        return sock.getsockname()[1]
+
+# Simulador local de HTTPS com hosts rápidos, lentos, travados, recusando conexões,
+# em loop de redirecionamento e devolvendo 503. Roda em um processo separado.
+class Simulator:
+    def __init__(self, work_dir, hosts_per_profile=DEFAULT_HOSTS_PER_PROFILE, slow_delay=DEFAULT_SLOW_DELAY):
+        self.work_dir = work_dir
+        self.slow_delay = slow_delay
+        self.addresses = {profile: [profile_address(profile, n) for n in range(hosts_per_profile)] for profile in PROFILES}
+        self.port = None
+        self.cert_path = None
+        self._process = None
+
+    def start(self):
+        all_addresses = [address for addresses in self.addresses.values() for address in addresses]
+        self.cert_path, key_path = generate_certificate(self.work_dir, all_addresses)
+        self.port = _free_port(self.addresses['fast'][0])
+        ctx = multiprocessing.get_context('spawn')
+        ready = ctx.Event()
+        self._process = ctx.Process(target=_serve, args=(self.addresses, self.port, self.cert_path, key_path, self.slow_delay, ready), daemon=True)
+        self._process.start()
+        if not ready.wait(30):
+            self.stop()
+            raise RuntimeError("O simulador não iniciou a tempo.")
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    # Sequência determinística de perfis (embaralhada) com as proporções de mix
+    def profile_sequence(self, mix, seed=0):
+        sequence = [profile for profile, weight in mix.items() for _ in range(weight)]
+        random.Random(seed).shuffle(sequence)
+        return sequence
+
+    # reference:url (sem esquema) da URL i, no host do perfil sorteado
+    def url_for(self, i, sequence):
+        profile = sequence[i % len(sequence)]
+        addresses = self.addresses[profile]
+        return f"{addresses[i % len(addresses)]}:{self.port}/{profile}/{i}"
+
+# Prepara o processo da carga: nível de log e sessão HTTP compartilhada confiando no certificado do simulador.
+# As variáveis de CA do ambiente são removidas porque o requests as prioriza sobre session.verify.
+def _prepare_worker(cert_path, log_level):
+    importlib.import_module('suricata_url_checker')  # Configura o logging do script antes de ajustar o nível
+    from http_session import configure_http_session
+    logging.getLogger().setLevel(log_level)
+    for name in ('REQUESTS_CA_BUNDLE', 'CURL_CA_BUNDLE'):
+        os.environ.pop(name, None)
+    configure_http_session(verify=cert_path)
+
+def _peak_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# Carga "checker": verifica URLs diretamente com o motor concorrente. Roda em um processo novo.
+def run_checker_workload(urls, cert_path, checker, max_workers, max_per_host, log_level):
+    _prepare_worker(cert_path, log_level)
+    import suricata_url_checker as app
+    from concurrent_checker import check_urls_concurrently
+    from tiered_checker import TieredChecker, as_check_result
+
+    check_func = TieredChecker(app.status_descriptions) if checker == 'tiered' else app.check_url_with_requests
+    statuses = Counter()
+    start = time.perf_counter()
+    for _url, result in check_urls_concurrently(urls, check_func, max_workers, max_per_host):
+        statuses[str(as_check_result(result).status_code)] += 1
+    wall = time.perf_counter() - start
+    return {'urls': len(urls), 'wall_seconds': wall, 'peak_rss_mib': _peak_rss_mib(), 'statuses': dict(statuses)}
+
+# Carga "pipeline": roda process_all_rules_files em um diretório com regras sintéticas. Roda em um processo novo.
+def run_pipeline_workload(work_dir, cert_path, max_workers, max_per_host, log_level):
+    _prepare_worker(cert_path, log_level)
+    os.chdir(work_dir)
+    import suricata_url_checker as app
+
+    start = time.perf_counter()
+    app.process_all_rules_files(debug_mode=False, max_workers=max_workers, max_per_host=max_per_host,
+                                result_cache_path='url_results.sqlite3', only_changed=False)
+    wall = time.perf_counter() - start
+    with open('run_metrics.json') as f:
+        summary = json.load(f)
+    return {'urls': summary['urls_checked'] + summary['skipped'].get('dns', 0), 'wall_seconds': wall,
+            'peak_rss_mib': _peak_rss_mib(), 'errors': summary['errors_by_class']}
+
+# Executa uma carga em um processo novo (spawn), para que o pico de RSS seja só dessa carga
+def run_isolated(func, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(func, *args).result()
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        profile, _, weight = item.partition('=')
+        if profile not in PROFILES:
+            raise argparse.ArgumentTypeError(f"Perfil desconhecido: {profile} (use {', '.join(PROFILES)})")
+        mix[profile] = int(weight)
+    return mix
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de throughput da verificação de URLs contra um simulador HTTPS local.")
+    parser.add_argument('--mode', choices=('checker', 'pipeline'), default='pipeline',
+                        help="checker: motor concorrente direto; pipeline: process_all_rules_files com regras sintéticas")
+    parser.add_argument('--rules', type=int, nargs='+', default=[1000, 10000], help="Quantidades de regras (pipeline) ou URLs (checker), de 1000 a 100000")
+    parser.add_argument('--checker', choices=('requests', 'tiered'), default='requests', help="Função de verificação no modo checker")
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help="Proporção de cada perfil, ex.: fast=90,slow=5,hanging=0,refused=5")
+    parser.add_argument('--hosts-per-profile', type=int, default=DEFAULT_HOSTS_PER_PROFILE)
+    parser.add_argument('--slow-delay', type=float, default=DEFAULT_SLOW_DELAY)
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument('--max-per-host', type=int, default=DEFAULT_MAX_PER_HOST)
+    parser.add_argument('--log-level', default='CRITICAL', help="Nível de log do script durante as cargas (ex.: INFO)")
+    parser.add_argument('--output', help="Grava os resultados em JSON (baseline para comparar mudanças de desempenho)")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='bench_checker_') as tmp_dir:
+        with Simulator(tmp_dir, args.hosts_per_profile, args.slow_delay) as simulator:
+            sequence = simulator.profile_sequence(args.mix)
+            print(f"Simulador em https://127.x.0.n:{simulator.port} ({args.hosts_per_profile} hosts por perfil, mix {args.mix})")
+            print(f"{'modo':<10} {'regras':>8} {'URLs':>8} {'tempo (s)':>10} {'URLs/s':>10} {'pico RSS (MiB)':>15}")
+
+            for count in args.rules:
+                if args.mode == 'checker':
+                    urls = [f"https://{simulator.url_for(i, sequence)}" for i in range(count)]
+                    result = run_isolated(run_checker_workload, urls, simulator.cert_path, args.checker, args.max_workers, args.max_per_host, args.log_level.upper())
+                else:
+                    work_dir = os.path.join(tmp_dir, f"pipeline_{count}")
+                    os.makedirs(os.path.join(work_dir, 'rules'))
+                    # Duas regras por URL, como nas regras tls + ip de rules_old/pornografia_old.rules
+                    write_synthetic_rules(os.path.join(work_dir, 'rules', 'synthetic.rules'), count,
+                                          url_for=lambda i: simulator.url_for(i // 2, sequence))
+                    result = run_isolated(run_pipeline_workload, work_dir, simulator.cert_path, args.max_workers, args.max_per_host, args.log_level.upper())
+
+                result.update({'mode': args.mode, 'rules': count, 'mix': args.mix,
+                               'urls_per_second': result['urls'] / result['wall_seconds'] if result['wall_seconds'] else 0.0})
+                results.append(result)
+                print(f"{args.mode:<10} {count:>8} {result['urls']:>8} {result['wall_seconds']:>10.2f} "
+                      f"{result['urls_per_second']:>10.1f} {result['peak_rss_mib']:>15.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Resultados gravados em {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rule_parser import iter_rules
+
+# Modelos de regra no mesmo formato de rules_old/pornografia_old.rules
+RULE_TEMPLATES = [
+    'alert tls any any -> any any (msg:"{host}"; tls_sni; content:"{host}"; pcre:"/{host}$/"; flow:to_server,established; sid:{sid}; classtype:policy-violation; rev:1; reference:url,{url};)',
+    'alert ip any any -> [10.{a}.{b}.1,10.{a}.{b}.2] any (msg:"{host}"; flow:to_server,established; threshold: type limit, track by_src, seconds 20, count 1; sid:{sid}; classtype:policy-violation; gid:26; rev:1; reference:url,{url};)',
+    'alert tls any any -> [!172.67.{a}.{b},!104.21.{a}.{b}] any (msg:"{host} \\; escaped"; tls_sni; content:"img.{host}"; pcre:"/img\\.{host}$/"; flow:to_server,established; sid:{sid}; classtype:policy-violation; gid:27; rev:2; reference:url,{url};)',
+]
+
+# Função para gerar um arquivo .rules sintético com a quantidade de regras pedida.
+# url_for(i) define o reference:url da regra i (por padrão, o próprio host da regra).
+def write_synthetic_rules(path, count, first_sid=9900000, url_for=None):
+    with open(path, 'w') as f_out:
+        for i in range(count):
+            template = RULE_TEMPLATES[i % len(RULE_TEMPLATES)]
+            host = f"site{i}.example.com"
+            url = url_for(i) if url_for else host
+            f_out.write(template.format(host=host, url=url, sid=first_sid + i, a=(i >> 8) % 256, b=i % 256) + "\n")
+
+# Extração legada: readlines + regex de reference:url e sid
+def legacy_parse(path):
+    url_pattern = re.compile(r'reference:url,([^;]+);')
+    sid_pattern = re.compile(r'sid:(\d+);')
+    count = 0
+    with open(path, 'r') as f_in:
+        for rule in f_in.readlines():
+            if url_pattern.search(rule) and sid_pattern.search(rule):
+                count += 1
+    return count
+
+def streaming_parse(path):
+    return sum(1 for _ in iter_rules(path))
+
+# Mede o tempo de uma função de parsing e, em uma segunda passada, o pico de memória (tracemalloc)
+def measure(func, path):
+    start = time.perf_counter()
+    count = func(path)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de throughput do parser de regras Suricata.")
+    parser.add_argument('--rules', type=int, nargs='+', default=[1000, 10000, 50000], help="Quantidades de regras a gerar")
+    parser.add_argument('--file', help="Usa um arquivo .rules existente em vez de gerar regras sintéticas")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench_rules_') as tmp_dir:
+        if args.file:
+            paths = [args.file]
+        else:
+            paths = []
+            for count in args.rules:
+                path = os.path.join(tmp_dir, f"synthetic_{count}.rules")
+                write_synthetic_rules(path, count)
+                paths.append(path)
+
+        print(f"{'arquivo':<28} {'parser':<10} {'regras':>8} {'tempo (s)':>10} {'regras/s':>12} {'pico mem (KiB)':>15}")
+        for path in paths:
+            for name, func in (('legado', legacy_parse), ('streaming', streaming_parse)):
+                count, elapsed, peak = measure(func, path)
+                rate = count / elapsed if elapsed else float('inf')
+                print(f"{os.path.basename(path):<28} {name:<10} {count:>8} {elapsed:>10.3f} {rate:>12.0f} {peak / 1024:>15.1f}")
+
+if __name__ == '__main__':
+    main()
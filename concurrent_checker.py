@@ -0,0 +1,61 @@
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+
+# Limites padrão de paralelismo das verificações
+DEFAULT_MAX_WORKERS = 20   # Máximo de verificações simultâneas no total
+DEFAULT_MAX_PER_HOST = 4   # Máximo de verificações simultâneas no mesmo host
+
+# Função para obter o host de uma URL (usado como chave do limite por host)
+def url_host(url):
+    return (urlsplit(url).hostname or url).lower()
+
+# Função auxiliar que executa a verificação e converte exceções em resultado de erro
+def _run_check(check_func, url):
+    try:
+        return check_func(url)
+    except Exception as e:
+        logging.error(f"Erro inesperado ao verificar URL: {url}, Erro: {e}")
+        return "Erro", str(e)
+
+# Função para verificar várias URLs em paralelo, respeitando um limite global e um limite por host.
+# Gera tuplas (url, resultado) à medida que as verificações terminam.
+def check_urls_concurrently(urls, check_func, max_workers=DEFAULT_MAX_WORKERS, max_per_host=DEFAULT_MAX_PER_HOST):
+    max_workers = max(1, int(max_workers))
+    max_per_host = max(1, int(max_per_host))
+
+    # Fila de URLs pendentes por host, preservando a ordem de chegada
+    pending = {}
+    for url in urls:
+        pending.setdefault(url_host(url), deque()).append(url)
+
+    if not pending:
+        return
+
+    hosts = deque(pending)  # Rodízio entre hosts para não concentrar a carga em um só
+    active = {host: 0 for host in pending}
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while hosts or in_flight:
+            # Submete novas verificações enquanto houver vaga global e algum host abaixo do limite
+            skipped = 0
+            while hosts and len(in_flight) < max_workers and skipped < len(hosts):
+                host = hosts[0]
+                hosts.rotate(-1)
+                if active[host] >= max_per_host:
+                    skipped += 1
+                    continue
+                skipped = 0
+                url = pending[host].popleft()
+                if not pending[host]:
+                    hosts.remove(host)
+                active[host] += 1
+                in_flight[executor.submit(_run_check, check_func, url)] = (host, url)
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                host, url = in_flight.pop(future)
+                active[host] -= 1
+                yield url, future.result()
@@ -0,0 +1,107 @@
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Configurações padrão da pré-resolução de DNS
+DEFAULT_DNS_TTL = 300           # Segundos que uma resposta positiva fica em cache
+DEFAULT_NEGATIVE_TTL = 60       # Segundos que uma falha definitiva (NXDOMAIN) fica em cache
+DEFAULT_DNS_WORKERS = 50        # Resoluções simultâneas
+
+# Status gravado nos resultados para hosts que não resolvem
+UNRESOLVED_STATUS = "DNS"
+UNRESOLVED_DESCRIPTION = "Nome de domínio não resolvido (NXDOMAIN)"
+
+# Erros do getaddrinfo que indicam que o nome não existe (não são falhas temporárias)
+_NOT_FOUND_ERRORS = {socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)}
+
+# Exceção levantada por um resolvedor quando o nome não existe
+class HostNotFound(Exception):
+    pass
+
+# Resolvedor padrão, usando o DNS do sistema operacional
+def system_resolver(host):
+    try:
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except socket.gaierror as e:
+        if e.errno in _NOT_FOUND_ERRORS:
+            raise HostNotFound(host) from e
+        raise
+    return sorted({info[4][0] for info in infos})
+
+# Resolvedor estático, útil para testes: mapeia host -> lista de IPs.
+# Hosts ausentes do mapeamento são tratados como NXDOMAIN.
+class StaticResolver:
+    def __init__(self, mapping):
+        self.mapping = {host.lower(): list(addresses) for host, addresses in mapping.items()}
+
+    def __call__(self, host):
+        addresses = self.mapping.get(host.lower())
+        if not addresses:
+            raise HostNotFound(host)
+        return addresses
+
+# Cache de respostas DNS com TTL. O resolvedor é plugável: qualquer função host -> [IPs]
+# que levante HostNotFound para nomes inexistentes.
+class DnsCache:
+    def __init__(self, resolver=None, ttl=DEFAULT_DNS_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.resolver = resolver or system_resolver
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = {}  # host -> (lista de IPs ou None se NXDOMAIN, instante de expiração)
+        self.resolve_seconds = {}  # host -> duração (s) da última resolução real, usada nas métricas
+        self._lock = threading.Lock()
+
+    # Retorna a entrada em cache (lista de IPs ou None) ou levanta KeyError se ausente/expirada
+    def cached(self, host):
+        host = host.lower()
+        with self._lock:
+            addresses, expires_at = self._entries[host]
+            if expires_at < time.monotonic():
+                del self._entries[host]
+                raise KeyError(host)
+            return addresses
+
+    # Resolve o host usando o cache. Retorna a lista de IPs, None se o nome não existe,
+    # ou uma lista vazia se a resolução falhou por um motivo temporário (não é cacheado).
+    def lookup(self, host):
+        host = host.lower()
+        try:
+            return self.cached(host)
+        except KeyError:
+            pass
+
+        start = time.perf_counter()
+        try:
+            addresses = list(self.resolver(host))
+            ttl = self.ttl
+        except HostNotFound:
+            addresses = None
+            ttl = self.negative_ttl
+        except (OSError, UnicodeError) as e:
+            logging.warning(f"Falha temporária ao resolver {host}: {e}")
+            return []
+
+        with self._lock:
+            self.resolve_seconds[host] = time.perf_counter() - start
+            self._entries[host] = (addresses, time.monotonic() + ttl)
+        return addresses
+
+    # Indica se o host já foi resolvido e não existe
+    def is_unresolvable(self, host):
+        return self.lookup(host) is None
+
+# Função para resolver vários hosts em paralelo e popular o cache.
+# Retorna o conjunto de hosts que não resolvem.
+def prefetch_hosts(hosts, dns_cache, max_workers=DEFAULT_DNS_WORKERS):
+    hosts = {host.lower() for host in hosts if host}
+    if not hosts:
+        return set()
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        answers = dict(zip(hosts, executor.map(dns_cache.lookup, hosts)))
+
+    unresolvable = {host for host, addresses in answers.items() if addresses is None}
+    logging.info(f"Pré-resolução de DNS: {len(hosts)} hosts, {len(unresolvable)} não resolvidos.")
+    return unresolvable
@@ -0,0 +1,270 @@
+import ipaddress
+import logging
+import random
+import threading
+import time
+
+import requests
+
+from concurrent_checker import url_host
+from http_session import probe_url, DEFAULT_TIMEOUT
+
+# Configurações padrão de timeouts adaptativos, retentativas e circuit breaker
+DEFAULT_MIN_TIMEOUT = 1.0          # Menor timeout (s) aplicado a um host rápido
+DEFAULT_MAX_TIMEOUT = DEFAULT_TIMEOUT
+DEFAULT_MAX_RETRIES = 1            # Retentativas por URL, apenas para erros transitórios
+DEFAULT_RETRY_RATIO = 0.2          # Retentativas permitidas por tentativa (20%)
+DEFAULT_MIN_RETRIES = 10           # Retentativas sempre permitidas, mesmo no início da execução
+DEFAULT_RETRY_BACKOFF = 0.5        # Espera (s) antes da primeira retentativa, dobrada a cada nova tentativa
+DEFAULT_FAILURE_THRESHOLD = 5      # Falhas consecutivas no domínio que abrem o circuito
+DEFAULT_CIRCUIT_RESET = 60         # Tempo (s) com o circuito aberto até uma sondagem de recuperação
+
+# Status gravado para URLs não verificadas porque o circuito do domínio está aberto
+CIRCUIT_OPEN_STATUS = "Circuito"
+
+# Sufixos públicos de dois níveis mais comuns nas regras (sem depender da Public Suffix List)
+MULTI_LABEL_SUFFIXES = {
+    'com.br', 'net.br', 'org.br', 'gov.br', 'edu.br', 'art.br', 'blog.br', 'jus.br', 'mil.br', 'tv.br',
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'com.au', 'net.au', 'org.au', 'co.jp', 'ne.jp', 'or.jp',
+    'com.mx', 'com.ar', 'com.co', 'com.pt', 'co.in', 'co.nz', 'co.za', 'com.cn', 'com.tr', 'com.es',
+}
+
+# Exceção levantada quando o circuito do domínio está aberto e a URL não é verificada
+class CircuitOpenError(Exception):
+    def __init__(self, domain, failures):
+        super().__init__(f"Circuito aberto para {domain} após {failures} falhas consecutivas")
+        self.domain = domain
+        self.failures = failures
+
+# Função para obter o domínio registrado de um host (ex.: sdb.amazonaws.com -> amazonaws.com,
+# www1.nfe.fazenda.gov.br -> fazenda.gov.br). Endereços IP são o próprio domínio.
+def registered_domain(host):
+    host = host.lower().rstrip('.')
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+    labels = host.split('.')
+    if len(labels) >= 3 and '.'.join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+# Cadeia de causas de uma exceção do requests (MaxRetryError.reason, __cause__, __context__)
+def _error_chain(error):
+    seen = []
+    stack = [error]
+    while stack:
+        current = stack.pop()
+        if current is None or any(current is item for item in seen):
+            continue
+        seen.append(current)
+        stack.extend([getattr(current, 'reason', None), current.__cause__, current.__context__])
+        stack.extend(arg for arg in getattr(current, 'args', ()) if isinstance(arg, BaseException))
+    return seen
+
+# Indica se o erro é transitório e vale uma retentativa: falha de conexão por timeout,
+# conexão resetada/abortada ou resposta interrompida. Conexão recusada, nome inexistente,
+# erro de certificado, read timeout (host travado) e loop de redirecionamento não são retentados.
+def is_transient_error(error):
+    if isinstance(error, (requests.exceptions.SSLError, requests.exceptions.ReadTimeout, requests.exceptions.TooManyRedirects)):
+        return False
+    if isinstance(error, (requests.exceptions.ConnectTimeout, requests.exceptions.ChunkedEncodingError)):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError):
+        chain = _error_chain(error)
+        if any(isinstance(item, ConnectionRefusedError) or 'NameResolution' in type(item).__name__ for item in chain):
+            return False
+        return True
+    return False
+
+# Indica se o erro conta como falha do domínio no circuit breaker (o host não respondeu)
+def is_host_failure(error):
+    if isinstance(error, (requests.exceptions.SSLError, requests.exceptions.TooManyRedirects)):
+        return False
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+# Timeouts adaptativos por host, no estilo do RTO do TCP: média móvel da latência observada
+# mais quatro vezes o desvio, limitada a [min_timeout, max_timeout]. Hosts sem histórico usam o
+# histórico do domínio registrado e, sem ele, max_timeout. Cada timeout dobra o próximo timeout do host.
+class AdaptiveTimeouts:
+    def __init__(self, min_timeout=DEFAULT_MIN_TIMEOUT, max_timeout=DEFAULT_MAX_TIMEOUT, alpha=0.125, beta=0.25):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.alpha = alpha
+        self.beta = beta
+        self._stats = {}    # host ou domínio -> [latência média, desvio médio]
+        self._backoff = {}  # host -> multiplicador após timeouts
+        self._lock = threading.Lock()
+
+    def timeout_for(self, host):
+        with self._lock:
+            stats = self._stats.get(host) or self._stats.get(registered_domain(host))
+            backoff = self._backoff.get(host, 1)
+        if stats is None:
+            return self.max_timeout
+        srtt, rttvar = stats
+        return min(self.max_timeout, max(self.min_timeout, srtt + 4 * rttvar) * backoff)
+
+    def observe(self, host, seconds):
+        with self._lock:
+            self._backoff.pop(host, None)
+            for key in (host, registered_domain(host)):
+                stats = self._stats.get(key)
+                if stats is None:
+                    self._stats[key] = [seconds, seconds / 2]
+                else:
+                    stats[1] = (1 - self.beta) * stats[1] + self.beta * abs(stats[0] - seconds)
+                    stats[0] = (1 - self.alpha) * stats[0] + self.alpha * seconds
+
+    def observe_timeout(self, host):
+        with self._lock:
+            self._backoff[host] = min(self._backoff.get(host, 1) * 2, 8)
+
+# Orçamento de retentativas da execução: no máximo ratio retentativas por tentativa, além de min_retries.
+# Evita que uma onda de falhas multiplique a carga com retentativas.
+class RetryBudget:
+    def __init__(self, ratio=DEFAULT_RETRY_RATIO, min_retries=DEFAULT_MIN_RETRIES):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.attempts = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def record_attempt(self):
+        with self._lock:
+            self.attempts += 1
+
+    def try_spend(self):
+        with self._lock:
+            if self.retries >= self.min_retries + self.ratio * self.attempts:
+                return False
+            self.retries += 1
+            return True
+
+# Circuit breaker por domínio registrado: após failure_threshold falhas consecutivas o circuito abre e
+# as URLs do domínio recebem CIRCUIT_OPEN_STATUS sem requisição. Depois de reset_timeout segundos,
+# uma única sondagem (meio aberto) é liberada: sucesso fecha o circuito, falha o mantém aberto.
+class CircuitBreaker:
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_CIRCUIT_RESET):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self._failures = {}     # domínio -> falhas consecutivas
+        self._opened_at = {}    # domínio -> instante em que o circuito abriu
+        self._probing = set()   # domínios com sondagem de recuperação em andamento
+        self._lock = threading.Lock()
+
+    # Levanta CircuitOpenError se o domínio estiver bloqueado; libera a sondagem de recuperação quando for a hora
+    def before_call(self, domain):
+        with self._lock:
+            opened_at = self._opened_at.get(domain)
+            if opened_at is None:
+                return
+            if domain not in self._probing and time.monotonic() - opened_at >= self.reset_timeout:
+                self._probing.add(domain)
+                logging.info(f"Circuito de {domain} meio aberto: sondando recuperação.")
+                return
+            raise CircuitOpenError(domain, self._failures.get(domain, 0))
+
+    def record_success(self, domain):
+        with self._lock:
+            if domain in self._opened_at:
+                logging.info(f"Circuito de {domain} fechado: o domínio voltou a responder.")
+            self._failures.pop(domain, None)
+            self._opened_at.pop(domain, None)
+            self._probing.discard(domain)
+
+    def record_failure(self, domain):
+        with self._lock:
+            failures = self._failures.get(domain, 0) + 1
+            self._failures[domain] = failures
+            if domain in self._probing or (domain not in self._opened_at and failures >= self.failure_threshold):
+                if domain not in self._probing:
+                    logging.warning(f"Circuito de {domain} aberto após {failures} falhas consecutivas.")
+                self._opened_at[domain] = time.monotonic()
+                self._probing.discard(domain)
+
+    # Libera a sondagem de recuperação interrompida por um erro inesperado ou inconclusivo
+    def release_probe(self, domain):
+        with self._lock:
+            self._probing.discard(domain)
+
+    def is_open(self, domain):
+        with self._lock:
+            return domain in self._opened_at
+
+# Proteção das sondagens HTTP por host: timeout adaptativo, retentativas limitadas pelo orçamento
+# apenas para erros transitórios e circuit breaker por domínio registrado.
+class HostGuard:
+    def __init__(self, timeouts=None, retry_budget=None, breaker=None, max_retries=DEFAULT_MAX_RETRIES, retry_backoff=DEFAULT_RETRY_BACKOFF):
+        self.timeouts = timeouts or AdaptiveTimeouts()
+        self.retry_budget = retry_budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max(0, int(max_retries))
+        self.retry_backoff = retry_backoff
+
+    # Sonda a URL como probe_url (mesmos argumentos, exceto timeout). Levanta CircuitOpenError
+    # se o circuito do domínio estiver aberto, ou o último erro do requests após as retentativas.
+    def probe(self, url, **probe_kwargs):
+        host = url_host(url)
+        domain = registered_domain(host)
+        attempt = 0
+        while True:
+            self.breaker.before_call(domain)
+            self.retry_budget.record_attempt()
+            timeout = self.timeouts.timeout_for(host)
+            start = time.perf_counter()
+            try:
+                probe = probe_url(url, timeout=timeout, **probe_kwargs)
+            except requests.exceptions.RequestException as e:
+                if isinstance(e, requests.exceptions.Timeout):
+                    self.timeouts.observe_timeout(host)
+                # Read timeout abaixo do timeout máximo pode ser só o timeout adaptativo curto demais (ex.:
+                # estimado por um host irmão mais rápido do mesmo domínio): vale uma retentativa e não conta
+                # como falha do domínio no circuit breaker
+                shortened = isinstance(e, requests.exceptions.ReadTimeout) and timeout < self.timeouts.max_timeout
+                if shortened:
+                    self.breaker.release_probe(domain)
+                elif is_host_failure(e):
+                    self.breaker.record_failure(domain)
+                else:
+                    self.breaker.record_success(domain)
+                transient = is_transient_error(e) or shortened
+                if attempt >= self.max_retries or not transient or not self.retry_budget.try_spend():
+                    raise
+                attempt += 1
+                delay = self.retry_backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                logging.info(f"Retentativa {attempt} de {url} em {delay:.1f}s após erro transitório: {type(e).__name__}")
+                time.sleep(delay)
+                continue
+            except Exception:
+                self.breaker.release_probe(domain)
+                raise
+
+            self.timeouts.observe(host, time.perf_counter() - start)
+            self.breaker.record_success(domain)
+            return probe
+
+_guard = None
+_guard_lock = threading.Lock()
+
+# Função para (re)configurar a proteção compartilhada por todas as verificações de uma execução
+def configure_host_guard(min_timeout=DEFAULT_MIN_TIMEOUT, max_timeout=DEFAULT_MAX_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES, retry_ratio=DEFAULT_RETRY_RATIO, failure_threshold=DEFAULT_FAILURE_THRESHOLD, circuit_reset=DEFAULT_CIRCUIT_RESET):
+    global _guard
+    with _guard_lock:
+        _guard = HostGuard(
+            AdaptiveTimeouts(min_timeout, max_timeout),
+            RetryBudget(retry_ratio),
+            CircuitBreaker(failure_threshold, circuit_reset),
+            max_retries,
+        )
+        return _guard
+
+# Função para obter a proteção compartilhada, criando-a com os valores padrão na primeira chamada
+def get_host_guard():
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                _guard = HostGuard()
+    return _guard
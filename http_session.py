@@ -0,0 +1,185 @@
+import threading
+import time
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from run_metrics import record_phase
+
+# Configurações padrão da sessão HTTP compartilhada
+DEFAULT_TIMEOUT = 5
+DEFAULT_POOL_CONNECTIONS = 100  # Quantidade de hosts com conexões mantidas em cache
+DEFAULT_POOL_MAXSIZE = 10       # Conexões keep-alive mantidas por host
+MAX_REDIRECTS = 10
+DEFAULT_SAMPLE_BYTES = 64 * 1024  # Limite do trecho do corpo lido quando a sondagem pede uma amostra
+DEFAULT_DRAIN_BYTES = 64 * 1024   # Restante do corpo lido para devolver a conexão ao pool; acima disso ela é fechada
+
+# Códigos de redirecionamento seguidos manualmente para registrar a cadeia
+REDIRECT_CODES = {301, 302, 303, 307, 308}
+
+_session = None
+_session_lock = threading.Lock()
+
+# Resultado de uma sondagem HTTP: status final, URL final, cabeçalhos, cadeia de redirecionamentos
+# e, quando pedida, uma amostra limitada do corpo
+class ProbeResult:
+    __slots__ = ('status_code', 'url', 'headers', 'method', 'redirects', 'body')
+
+    def __init__(self, status_code, url, headers, method, redirects, body=b''):
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers
+        self.method = method
+        self.redirects = redirects  # Lista de (código, URL) de cada salto antes da resposta final
+        self.body = body            # Primeiros bytes do corpo (vazio se a amostra não foi pedida)
+
+    # Amostra do corpo decodificada como texto, substituindo bytes inválidos
+    @property
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+# Conexões que medem o tempo de conexão TCP (incluindo a resolução feita pelo urllib3) e do handshake TLS.
+# Os tempos vão para a verificação em andamento na thread (run_metrics); conexões reaproveitadas não medem nada.
+class _TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        self._connect_seconds = time.perf_counter() - start
+        record_phase('connect', self._connect_seconds)
+        return sock
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        self._connect_seconds = time.perf_counter() - start
+        record_phase('connect', self._connect_seconds)
+        return sock
+
+    def connect(self):
+        self._connect_seconds = None
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            # Só mede o TLS se a conexão TCP foi estabelecida
+            if self._connect_seconds is not None:
+                record_phase('tls', max(0.0, time.perf_counter() - start - self._connect_seconds))
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+# Adaptador que usa os pools de conexões com medição de tempo
+class TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _TimedHTTPConnectionPool, 'https': _TimedHTTPSConnectionPool}
+
+# Função para criar uma sessão com pool de conexões keep-alive
+def create_http_session(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE, verify=True):
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.verify = verify
+    return session
+
+# Função para (re)configurar a sessão compartilhada usada por todas as verificações
+def configure_http_session(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE, verify=True):
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = create_http_session(pool_connections, pool_maxsize, verify)
+        return _session
+
+# Função para obter a sessão compartilhada, criando-a na primeira chamada
+def get_http_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_http_session()
+    return _session
+
+# Função para liberar a conexão de uma resposta em streaming. Fechar a resposta com o corpo ainda
+# não lido derruba o socket; por isso lê (sem descompactar) e descarta até max_bytes do restante e,
+# se o corpo acabou, devolve a conexão ao pool para ser reutilizada (keep-alive). Corpos maiores que
+# max_bytes fecham a conexão, para não baixar páginas grandes inteiras.
+def _release_connection(response, max_bytes=DEFAULT_DRAIN_BYTES):
+    raw = response.raw
+    drained = 0
+    try:
+        while drained <= max_bytes:
+            chunk = raw.read(8192, decode_content=False)
+            if not chunk:
+                raw.release_conn()
+                return
+            drained += len(chunk)
+    except Exception:
+        pass
+    response.close()
+
+# Faz uma única requisição sem seguir redirecionamentos e sem baixar o corpo (no GET, o restante do
+# corpo é descartado até o limite de _release_connection)
+def _request_headers_only(session, method, url, timeout):
+    response = session.request(method, url, timeout=timeout, allow_redirects=False, stream=(method == 'GET'))
+    record_phase('ttfb', response.elapsed.total_seconds())
+    if method == 'GET':
+        _release_connection(response)
+    else:
+        response.close()  # HEAD não tem corpo; a conexão já volta ao pool
+    return response
+
+# Faz um GET sem seguir redirecionamentos e lê no máximo max_bytes do corpo (já descompactado)
+def _request_sample(session, url, timeout, max_bytes):
+    response = session.get(url, timeout=timeout, allow_redirects=False, stream=True)
+    record_phase('ttfb', response.elapsed.total_seconds())
+    try:
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=8192):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                break
+        return response, b''.join(chunks)[:max_bytes]
+    finally:
+        _release_connection(response)
+
+# Função para sondar uma URL: tenta HEAD e, se o servidor não responder bem a HEAD,
+# repete com GET em modo streaming, lendo apenas os cabeçalhos.
+# Com sample_bytes, faz direto um GET e guarda no máximo sample_bytes do corpo em ProbeResult.body.
+# Redirecionamentos são seguidos manualmente e registrados em ProbeResult.redirects.
+def probe_url(url, timeout=DEFAULT_TIMEOUT, session=None, max_redirects=MAX_REDIRECTS, sample_bytes=0):
+    session = session or get_http_session()
+    redirects = []
+    current_url = url
+
+    while True:
+        body = b''
+        if sample_bytes:
+            method = 'GET'
+            response, body = _request_sample(session, current_url, timeout, sample_bytes)
+        else:
+            method = 'HEAD'
+            response = _request_headers_only(session, method, current_url, timeout)
+            # Muitos servidores respondem 4xx/5xx apenas para HEAD; nesses casos confirma com GET
+            if response.status_code >= 400:
+                method = 'GET'
+                response = _request_headers_only(session, method, current_url, timeout)
+
+        location = response.headers.get('Location')
+        if response.status_code not in REDIRECT_CODES or not location:
+            return ProbeResult(response.status_code, current_url, response.headers, method, redirects, body)
+
+        redirects.append((response.status_code, current_url))
+        if len(redirects) > max_redirects:
+            raise requests.exceptions.TooManyRedirects(f"Excedido o limite de {max_redirects} redirecionamentos.", response=response)
+        current_url = urljoin(current_url, location)
@@ -0,0 +1,215 @@
+import ipaddress
+import logging
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+from concurrent_checker import url_host
+from dns_prefetch import prefetch_hosts
+from rule_parser import iter_rules
+
+# Configurações padrão da verificação das listas de IPs das regras
+DEFAULT_PROBE_PORTS = (443, 80)
+DEFAULT_CONNECT_TIMEOUT = 3      # Segundos por tentativa de conexão TCP
+DEFAULT_PROBE_WORKERS = 100      # Conexões simultâneas
+DEFAULT_REPORT_PATH = 'ip_rules_report.txt'
+
+# Códigos gravados no relatório para cada IP de uma regra
+IP_OK = "OK"                    # Responde em alguma porta e pertence ao host de referência
+IP_DEAD = "Morto"               # Não aceita conexão em nenhuma das portas
+IP_FOREIGN = "Fora do DNS"      # Responde, mas não está nas respostas DNS atuais do host de referência
+IP_NO_DNS = "Sem DNS"           # O host de referência não resolve; não há com o que comparar
+IP_NO_REFERENCE = "Sem referência"  # Regra sem reference:url; apenas a conexão foi verificada
+DNS_DRIFT = "DNS novo"          # O host resolve para IPs que a lista da regra não cobre
+
+# Regra com lista de IPs de destino, reduzida ao necessário para a verificação
+class IpRule:
+    __slots__ = ('sid', 'gid', 'path', 'hosts', 'addresses', 'negated')
+
+    def __init__(self, sid, gid, path, hosts, addresses, negated):
+        self.sid = sid
+        self.gid = gid
+        self.path = path
+        self.hosts = hosts          # Hosts das referências url da regra
+        self.addresses = addresses  # IPs/redes positivos (ip_address ou ip_network)
+        self.negated = negated      # IPs/redes negados (!)
+
+# Resultado da conexão TCP a um IP
+class IpProbe:
+    __slots__ = ('address', 'open_port', 'refused', 'error')
+
+    def __init__(self, address, open_port=None, refused=(), error=None):
+        self.address = address
+        self.open_port = open_port  # Primeira porta que aceitou a conexão, ou None
+        self.refused = refused      # Portas que recusaram a conexão (o IP existe, mas sem o serviço)
+        self.error = error          # Último erro (timeout, rede inalcançável...)
+
+    @property
+    def alive(self):
+        return self.open_port is not None
+
+# Linha do relatório: veredito de um IP (ou do DNS) de uma regra
+class IpFinding:
+    __slots__ = ('sid', 'gid', 'path', 'address', 'negated', 'host', 'status', 'description')
+
+    def __init__(self, sid, gid, path, address, negated, host, status, description):
+        self.sid = sid
+        self.gid = gid
+        self.path = path
+        self.address = address
+        self.negated = negated
+        self.host = host
+        self.status = status
+        self.description = description
+
+    def __str__(self):
+        address = f"!{self.address}" if self.negated else str(self.address)
+        return f"SID: {self.sid} - {address} ({self.host or '-'}) - Código: {self.status}, Descrição: {self.description}"
+
+# Converte um endereço da regra em ip_address (IP único ou rede /32, /128) ou ip_network; None se inválido
+def parse_address(value):
+    try:
+        network = ipaddress.ip_network(value, strict=False)
+    except ValueError:
+        return None
+    if network.num_addresses == 1:
+        return network.network_address
+    return network
+
+# Gerador das regras com lista de IPs de destino dos arquivos .rules (leitura em streaming)
+def iter_ip_rules(paths):
+    for path in paths:
+        for rule in iter_rules(path):
+            if not rule.dst_ips and not rule.dst_ips_negated:
+                continue
+            addresses = []
+            negated = []
+            for values, parsed in ((rule.dst_ips, addresses), (rule.dst_ips_negated, negated)):
+                for value in values:
+                    address = parse_address(value)
+                    if address is None:
+                        logging.warning(f"Endereço ignorado na regra {rule.sid} ({path}): {value}")
+                    else:
+                        parsed.append(address)
+            hosts = tuple(sorted({url_host(url) for url in rule.urls}))
+            yield IpRule(rule.sid, rule.gid, path, hosts, tuple(addresses), tuple(negated))
+
+# Função para testar um IP com conexões TCP nas portas, na ordem, parando na primeira que aceitar
+def probe_tcp(address, ports=DEFAULT_PROBE_PORTS, timeout=DEFAULT_CONNECT_TIMEOUT):
+    refused = []
+    error = None
+    for port in ports:
+        try:
+            with socket.create_connection((str(address), port), timeout=timeout):
+                return IpProbe(address, port, tuple(refused))
+        except ConnectionRefusedError:
+            refused.append(port)
+        except OSError as e:
+            error = str(e) or type(e).__name__
+    return IpProbe(address, None, tuple(refused), error)
+
+# Função para testar vários IPs em paralelo. Retorna o dicionário IP -> IpProbe
+def probe_addresses(addresses, ports=DEFAULT_PROBE_PORTS, timeout=DEFAULT_CONNECT_TIMEOUT, max_workers=DEFAULT_PROBE_WORKERS):
+    addresses = sorted(set(addresses), key=lambda address: (address.version, address))
+    if not addresses:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        probes = dict(zip(addresses, executor.map(lambda address: probe_tcp(address, ports, timeout), addresses)))
+    alive = sum(1 for probe in probes.values() if probe.alive)
+    logging.info(f"Conexões TCP em {'/'.join(map(str, ports))}: {len(probes)} IPs, {alive} responderam.")
+    return probes
+
+# Hosts consultados no DNS para uma regra: os das referências e a variante www, já que as listas de
+# IPs costumam incluir os endereços do site com e sem www
+def _dns_names(hosts):
+    names = set(hosts)
+    names.update(f"www.{host}" for host in hosts if not host.startswith('www.'))
+    return sorted(names)
+
+# Respostas DNS atuais (ip_address) dos hosts, ou None se nenhum deles resolve
+def _dns_answers(hosts, dns_cache):
+    answers = set()
+    resolved = False
+    for name in _dns_names(hosts):
+        addresses = dns_cache.lookup(name)
+        if addresses:
+            resolved = True
+            answers.update(ipaddress.ip_address(address) for address in addresses)
+    return answers if resolved else None
+
+# Veredito de um endereço (IP ou rede) da regra a partir da conexão TCP e das respostas DNS
+def _address_verdict(address, probe, answers, has_hosts, ports):
+    ports_text = '/'.join(map(str, ports))
+    if isinstance(address, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+        if answers is None:
+            return IP_NO_DNS if has_hosts else IP_NO_REFERENCE, f"rede com {address.num_addresses} endereços, não testada"
+        inside = sorted(str(answer) for answer in answers if answer in address)
+        if inside:
+            return IP_OK, f"rede contém {', '.join(inside)}"
+        return IP_FOREIGN, "nenhuma resposta DNS do host está na rede"
+
+    if not probe.alive:
+        if probe.refused and len(probe.refused) == len(ports):
+            return IP_DEAD, f"conexão recusada em {ports_text}"
+        return IP_DEAD, f"sem resposta em {ports_text} ({probe.error or 'conexão recusada'})"
+    if not has_hosts:
+        return IP_NO_REFERENCE, f"responde na porta {probe.open_port}"
+    if answers is None:
+        return IP_NO_DNS, f"responde na porta {probe.open_port}, mas o host de referência não resolve"
+    if address in answers:
+        return IP_OK, f"responde na porta {probe.open_port} e está no DNS"
+    return IP_FOREIGN, f"responde na porta {probe.open_port}, mas o DNS do host responde {', '.join(sorted(map(str, answers)))}"
+
+# Função para verificar as listas de IPs das regras: testa cada IP único com conexões TCP (em paralelo) e
+# compara com as respostas DNS atuais dos hosts de referência da regra. Redes maiores que um endereço não
+# são testadas, apenas comparadas com o DNS. Retorna a lista de IpFinding, na ordem das regras.
+def check_ip_rules(paths, dns_cache, ports=DEFAULT_PROBE_PORTS, timeout=DEFAULT_CONNECT_TIMEOUT, max_workers=DEFAULT_PROBE_WORKERS):
+    rules = list(iter_ip_rules(paths))
+    single_addresses = {
+        address for rule in rules for address in rule.addresses + rule.negated
+        if isinstance(address, (ipaddress.IPv4Address, ipaddress.IPv6Address))
+    }
+    hosts = {name for rule in rules for name in _dns_names(rule.hosts)}
+    logging.info(f"Regras com lista de IPs: {len(rules)}, {len(single_addresses)} IPs únicos, {len(hosts)} hosts de referência.")
+
+    # DNS sempre consultado de novo (sem respostas antigas em cache) e conexões em paralelo
+    prefetch_hosts(hosts, dns_cache)
+    probes = probe_addresses(single_addresses, ports, timeout, max_workers)
+
+    findings = []
+    for rule in rules:
+        host = ', '.join(rule.hosts) or None
+        answers = _dns_answers(rule.hosts, dns_cache) if rule.hosts else None
+        for addresses, negated in ((rule.addresses, False), (rule.negated, True)):
+            for address in addresses:
+                status, description = _address_verdict(address, probes.get(address), answers, bool(rule.hosts), ports)
+                findings.append(IpFinding(rule.sid, rule.gid, rule.path, address, negated, host, status, description))
+
+        # IPs do DNS que a lista positiva da regra não cobre (apenas das versões de IP presentes na lista)
+        if answers and rule.addresses:
+            versions = {address.version for address in rule.addresses}
+            uncovered = sorted(
+                (answer for answer in answers
+                 if answer.version in versions and not any(_covers(address, answer) for address in rule.addresses)),
+                key=lambda answer: (answer.version, answer),
+            )
+            if uncovered:
+                findings.append(IpFinding(rule.sid, rule.gid, rule.path, '-', False, host, DNS_DRIFT,
+                                          f"o host resolve para IPs fora da regra: {', '.join(map(str, uncovered))}"))
+    return findings
+
+def _covers(address, answer):
+    if isinstance(address, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+        return answer.version == address.version and answer in address
+    return address == answer
+
+# Função para gravar o relatório: um cabeçalho com a contagem por código e uma linha por IP de cada regra
+def write_ip_report(findings, path=DEFAULT_REPORT_PATH):
+    counts = {}
+    for finding in findings:
+        counts[finding.status] = counts.get(finding.status, 0) + 1
+    with open(path, 'w') as f:
+        f.write("Verificação das listas de IPs das regras: " + ", ".join(f"{status}: {count}" for status, count in sorted(counts.items())) + "\n")
+        for finding in findings:
+            f.write(f"{finding}\n")
+    logging.info(f"Relatório das listas de IPs salvo em {path} ({', '.join(f'{status}: {count}' for status, count in sorted(counts.items()))}).")
+    return counts
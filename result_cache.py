@@ -0,0 +1,196 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Configurações padrão do cache de resultados
+DEFAULT_CACHE_PATH = 'url_results.sqlite3'
+DEFAULT_RESULT_TTL = 24 * 60 * 60  # Segundos até um resultado ser considerado velho
+UNDATED_CHECKED_AT = 0.0           # Data dos resultados legados sem data confiável: sempre velhos, só histórico
+
+# Regex para linhas de resultado no formato legado e para a data dos arquivos processed_urls_YYYYMMDD.txt
+result_line_pattern = re.compile(r'^SID: (\d+) - (\S+) - Código: ([^,]+), Descrição: (.*)$')
+dated_file_pattern = re.compile(r'processed_urls_(\d{8})\.txt$')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    url TEXT PRIMARY KEY,
+    status,
+    description TEXT,
+    checked_at REAL NOT NULL,
+    rules TEXT NOT NULL DEFAULT '{}',
+    tier TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_checked_at ON results(checked_at);
+'''
+
+# Colunas adicionadas depois da primeira versão do cache, criadas em bancos antigos ao abrir
+_ADDED_COLUMNS = {'tier': 'TEXT'}
+
+# Converte o código de status lido de texto para int quando for numérico (ex.: "200" -> 200)
+def _parse_status(status):
+    status = status.strip()
+    return int(status) if status.isdigit() else status
+
+# Resultado armazenado para uma URL
+class CachedResult:
+    __slots__ = ('url', 'status_code', 'description', 'checked_at', 'rules', 'tier')
+
+    def __init__(self, url, status_code, description, checked_at, rules, tier=None):
+        self.url = url
+        self.status_code = status_code
+        self.description = description
+        self.checked_at = checked_at
+        self.rules = rules  # Dicionário SID -> rev das regras que referenciam a URL
+        self.tier = tier    # Camada que deu o veredito (dns, http, browser); None em resultados importados
+
+    @property
+    def sids(self):
+        return sorted(self.rules, key=int)
+
+# Cache local (SQLite) de resultados, indexado pela URL.
+# Uma URL só precisa ser verificada de novo quando o resultado passou do TTL
+# ou quando a revisão (rev) de uma das regras que a referenciam mudou.
+class ResultCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_RESULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(results)')}
+        for column, column_type in _ADDED_COLUMNS.items():
+            if column not in columns:
+                self._conn.execute(f'ALTER TABLE results ADD COLUMN {column} {column_type}')
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    # Retorna o CachedResult da URL ou None
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT url, status, description, checked_at, rules, tier FROM results WHERE url = ?', (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedResult(row[0], row[1], row[2], row[3], json.loads(row[4]), row[5])
+
+    # Percorre todos os resultados do cache
+    def iter_results(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT url, status, description, checked_at, rules, tier FROM results').fetchall()
+        for row in rows:
+            yield CachedResult(row[0], row[1], row[2], row[3], json.loads(row[4]), row[5])
+
+    # Retorna o resultado em cache se ainda for válido para as regras (dicionário SID -> rev); caso contrário, None
+    def get_fresh(self, url, rules=None, now=None):
+        cached = self.get(url)
+        if cached is None or cached.status_code is None:
+            return None
+        if (now or time.time()) - cached.checked_at > self.ttl:
+            return None
+        for sid, rev in (rules or {}).items():
+            cached_rev = cached.rules.get(str(sid))
+            if rev is not None and cached_rev is not None and cached_rev != str(rev):
+                return None
+        return cached
+
+    # Indica se a URL precisa ser verificada novamente
+    def needs_check(self, url, rules=None, now=None):
+        return self.get_fresh(url, rules, now) is None
+
+    # Grava (ou atualiza) o resultado de uma URL. rules é um dicionário SID -> rev
+    def store(self, url, status_code, description, rules=None, checked_at=None, tier=None):
+        self.store_many([(url, status_code, description, rules, checked_at, tier)])
+
+    # Grava vários resultados em uma única transação.
+    # Cada entrada é (url, código, descrição, rules, checked_at, tier)
+    def store_many(self, entries):
+        now = time.time()
+        with self._lock:
+            for url, status_code, description, rules, checked_at, tier in entries:
+                row = self._conn.execute('SELECT rules FROM results WHERE url = ?', (url,)).fetchone()
+                merged = json.loads(row[0]) if row else {}
+                for sid, rev in (rules or {}).items():
+                    # Revisão desconhecida (None) não sobrescreve uma revisão já registrada
+                    if rev is None:
+                        merged.setdefault(str(sid), None)
+                    else:
+                        merged[str(sid)] = str(rev)
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO results (url, status, description, checked_at, rules, tier) VALUES (?, ?, ?, ?, ?, ?)',
+                    (url, status_code, description, now if checked_at is None else checked_at, json.dumps(merged, sort_keys=True), tier),
+                )
+            self._conn.commit()
+
+    # Remove resultados mais antigos que o TTL informado (ou o TTL do cache)
+    def purge_stale(self, older_than=None):
+        limit = time.time() - (older_than if older_than is not None else self.ttl)
+        with self._lock:
+            deleted = self._conn.execute('DELETE FROM results WHERE checked_at < ?', (limit,)).rowcount
+            self._conn.commit()
+        return deleted
+
+# Função para importar os arquivos legados para o cache:
+# - processed_urls_YYYYMMDD.txt (e processed_urls.txt): URLs processadas, com a data do nome do arquivo;
+# - arquivos de resultado (result/*.txt, Navigate_*.txt, Analytics*.txt): status e SID de cada URL.
+# A data de verificação vem do arquivo processed_urls_YYYYMMDD mais recente que contém a URL. Sem data
+# no nome (processed_urls.txt e arquivos de resultado), a URL entra com UNDATED_CHECKED_AT: a data de
+# modificação muda com um clone ou cópia e faria resultados antigos parecerem recentes, então eles
+# ficam apenas como histórico e são verificados de novo. URLs sem status também serão verificadas de novo.
+def import_legacy_files(cache, processed_files=(), result_files=()):
+    processed_at = {}
+    for path in processed_files:
+        if not os.path.exists(path):
+            continue
+        date_match = dated_file_pattern.search(path)
+        if date_match:
+            checked_at = datetime.strptime(date_match.group(1), '%Y%m%d').timestamp()
+        else:
+            checked_at = UNDATED_CHECKED_AT
+        with open(path, 'r') as f:
+            for line in f:
+                url = line.strip()
+                if url:
+                    processed_at[url] = max(processed_at.get(url, 0), checked_at)
+
+    entries = {url: {'status': None, 'description': None, 'checked_at': checked_at, 'rules': {}}
+               for url, checked_at in processed_at.items()}
+
+    for path in result_files:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r') as f:
+            for line in f:
+                match = result_line_pattern.match(line.strip())
+                if not match:
+                    continue
+                sid, url, status, description = match.groups()
+                entry = entries.setdefault(url, {'status': None, 'description': None, 'checked_at': UNDATED_CHECKED_AT, 'rules': {}})
+                entry['status'] = _parse_status(status)
+                entry['description'] = description
+                entry['rules'].setdefault(sid, None)  # O rev da regra não consta nos arquivos de resultado
+
+    cache.store_many(
+        (url, entry['status'], entry['description'], entry['rules'], entry['checked_at'], None)
+        for url, entry in entries.items()
+    )
+    logging.info(f"Importadas {len(entries)} URLs dos arquivos legados para o cache de resultados.")
+    return len(entries)
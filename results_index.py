@@ -0,0 +1,438 @@
+import glob
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from concurrent_checker import url_host
+from host_guard import CIRCUIT_OPEN_STATUS
+from result_cache import result_line_pattern, dated_file_pattern, _parse_status
+from rule_hosts import rule_hosts
+from rule_parser import iter_rules
+
+# Configurações padrão do índice de consulta
+DEFAULT_INDEX_PATH = 'results_index.sqlite3'
+DEFAULT_RULES_DIRS = ('rules', 'rules_navigate')
+DEFAULT_RECORDS_PATH = os.path.join('result', 'results.jsonl')
+DEFAULT_LEGACY_FILES = ('Analytics.txt', 'Analytics_200.txt', 'Navigate_200.txt', 'Navigate_Error.txt')
+DEFAULT_LEGACY_RUN_WINDOW = 600   # Arquivos de texto gravados com até 10 minutos de diferença são da mesma execução
+DEFAULT_HISTORY_RUNS = 30
+DEFAULT_QUERY_LIMIT = 100
+
+# Tipos de arquivo indexados
+KIND_RULES = 'rules'
+KIND_RECORDS = 'records'      # result/results.jsonl (saída canônica)
+KIND_LEGACY = 'legacy'        # result/result_*.txt, Analytics*.txt, Navigate_*.txt
+KIND_PROCESSED = 'processed'  # processed_urls*.txt (apenas a data em que a URL foi verificada)
+
+# Origem de um host de regra
+ORIGIN_REFERENCE = 'reference'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rules (
+    path TEXT NOT NULL,
+    gid INTEGER NOT NULL,
+    sid TEXT NOT NULL,
+    rev TEXT,
+    action TEXT,
+    msg TEXT,
+    classtype TEXT,
+    PRIMARY KEY (path, gid, sid)
+);
+CREATE INDEX IF NOT EXISTS idx_rules_sid ON rules(sid);
+CREATE INDEX IF NOT EXISTS idx_rules_classtype ON rules(classtype);
+CREATE TABLE IF NOT EXISTS rule_targets (
+    path TEXT NOT NULL,
+    gid INTEGER NOT NULL,
+    sid TEXT NOT NULL,
+    host TEXT NOT NULL,
+    url TEXT NOT NULL,
+    origin TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rule_targets_host ON rule_targets(host);
+CREATE INDEX IF NOT EXISTS idx_rule_targets_url ON rule_targets(url);
+CREATE INDEX IF NOT EXISTS idx_rule_targets_rule ON rule_targets(sid, path);
+CREATE TABLE IF NOT EXISTS observations (
+    url TEXT NOT NULL,
+    host TEXT NOT NULL,
+    sid TEXT NOT NULL DEFAULT '',
+    status,
+    description TEXT,
+    checked_at REAL NOT NULL,
+    source_path TEXT,
+    UNIQUE (url, sid, checked_at)
+);
+CREATE INDEX IF NOT EXISTS idx_observations_url ON observations(url, checked_at);
+CREATE TABLE IF NOT EXISTS latest (
+    url TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    status,
+    description TEXT,
+    checked_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_latest_status ON latest(status);
+CREATE INDEX IF NOT EXISTS idx_latest_host ON latest(host);
+CREATE TABLE IF NOT EXISTS flips (
+    url TEXT NOT NULL,
+    host TEXT NOT NULL,
+    old_status,
+    new_status,
+    previous_at REAL NOT NULL,
+    changed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_flips_changed_at ON flips(changed_at);
+CREATE INDEX IF NOT EXISTS idx_flips_host ON flips(host);
+CREATE INDEX IF NOT EXISTS idx_flips_url ON flips(url);
+'''
+
+# Status que não são um veredito sobre a URL e não contam como mudança de status
+_NOT_A_VERDICT = (CIRCUIT_OPEN_STATUS,)
+
+# Regra que referencia um host, com o último resultado da URL
+class RuleMatch:
+    __slots__ = ('sid', 'gid', 'rev', 'path', 'msg', 'classtype', 'host', 'url', 'origin', 'status_code', 'description', 'checked_at')
+
+    def __init__(self, sid, gid, rev, path, msg, classtype, host, url, origin, status_code=None, description=None, checked_at=None):
+        self.sid = sid
+        self.gid = gid
+        self.rev = rev
+        self.path = path
+        self.msg = msg
+        self.classtype = classtype
+        self.host = host
+        self.url = url
+        self.origin = origin            # reference, tls_sni ou pcre
+        self.status_code = status_code  # Último resultado da URL (None se nunca verificada)
+        self.description = description
+        self.checked_at = checked_at
+
+# Verificação de uma URL no histórico
+class Observation:
+    __slots__ = ('url', 'status_code', 'description', 'checked_at', 'sids')
+
+    def __init__(self, url, status_code, description, checked_at, sids):
+        self.url = url
+        self.status_code = status_code
+        self.description = description
+        self.checked_at = checked_at
+        self.sids = sids
+
+# Mudança de status de uma URL entre duas verificações consecutivas
+class StatusFlip:
+    __slots__ = ('url', 'host', 'old_status', 'new_status', 'previous_at', 'changed_at')
+
+    def __init__(self, url, host, old_status, new_status, previous_at, changed_at):
+        self.url = url
+        self.host = host
+        self.old_status = old_status
+        self.new_status = new_status
+        self.previous_at = previous_at
+        self.changed_at = changed_at
+
+# Índice local em SQLite das regras e de todos os resultados já gravados, para consultas por host, SID,
+# classtype e status sem reler os arquivos de texto. A atualização é incremental: só os arquivos com
+# tamanho ou data de modificação diferentes da última indexação são lidos de novo. Cada verificação de
+# uma URL (url, SID, checked_at) entra uma única vez, então o mesmo resultado repetido em vários
+# arquivos, ou reaproveitado do cache em execuções seguintes, não vira histórico duplicado.
+class ResultsIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _meta(self, key, default=None):
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, json.dumps(value)))
+
+    # Indica se o arquivo mudou desde a última indexação. Retorna (mudou, mtime, tamanho)
+    def _changed(self, path):
+        stat = os.stat(path)
+        row = self._conn.execute('SELECT mtime, size FROM files WHERE path = ?', (path,)).fetchone()
+        return row is None or row[0] != stat.st_mtime or row[1] != stat.st_size, stat.st_mtime, stat.st_size
+
+    def _mark_indexed(self, path, kind, mtime, size):
+        self._conn.execute('INSERT OR REPLACE INTO files (path, kind, mtime, size, indexed_at) VALUES (?, ?, ?, ?, ?)',
+                           (path, kind, mtime, size, time.time()))
+
+    # Função para atualizar o índice: regras das pastas rules_dirs, o JSONL canônico (records_path), os
+    # arquivos de texto legados e os processed_urls*.txt. Retorna o dicionário tipo -> arquivos lidos.
+    def update(self, rules_dirs=DEFAULT_RULES_DIRS, records_path=DEFAULT_RECORDS_PATH, legacy_files=None, processed_files=None):
+        if legacy_files is None:
+            legacy_files = sorted(glob.glob(os.path.join('result', 'result_*.txt'))) + list(DEFAULT_LEGACY_FILES)
+        if processed_files is None:
+            processed_files = sorted(glob.glob('processed_urls*.txt'))
+
+        start = time.perf_counter()
+        # As verificações novas desta atualização são as de rowid acima do maior já indexado
+        last_observation = self._conn.execute('SELECT COALESCE(MAX(rowid), 0) FROM observations').fetchone()[0]
+        updated = {
+            KIND_RULES: self.update_rules(rules_dirs),
+            KIND_RECORDS: self.ingest_records(records_path),
+            KIND_LEGACY: self.ingest_legacy(legacy_files),
+            KIND_PROCESSED: self.ingest_processed(processed_files),
+        }
+        if updated[KIND_RECORDS] or updated[KIND_LEGACY] or updated[KIND_PROCESSED]:
+            self.rebuild_flips(after_rowid=last_observation)
+        self._conn.commit()
+        if any(updated.values()):
+            logging.info(f"Índice {self.path} atualizado em {time.perf_counter() - start:.2f}s: "
+                         + ", ".join(f"{kind}: {count} arquivos" for kind, count in updated.items()))
+        return updated
+
+    # Indexa os arquivos .rules novos ou alterados e remove os que não existem mais nas pastas
+    def update_rules(self, rules_dirs=DEFAULT_RULES_DIRS):
+        paths = sorted(path for directory in rules_dirs if os.path.isdir(directory)
+                       for path in glob.glob(os.path.join(directory, '*.rules')))
+        indexed = 0
+        for path in paths:
+            changed, mtime, size = self._changed(path)
+            if not changed:
+                continue
+            self._delete_rules(path)
+            rules = []
+            targets = []
+            for rule in iter_rules(path):
+                sid = str(rule.sid)
+                rules.append((path, rule.gid, sid, None if rule.rev is None else str(rule.rev), rule.action, rule.msg, rule.classtype))
+                seen = set()
+                for url in rule.urls:
+                    host = url_host(url)
+                    if (host, url) not in seen:
+                        seen.add((host, url))
+                        targets.append((path, rule.gid, sid, host, url, ORIGIN_REFERENCE))
+                for host, origin in rule_hosts(rule):
+                    url = f"https://{host}"
+                    if (host, url) not in seen:
+                        seen.add((host, url))
+                        targets.append((path, rule.gid, sid, host, url, origin))
+            self._conn.executemany('INSERT OR REPLACE INTO rules (path, gid, sid, rev, action, msg, classtype) VALUES (?, ?, ?, ?, ?, ?, ?)', rules)
+            self._conn.executemany('INSERT INTO rule_targets (path, gid, sid, host, url, origin) VALUES (?, ?, ?, ?, ?, ?)', targets)
+            self._mark_indexed(path, KIND_RULES, mtime, size)
+            indexed += 1
+
+        # Arquivos de regras removidos das pastas indexadas
+        current = set(paths)
+        for (path,) in self._conn.execute('SELECT path FROM files WHERE kind = ?', (KIND_RULES,)).fetchall():
+            if path not in current and os.path.dirname(path) in rules_dirs:
+                self._delete_rules(path)
+                self._conn.execute('DELETE FROM files WHERE path = ?', (path,))
+        return indexed
+
+    def _delete_rules(self, path):
+        self._conn.execute('DELETE FROM rules WHERE path = ?', (path,))
+        self._conn.execute('DELETE FROM rule_targets WHERE path = ?', (path,))
+
+    # Grava as verificações (url, sid, status, descrição, checked_at) e atualiza o último resultado de cada URL
+    def _add_observations(self, rows, source_path):
+        latest = {}
+        batch = []
+        for url, sid, status, description, checked_at in rows:
+            host = url_host(url)
+            batch.append((url, host, sid or '', status, description, checked_at, source_path))
+            if status is not None and status not in _NOT_A_VERDICT:
+                current = latest.get(url)
+                if current is None or checked_at >= current[3]:
+                    latest[url] = (host, status, description, checked_at)
+            if len(batch) >= 10000:
+                self._conn.executemany('INSERT OR IGNORE INTO observations (url, host, sid, status, description, checked_at, source_path) VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+                batch = []
+        self._conn.executemany('INSERT OR IGNORE INTO observations (url, host, sid, status, description, checked_at, source_path) VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+        self._conn.executemany(
+            'INSERT INTO latest (url, host, status, description, checked_at) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(url) DO UPDATE SET status = excluded.status, description = excluded.description, checked_at = excluded.checked_at '
+            'WHERE excluded.checked_at >= latest.checked_at',
+            ((url, *values) for url, values in latest.items()),
+        )
+
+    # Indexa o JSONL canônico de resultados, se mudou desde a última indexação. Cada versão do arquivo é
+    # uma execução; os resultados reaproveitados do cache mantêm o checked_at original e não se repetem.
+    def ingest_records(self, records_path=DEFAULT_RECORDS_PATH):
+        if not records_path or not os.path.exists(records_path):
+            return 0
+        changed, mtime, size = self._changed(records_path)
+        if not changed:
+            return 0
+
+        def rows():
+            with open(records_path, 'r', encoding='utf-8') as f_in:
+                for line in f_in:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    yield record['url'], record['sid'], record['status_code'], record['description'], record['checked_at']
+
+        self._add_observations(rows(), records_path)
+        self._mark_indexed(records_path, KIND_RECORDS, mtime, size)
+        # Os arquivos de texto gravados a partir daqui são gerados do JSONL e não são lidos de novo
+        if self._meta('records_since') is None:
+            self._set_meta('records_since', mtime)
+        return 1
+
+    # Horário da execução de um arquivo de texto legado: arquivos gravados com até window segundos de
+    # diferença pertencem à mesma execução e recebem o mesmo checked_at
+    def _legacy_run_time(self, mtime, window=DEFAULT_LEGACY_RUN_WINDOW):
+        runs = self._meta('legacy_runs', [])
+        for run_time in runs:
+            if abs(run_time - mtime) <= window:
+                return run_time
+        runs.append(mtime)
+        self._set_meta('legacy_runs', sorted(runs))
+        return mtime
+
+    # Indexa os arquivos de texto legados (linhas "SID: ... - Código: ..."), apenas os gravados antes do
+    # primeiro JSONL indexado: os posteriores são gerados a partir dele e já estão no índice
+    def ingest_legacy(self, paths):
+        records_since = self._meta('records_since')
+        indexed = 0
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            changed, mtime, size = self._changed(path)
+            if not changed:
+                continue
+            if records_since is None or mtime < records_since:
+                checked_at = self._legacy_run_time(mtime)
+
+                def rows():
+                    with open(path, 'r', errors='replace') as f_in:
+                        for line in f_in:
+                            match = result_line_pattern.match(line.strip())
+                            if match:
+                                sid, url, status, description = match.groups()
+                                yield url, sid, _parse_status(status), description, checked_at
+
+                self._add_observations(rows(), path)
+                indexed += 1
+            self._mark_indexed(path, KIND_LEGACY, mtime, size)
+        return indexed
+
+    # Indexa os processed_urls*.txt: registram apenas que a URL foi verificada na data do nome do arquivo
+    # (ou na data de modificação), sem o status
+    def ingest_processed(self, paths):
+        indexed = 0
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            changed, mtime, size = self._changed(path)
+            if not changed:
+                continue
+            date_match = dated_file_pattern.search(path)
+            checked_at = datetime.strptime(date_match.group(1), '%Y%m%d').timestamp() if date_match else mtime
+            with open(path, 'r', errors='replace') as f_in:
+                urls = {line.strip() for line in f_in if line.strip()}
+            self._add_observations(((url, None, None, None, checked_at) for url in sorted(urls)), path)
+            self._mark_indexed(path, KIND_PROCESSED, mtime, size)
+            indexed += 1
+        return indexed
+
+    # Recalcula as mudanças de status: para cada URL, compara cada verificação com a anterior (uma por
+    # checked_at, ignorando verificações sem status e circuito aberto). Com after_rowid, recalcula apenas
+    # as URLs com verificações gravadas depois dessa linha de observations; sem ele, todas.
+    def rebuild_flips(self, after_rowid=None):
+        placeholders = ', '.join('?' for _ in _NOT_A_VERDICT)
+        if after_rowid is None:
+            self._conn.execute('DELETE FROM flips')
+            scope = ''
+        else:
+            self._conn.execute('CREATE TEMP TABLE IF NOT EXISTS touched_urls (url TEXT PRIMARY KEY)')
+            self._conn.execute('DELETE FROM touched_urls')
+            self._conn.execute('INSERT OR IGNORE INTO touched_urls (url) SELECT url FROM observations WHERE rowid > ?', (after_rowid,))
+            if self._conn.execute('SELECT 1 FROM touched_urls LIMIT 1').fetchone() is None:
+                return
+            self._conn.execute('DELETE FROM flips WHERE url IN (SELECT url FROM touched_urls)')
+            scope = 'AND url IN (SELECT url FROM touched_urls)'
+        self._conn.execute(f'''
+            INSERT INTO flips (url, host, old_status, new_status, previous_at, changed_at)
+            SELECT url, host, previous_status, status, previous_at, checked_at FROM (
+                SELECT url, host, status, checked_at,
+                       LAG(status) OVER checks AS previous_status,
+                       LAG(checked_at) OVER checks AS previous_at
+                FROM (
+                    SELECT url, MIN(host) AS host, MIN(status) AS status, checked_at
+                    FROM observations
+                    WHERE status IS NOT NULL AND status NOT IN ({placeholders}) {scope}
+                    GROUP BY url, checked_at
+                )
+                WINDOW checks AS (PARTITION BY url ORDER BY checked_at)
+            )
+            WHERE previous_status IS NOT NULL AND previous_status != status
+        ''', _NOT_A_VERDICT)
+
+    # Regras que referenciam o host (ou o host com www.), com o último resultado de cada URL
+    def rules_for_host(self, host, limit=DEFAULT_QUERY_LIMIT):
+        host = url_host(host if '://' in host else f"https://{host}")
+        hosts = (host, host[4:] if host.startswith('www.') else f"www.{host}")
+        return self._rule_matches('t.host IN (?, ?)', hosts, limit)
+
+    # Regras com o SID informado (em todos os arquivos), com as URLs e hosts e o último resultado
+    def rules_for_sid(self, sid, limit=DEFAULT_QUERY_LIMIT):
+        return self._rule_matches('r.sid = ?', (str(sid),), limit)
+
+    # Regras de um classtype, com as URLs e hosts e o último resultado
+    def rules_for_classtype(self, classtype, limit=DEFAULT_QUERY_LIMIT):
+        return self._rule_matches('r.classtype = ?', (classtype,), limit)
+
+    # Regras cujas URLs têm como último resultado o status informado (ex.: 404, "Erro", "DNS")
+    def rules_for_status(self, status, limit=DEFAULT_QUERY_LIMIT):
+        return self._rule_matches('l.status = ?', (_parse_status(str(status)),), limit, join_latest=True)
+
+    def _rule_matches(self, where, params, limit, join_latest=False):
+        join = 'JOIN latest l ON l.url = t.url' if join_latest else 'LEFT JOIN latest l ON l.url = t.url'
+        rows = self._conn.execute(
+            'SELECT r.sid, r.gid, r.rev, r.path, r.msg, r.classtype, t.host, t.url, t.origin, l.status, l.description, l.checked_at '
+            f'FROM rules r JOIN rule_targets t ON t.path = r.path AND t.gid = r.gid AND t.sid = r.sid {join} '
+            f'WHERE {where} ORDER BY r.path, CAST(r.sid AS INTEGER), t.url LIMIT ?',
+            (*params, limit),
+        ).fetchall()
+        return [RuleMatch(*row) for row in rows]
+
+    # Últimas verificações de uma URL (uma por checked_at), da mais recente para a mais antiga
+    def history(self, url, runs=DEFAULT_HISTORY_RUNS):
+        rows = self._conn.execute(
+            "SELECT url, MIN(status), MIN(description), checked_at, GROUP_CONCAT(sid) FROM observations "
+            "WHERE url = ? GROUP BY checked_at ORDER BY checked_at DESC LIMIT ?",
+            (url, runs),
+        ).fetchall()
+        return [Observation(url, status, description, checked_at, sorted({sid for sid in (sids or '').split(',') if sid}))
+                for url, status, description, checked_at, sids in rows]
+
+    # URLs cujo status mudou entre verificações consecutivas, das mudanças mais recentes para as mais
+    # antigas. Com since, apenas mudanças a partir desse horário; com host, apenas as URLs do host.
+    def status_flips(self, since=None, host=None, limit=DEFAULT_QUERY_LIMIT):
+        where = ['changed_at >= ?']
+        params = [since or 0]
+        if host is not None:
+            where.append('host = ?')
+            params.append(host)
+        rows = self._conn.execute(
+            f"SELECT url, host, old_status, new_status, previous_at, changed_at FROM flips WHERE {' AND '.join(where)} "
+            "ORDER BY changed_at DESC, url LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        return [StatusFlip(*row) for row in rows]
@@ -0,0 +1,173 @@
+import csv
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from run_metrics import PHASES
+from work_plan import SOURCE_HOMOLOGATED, SOURCE_NAVIGATE, SOURCE_CUSTOM
+
+# Configurações padrão da saída estruturada dos resultados
+DEFAULT_RECORDS_NAME = 'results.jsonl'  # Saída canônica, em result/
+DEFAULT_CSV_NAME = 'results.csv'
+DEFAULT_FLUSH_RECORDS = 500    # Registros acumulados antes de descarregar o buffer no disco
+DEFAULT_FLUSH_INTERVAL = 1.0   # Segundos sem registro novo antes de descarregar o buffer
+
+# Campos de cada registro, na ordem gravada no JSONL e no CSV
+RECORD_FIELDS = ('sid', 'gid', 'rev', 'url', 'source', 'source_file', 'position', 'status_code', 'description',
+                 'tier', 'backend', 'cached', 'checked_at', 'timings')
+
+_STOP = object()
+
+# Função para montar os registros de resultado de uma URL: um por regra do plano que a referencia
+# (com o arquivo e a posição da regra) e um sem SID para URLs personalizadas. timing é o CheckTiming
+# da verificação (None para resultados em cache ou sem métricas).
+def build_records(plan, url, result, timing=None, cached=False, checked_at=None):
+    base = {
+        'url': url,
+        'status_code': result.status_code,
+        'description': result.description,
+        'tier': result.tier,
+        'backend': timing.backend if timing is not None else None,
+        'cached': cached,
+        'checked_at': checked_at,
+        'timings': None,
+    }
+    if timing is not None:
+        base['timings'] = {phase: None if getattr(timing, phase) is None else round(getattr(timing, phase), 4) for phase in PHASES}
+
+    records = []
+    for ref in plan.url_index.rules_for_url(url):
+        source = plan.source_for_file(ref.path)
+        if source is None:
+            continue
+        record = dict(base, sid=ref.sid, gid=ref.gid, rev=ref.rev, source=source, source_file=ref.path, position=ref.position)
+        records.append(record)
+    item = plan.items.get(url)
+    if item is not None and SOURCE_CUSTOM in item.sources:
+        records.append(dict(base, sid=None, gid=None, rev=None, source=SOURCE_CUSTOM, source_file=None, position=None))
+    return [{field: record[field] for field in RECORD_FIELDS} for record in records]
+
+# Gravador dos resultados em JSONL com uma única thread: as verificações apenas colocam o resultado
+# na fila (emit) e a thread monta os registros, serializa e grava com buffer, descarregando a cada
+# flush_records registros ou flush_interval segundos sem registro novo. Com append, mantém o arquivo.
+class ResultsWriter:
+    def __init__(self, path, plan, flush_records=DEFAULT_FLUSH_RECORDS, flush_interval=DEFAULT_FLUSH_INTERVAL, append=False):
+        self.path = path
+        self.plan = plan
+        self.flush_records = max(1, int(flush_records))
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._error = None
+        self._queue = queue.Queue()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8', buffering=1 << 16)
+        self._thread = threading.Thread(target=self._run, name='results-writer', daemon=True)
+        self._thread.start()
+
+    # Registra o resultado de uma URL (chamado pelas threads de verificação)
+    def emit(self, url, result, timing=None, cached=False, checked_at=None):
+        self._queue.put((url, result, timing, cached, checked_at or time.time()))
+
+    def _run(self):
+        pending = 0
+        while True:
+            try:
+                entry = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if pending:
+                    self._file.flush()
+                    pending = 0
+                continue
+            if entry is _STOP:
+                break
+            if self._error is not None:
+                continue
+            try:
+                for record in build_records(self.plan, *entry):
+                    self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    self.written += 1
+                    pending += 1
+                if pending >= self.flush_records:
+                    self._file.flush()
+                    pending = 0
+            except Exception as e:
+                logging.error(f"Erro ao gravar os resultados em {self.path}: {e}")
+                self._error = e
+        self._file.flush()
+
+    # Espera a thread gravar tudo o que já foi registrado e fecha o arquivo
+    def close(self):
+        if self._file.closed:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._file.close()
+        logging.info(f"Resultados estruturados salvos em {self.path} ({self.written} registros).")
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+# Gerador dos registros de um arquivo JSONL de resultados
+def read_records(path):
+    with open(path, 'r', encoding='utf-8') as f_in:
+        for line in f_in:
+            if line.strip():
+                yield json.loads(line)
+
+# Função para gerar os arquivos de texto legados a partir do JSONL: result/result_<arquivo>.txt de cada
+# arquivo de regras e, pela origem, Analytics*.txt (homologadas) ou Navigate_*.txt (falso positivo),
+# na ordem das regras do plano. Se a mesma regra aparece mais de uma vez no JSONL, vale o último registro.
+# Os arquivos de análise recebem as linhas ao final (o cabeçalho é gravado pelo chamador).
+def render_legacy_files(plan, records_path, output_dir='result', analytics_file='Analytics.txt', analytics_200_file='Analytics_200.txt', navigate_error_file='Navigate_Error.txt', navigate_200_file='Navigate_200.txt'):
+    latest = {}
+    for record in read_records(records_path):
+        if record['source_file'] is not None:
+            latest[(record['source_file'], record['position'])] = record
+
+    routes = (
+        (SOURCE_HOMOLOGATED, analytics_file, analytics_200_file),
+        (SOURCE_NAVIGATE, navigate_error_file, navigate_200_file),
+    )
+    for source, error_file, ok_file in routes:
+        input_paths = plan.files_for(source)
+        if not input_paths:
+            continue
+        with open(error_file, 'a') as f_error, open(ok_file, 'a') as f_ok:
+            for input_path in input_paths:
+                output_path = os.path.join(output_dir, f"result_{os.path.basename(input_path)}.txt")
+                with open(output_path, 'w') as f_out:
+                    for ref in plan.rules_for_file(input_path):
+                        record = latest.get((input_path, ref.position))
+                        if record is None:
+                            logging.warning(f"Regra sem resultado nesta execução: {ref.url} (SID: {ref.sid})")
+                            continue
+                        line = f"SID: {ref.sid} - {ref.url} - Código: {record['status_code']}, Descrição: {record['description']}\n"
+                        f_out.write(line)
+                        if record['status_code'] == 200:
+                            f_ok.write(line)
+                        else:
+                            f_error.write(line)
+                logging.info(f"Resultado salvo em {output_path}")
+
+# Função para gerar a versão CSV do JSONL (as fases de tempo viram colunas timing_<fase>)
+def write_csv(records_path, csv_path):
+    fields = [field for field in RECORD_FIELDS if field != 'timings'] + [f"timing_{phase}" for phase in PHASES]
+    count = 0
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f_csv:
+        writer = csv.DictWriter(f_csv, fieldnames=fields)
+        writer.writeheader()
+        for record in read_records(records_path):
+            timings = record.pop('timings') or {}
+            record.update({f"timing_{phase}": timings.get(phase) for phase in PHASES})
+            writer.writerow(record)
+            count += 1
+    logging.info(f"Resultados em CSV salvos em {csv_path} ({count} registros).")
+    return count
@@ -0,0 +1,113 @@
+import logging
+import re
+
+from rule_parser import iter_rules
+
+# Configurações padrão da verificação dos hosts das regras
+DEFAULT_HOST_BATCH = 200   # Hosts novos acumulados antes de cada rodada de verificação
+DEFAULT_REPORT_PATH = 'rule_hosts_report.txt'
+
+# Origem do host derivado da regra
+ORIGIN_TLS_SNI = 'tls_sni'
+ORIGIN_PCRE = 'pcre'
+
+# Nome de host com pelo menos dois rótulos e TLD alfabético (ou IDN xn--)
+hostname_pattern = re.compile(r'^(?=.{1,253}$)(?:[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9])?\.)+(?:[a-z]{2,63}|xn--[a-z0-9-]{1,59})$')
+# Expressão pcre no formato /corpo/flags
+pcre_pattern = re.compile(r'^/(.*)/([A-Za-z]*)$', re.DOTALL)
+# Trechos hexadecimais do content (ex.: |2e|)
+content_hex_pattern = re.compile(r'\|([0-9A-Fa-f\s]*)\|')
+# Prefixos de pcre que aceitam o próprio host ou qualquer subdomínio
+PCRE_SUBDOMAIN_PREFIXES = ('(^|\\.)', '(?:^|\\.)', '(^|.)', '(?:^|.)')
+PCRE_METACHARACTERS = set('\\[](){}*+?|^$')
+
+# Converte os trechos hexadecimais de um content (|2e|) em caracteres
+def decode_content(value):
+    if '|' not in value:
+        return value
+    return content_hex_pattern.sub(lambda match: bytes.fromhex(match.group(1)).decode('latin-1'), value)
+
+# Função para transformar um trecho de SNI em um host concreto para teste. Um trecho com ponto
+# inicial (".xvideos.com") só casa com subdomínios, então o host testado é o www. Retorna None se
+# o trecho não for um nome de host completo (ex.: content:"pornhub").
+def host_from_fragment(value):
+    host = value.strip().lower().rstrip('.')
+    if host.startswith('.'):
+        host = f"www{host}"
+    if not hostname_pattern.match(host):
+        return None
+    return host
+
+# Função para extrair o host literal de um pcre ancorado no fim, como /caiunoxvideos.com.br$/,
+# /^img100\.xvideos\.com$/ ou /(^|\.)xvideos\.com$/. Retorna None se a expressão não for um literal ancorado.
+def pcre_literal_host(expression):
+    match = pcre_pattern.match(expression.strip())
+    if match is None:
+        return None
+    body = match.group(1)
+    if not body.endswith('$') or body.endswith('\\$'):
+        return None
+    body = body[:-1]
+    for prefix in PCRE_SUBDOMAIN_PREFIXES:
+        if body.startswith(prefix):
+            body = body[len(prefix):]
+            break
+    else:
+        if body.startswith('^'):
+            body = body[1:]
+
+    # Apenas escapes de caracteres literais; qualquer outro metacaractere torna a expressão não literal
+    literal = re.sub(r'\\([.\-_/])', r'\1', body)
+    if any(char in PCRE_METACHARACTERS for char in literal):
+        return None
+    return host_from_fragment(literal)
+
+# Hosts concretos de uma regra, sem repetição: (host, origem) dos content de tls_sni e dos pcre ancorados
+def rule_hosts(rule):
+    hosts = {}
+    for value in rule.tls_sni:
+        host = host_from_fragment(decode_content(value))
+        if host is not None:
+            hosts.setdefault(host, ORIGIN_TLS_SNI)
+    for expression in rule.tls_sni_pcre:
+        host = pcre_literal_host(expression)
+        if host is not None:
+            hosts.setdefault(host, ORIGIN_PCRE)
+    return list(hosts.items())
+
+# Gerador (rule, host, origem) de todos os arquivos .rules, em streaming: as regras são lidas e
+# expandidas sob demanda, sem carregar o feed inteiro na memória
+def iter_rule_hosts(paths):
+    for path in paths:
+        for rule in iter_rules(path):
+            for host, origin in rule_hosts(rule):
+                yield rule, host, origin
+
+# Função para verificar os hosts derivados das regras em rodadas, com deduplicação global: cada host
+# é verificado uma única vez, mesmo que apareça em várias regras e categorias. check_batch recebe o
+# dicionário host -> lista de regras e retorna host -> resultado. Gera (rule, host, origem, resultado)
+# à medida que as rodadas terminam; só os resultados por host ficam em memória.
+def check_rule_hosts(pairs, check_batch, batch_size=DEFAULT_HOST_BATCH):
+    results = {}
+    waiting = {}  # host -> [(rule, origem)] aguardando a próxima rodada
+
+    def flush():
+        batch = {host: [rule for rule, _origin in entries] for host, entries in waiting.items()}
+        checked = check_batch(batch)
+        for host, entries in waiting.items():
+            results[host] = checked[host]
+            for rule, origin in entries:
+                yield rule, host, origin, results[host]
+        waiting.clear()
+
+    for rule, host, origin in pairs:
+        if host in results:
+            yield rule, host, origin, results[host]
+            continue
+        waiting.setdefault(host, []).append((rule, origin))
+        if len(waiting) >= batch_size:
+            yield from flush()
+
+    if waiting:
+        yield from flush()
+    logging.info(f"Hosts das regras: {len(results)} hosts únicos verificados.")
@@ -0,0 +1,240 @@
+import logging
+import re
+
+# Opções que iniciam um "sticky buffer": os content seguintes se aplicam a esse buffer
+STICKY_BUFFERS = {
+    'tls_sni', 'tls.sni', 'http.host', 'http_host', 'http.uri', 'http_uri', 'dns.query', 'dns_query',
+    'tls.cert_subject', 'tls_cert_subject', 'http.header', 'http.method', 'file.data', 'file_data',
+    'pkt_data', 'quic.sni', 'http.request_line', 'http.user_agent',
+}
+TLS_SNI_BUFFERS = {'tls_sni', 'tls.sni'}
+
+# Exceção para regras que não puderam ser interpretadas
+class RuleParseError(ValueError):
+    pass
+
+# Registro compacto de uma regra Suricata
+class SuricataRule:
+    __slots__ = ('sid', 'gid', 'rev', 'action', 'proto', 'msg', 'classtype', 'tls_sni', 'pcre', 'tls_sni_pcre',
+                 'dst_ips', 'dst_ips_negated', 'references', 'path', 'line_number')
+
+    def __init__(self, sid, gid=1, rev=None, action=None, proto=None, msg=None, classtype=None, tls_sni=(),
+                 pcre=(), dst_ips=(), dst_ips_negated=(), references=(), path=None, line_number=None, tls_sni_pcre=()):
+        self.sid = sid
+        self.gid = gid
+        self.rev = rev
+        self.action = action
+        self.proto = proto
+        self.msg = msg
+        self.classtype = classtype
+        self.tls_sni = tls_sni                  # Valores de content aplicados ao buffer tls_sni
+        self.pcre = pcre                        # Expressões pcre, como escritas na regra
+        self.tls_sni_pcre = tls_sni_pcre        # Expressões pcre aplicadas ao buffer tls_sni
+        self.dst_ips = dst_ips                  # IPs/redes de destino positivos
+        self.dst_ips_negated = dst_ips_negated  # IPs/redes de destino negados (!)
+        self.references = references            # Tuplas (tipo, valor), ex.: ('url', 'pornhub.com')
+        self.path = path
+        self.line_number = line_number
+
+    # URLs (https://) de todas as referências do tipo url
+    @property
+    def urls(self):
+        return tuple(f"https://{value}" for kind, value in self.references if kind == 'url')
+
+    def __repr__(self):
+        return f"SuricataRule(sid={self.sid}, rev={self.rev}, msg={self.msg!r})"
+
+# Remove as aspas externas de um valor de opção
+def _strip_quotes(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        value = value[1:-1]
+    return value
+
+# Remove as aspas externas e os escapes (\; \" \\) de um valor de opção
+def _unquote(value):
+    value = _strip_quotes(value)
+    if '\\' not in value:
+        return value
+    chars = []
+    escaped = False
+    for char in value:
+        if escaped:
+            chars.append(char)
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        else:
+            chars.append(char)
+    return ''.join(chars)
+
+# Uma opção: trechos sem ; aspas ou barra, caracteres escapados (\;) e strings entre aspas
+_option_pattern = re.compile(r'(?:[^;"\\]+|\\.|"(?:[^"\\]|\\.)*")+')
+
+# Divide o corpo da regra em opções, respeitando aspas e ponto e vírgula escapado (\;)
+def split_options(body):
+    options = []
+    pos = 0
+    length = len(body)
+    while pos < length:
+        match = _option_pattern.match(body, pos)
+        end = match.end() if match else pos
+        if end < length and body[end] != ';':
+            raise RuleParseError("Aspas não fechadas ou escape inválido nas opções da regra.")
+        if match:
+            option = match.group().strip()
+            if option:
+                options.append(option)
+        pos = end + 1
+    return options
+
+# Divide o cabeçalho em campos, mantendo listas entre colchetes como um único campo
+def _split_header(header):
+    if '[' not in header:
+        return header.split()
+    fields = []
+    current = []
+    depth = 0
+    for char in header:
+        if char == '[':
+            depth += 1
+        elif char == ']':
+            depth -= 1
+        if char.isspace() and depth == 0:
+            if current:
+                fields.append(''.join(current))
+                current = []
+        else:
+            current.append(char)
+    if current:
+        fields.append(''.join(current))
+    return fields
+
+# Interpreta uma lista de endereços (ex.: [1.2.3.4,!5.6.7.8]) em (positivos, negados).
+# Variáveis ($HOME_NET) e "any" são ignoradas.
+def parse_address_list(value):
+    positive = []
+    negated = []
+    negate_stack = [False]
+    token = []
+    negate_next = False
+
+    def flush():
+        address = ''.join(token).strip()
+        token.clear()
+        if not address or address == 'any' or address.startswith('$'):
+            return
+        if negate_stack[-1] ^ negate_next:
+            negated.append(address)
+        else:
+            positive.append(address)
+
+    for char in value:
+        if char == '!':
+            negate_next = not negate_next
+        elif char == '[':
+            negate_stack.append(negate_stack[-1] ^ negate_next)
+            negate_next = False
+        elif char == ']':
+            flush()
+            negate_next = False
+            negate_stack.pop()
+        elif char == ',':
+            flush()
+            negate_next = False
+        elif not char.isspace():
+            token.append(char)
+    flush()
+    return tuple(positive), tuple(negated)
+
+# Função para interpretar uma linha (regra completa) em um SuricataRule.
+# Retorna None para linhas vazias e comentários.
+def parse_rule(line, path=None, line_number=None):
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+
+    open_paren = line.find('(')
+    close_paren = line.rfind(')')
+    if open_paren == -1 or close_paren < open_paren:
+        raise RuleParseError("Regra sem bloco de opções entre parênteses.")
+
+    header = _split_header(line[:open_paren])
+    if len(header) != 7:
+        raise RuleParseError(f"Cabeçalho da regra com {len(header)} campos (esperado 7).")
+    action, proto, _src, _src_port, _direction, dst, _dst_port = header
+    dst_ips, dst_ips_negated = parse_address_list(dst)
+
+    sid = None
+    gid = 1
+    rev = None
+    msg = None
+    classtype = None
+    tls_sni = []
+    pcre = []
+    tls_sni_pcre = []
+    references = []
+    buffer = None
+
+    for option in split_options(line[open_paren + 1:close_paren]):
+        name, sep, value = option.partition(':')
+        name = name.strip()
+        if not sep:
+            if name in STICKY_BUFFERS:
+                buffer = name
+            continue
+
+        if name == 'content':
+            if buffer in TLS_SNI_BUFFERS:
+                tls_sni.append(_unquote(value))
+        elif name == 'pcre':
+            pcre.append(_strip_quotes(value))  # Mantém os escapes, que fazem parte da expressão
+            if buffer in TLS_SNI_BUFFERS:
+                tls_sni_pcre.append(pcre[-1])
+        elif name == 'sid':
+            sid = int(value)
+        elif name == 'gid':
+            gid = int(value)
+        elif name == 'rev':
+            rev = int(value)
+        elif name == 'msg':
+            msg = _unquote(value)
+        elif name == 'classtype':
+            classtype = value.strip()
+        elif name == 'reference':
+            kind, _, ref_value = value.partition(',')
+            references.append((kind.strip(), ref_value.strip()))
+
+    if sid is None:
+        raise RuleParseError("Regra sem sid.")
+
+    return SuricataRule(sid, gid, rev, action, proto, msg, classtype, tuple(tls_sni), tuple(pcre),
+                        dst_ips, dst_ips_negated, tuple(references), path, line_number, tuple(tls_sni_pcre))
+
+# Gerador que percorre um arquivo .rules linha a linha (memória limitada), suportando regras
+# continuadas com "\" no fim da linha. Regras inválidas são registradas no log e ignoradas.
+def iter_rules(path):
+    with open(path, 'r', errors='replace') as f_in:
+        pending = []
+        start_line = None
+        for line_number, line in enumerate(f_in, 1):
+            stripped = line.rstrip('\r\n')
+            if stripped.endswith('\\'):
+                if not pending:
+                    start_line = line_number
+                pending.append(stripped[:-1])
+                continue
+            if pending:
+                pending.append(stripped)
+                stripped = ''.join(pending)
+                pending = []
+            else:
+                start_line = line_number
+
+            try:
+                rule = parse_rule(stripped, path, start_line)
+            except (RuleParseError, ValueError) as e:
+                logging.warning(f"Regra ignorada em {path}:{start_line}: {e}")
+                continue
+            if rule is not None:
+                yield rule
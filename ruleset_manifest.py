@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+import time
+
+from rule_parser import iter_rules
+
+# Arquivos padrão do manifesto do ruleset e do diff entre downloads
+DEFAULT_MANIFEST_PATH = 'ruleset_manifest.json'
+DEFAULT_DIFF_PATH = 'ruleset_diff.json'
+DEFAULT_REPORT_PATH = 'ruleset_diff.txt'
+
+# Chave de uma regra no manifesto
+def rule_key(gid, sid):
+    return f"{gid}:{sid}"
+
+# Função para montar o manifesto de um diretório de regras: chave gid:sid -> {sid, gid, rev, urls, file}
+def build_manifest(rules_dir):
+    manifest = {}
+    for name in sorted(os.listdir(rules_dir)):
+        if not name.endswith('.rules'):
+            continue
+        for rule in iter_rules(os.path.join(rules_dir, name)):
+            manifest[rule_key(rule.gid, rule.sid)] = {
+                'sid': rule.sid,
+                'gid': rule.gid,
+                'rev': rule.rev,
+                'urls': list(rule.urls),
+                'file': name,
+            }
+    return manifest
+
+def load_manifest(path=DEFAULT_MANIFEST_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=DEFAULT_MANIFEST_PATH):
+    with open(path, 'w') as f:
+        json.dump(manifest, f, sort_keys=True)
+
+# Diferença entre dois manifestos: regras adicionadas, removidas e alteradas (rev ou URLs)
+class RulesetDiff:
+    __slots__ = ('added', 'removed', 'changed', 'created_at')
+
+    def __init__(self, added=(), removed=(), changed=(), created_at=None):
+        self.added = list(added)      # Chaves gid:sid
+        self.removed = list(removed)
+        self.changed = list(changed)
+        self.created_at = created_at or time.time()
+
+    # Chaves das regras que precisam ser verificadas (adicionadas e alteradas)
+    @property
+    def to_check(self):
+        return set(self.added) | set(self.changed)
+
+    def to_dict(self):
+        return {'added': self.added, 'removed': self.removed, 'changed': self.changed, 'created_at': self.created_at}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('added', ()), data.get('removed', ()), data.get('changed', ()), data.get('created_at'))
+
+# Função para comparar o manifesto anterior com o novo. Sem manifesto anterior, todas as regras são novas.
+def diff_manifests(old, new):
+    old = old or {}
+    added = sorted(key for key in new if key not in old)
+    removed = sorted(key for key in old if key not in new)
+    changed = sorted(
+        key for key in new
+        if key in old and (old[key]['rev'] != new[key]['rev'] or old[key]['urls'] != new[key]['urls'])
+    )
+    return RulesetDiff(added, removed, changed)
+
+def load_diff(path=DEFAULT_DIFF_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return RulesetDiff.from_dict(json.load(f))
+
+def save_diff(diff, path=DEFAULT_DIFF_PATH):
+    with open(path, 'w') as f:
+        json.dump(diff.to_dict(), f)
+
+# Função para gravar o relatório em texto do diff
+def write_diff_report(diff, old, new, path=DEFAULT_REPORT_PATH):
+    old = old or {}
+
+    def describe(entry):
+        urls = ", ".join(entry['urls']) or "sem reference:url"
+        return f"SID: {entry['sid']} (gid {entry['gid']}) - {urls} - {entry['file']}"
+
+    with open(path, 'w') as f:
+        f.write(f"Diferenças do ruleset - {time.strftime('%Y-%m-%d %H:%M', time.localtime(diff.created_at))}\n")
+        f.write(f"Adicionadas: {len(diff.added)}, Removidas: {len(diff.removed)}, Alteradas: {len(diff.changed)}\n\n")
+        for key in diff.added:
+            f.write(f"[ADICIONADA] {describe(new[key])} - rev {new[key]['rev']}\n")
+        for key in diff.changed:
+            f.write(f"[ALTERADA] {describe(new[key])} - rev {old[key]['rev']} -> {new[key]['rev']}\n")
+        for key in diff.removed:
+            f.write(f"[REMOVIDA] {describe(old[key])} - rev {old[key]['rev']}\n")
+
+# Função para atualizar o manifesto após um novo download: compara com o manifesto anterior,
+# grava o diff (JSON e relatório em texto) e substitui o manifesto anterior pelo novo.
+def update_ruleset_manifest(rules_dir, manifest_path=DEFAULT_MANIFEST_PATH, diff_path=DEFAULT_DIFF_PATH, report_path=DEFAULT_REPORT_PATH):
+    old = load_manifest(manifest_path)
+    new = build_manifest(rules_dir)
+    diff = diff_manifests(old, new)
+
+    save_diff(diff, diff_path)
+    write_diff_report(diff, old, new, report_path)
+    save_manifest(new, manifest_path)
+
+    logging.info(f"Ruleset atualizado: {len(diff.added)} regras adicionadas, {len(diff.changed)} alteradas, {len(diff.removed)} removidas. Relatório em {report_path}")
+    return diff
@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Arquivos padrão do resumo da execução
+DEFAULT_SUMMARY_PATH = 'run_metrics.json'
+DEFAULT_PROMETHEUS_PATH = 'run_metrics.prom'
+METRIC_PREFIX = 'suricata_url_checker'
+
+# Backends que podem verificar uma URL
+BACKEND_REQUESTS = 'requests'
+BACKEND_SELENIUM = 'selenium'
+BACKEND_SCREENSHOT = 'screenshot'
+
+# Fases medidas em cada verificação (segundos)
+PHASES = ('dns', 'connect', 'tls', 'ttfb', 'total')
+PERCENTILES = (50, 90, 95, 99)
+SLOWEST_HOSTS = 10
+
+# Medição em andamento na thread atual (a verificação de uma URL roda inteira em uma única thread)
+_current = threading.local()
+
+# Tempos de uma verificação. Fases não observadas ficam None
+# (ex.: connect e tls em conexões keep-alive reaproveitadas).
+class CheckTiming:
+    __slots__ = ('url', 'host', 'backend', 'dns', 'connect', 'tls', 'ttfb', 'total', 'status_code', 'error_class')
+
+    def __init__(self, url, host, backend=BACKEND_REQUESTS):
+        self.url = url
+        self.host = host
+        self.backend = backend
+        self.dns = None
+        self.connect = None
+        self.tls = None
+        self.ttfb = None
+        self.total = None
+        self.status_code = None
+        self.error_class = None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+# Soma a duração de uma fase à verificação em andamento na thread atual (sem efeito fora de uma medição)
+def record_phase(phase, seconds):
+    timing = getattr(_current, 'timing', None)
+    if timing is not None:
+        setattr(timing, phase, (getattr(timing, phase) or 0) + seconds)
+
+# Registra o backend que está verificando a URL em andamento (ex.: escalada para o Selenium)
+def record_backend(backend):
+    timing = getattr(_current, 'timing', None)
+    if timing is not None:
+        timing.backend = backend
+
+# Registra a classe do erro da verificação em andamento (ex.: ReadTimeout, SSLError)
+def record_error(error):
+    timing = getattr(_current, 'timing', None)
+    if timing is not None:
+        timing.error_class = type(error).__name__
+
+# Percentil pelo método nearest-rank de uma lista já ordenada
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+# Métricas de uma execução: tempos de cada verificação e contadores agregados
+class RunMetrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.timings = []
+        self.counters = {}  # ex.: cache -> URLs com resultado em cache, dns -> hosts sem resolução
+
+    # Mede a verificação de uma URL na thread atual. Retorna o CheckTiming, preenchido ao sair do bloco.
+    @contextmanager
+    def track(self, url, host, backend=BACKEND_REQUESTS, dns_seconds=None):
+        timing = CheckTiming(url, host, backend)
+        timing.dns = dns_seconds
+        previous = getattr(_current, 'timing', None)
+        _current.timing = timing
+        start = time.perf_counter()
+        try:
+            yield timing
+        except Exception as e:
+            timing.error_class = type(e).__name__
+            raise
+        finally:
+            timing.total = time.perf_counter() - start
+            _current.timing = previous
+            with self._lock:
+                self.timings.append(timing)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    # Resumo agregado: URLs/s, percentis por fase, erros por classe e hosts mais lentos
+    def summary(self, slowest=SLOWEST_HOSTS):
+        wall_seconds = time.perf_counter() - self._start
+        with self._lock:
+            timings = list(self.timings)
+            counters = dict(self.counters)
+        checks = [t for t in timings if t.backend != BACKEND_SCREENSHOT]
+
+        latency = {}
+        for phase in PHASES:
+            values = sorted(getattr(t, phase) for t in checks if getattr(t, phase) is not None)
+            latency[phase] = {
+                'count': len(values),
+                **{f"p{p}": percentile(values, p) for p in PERCENTILES},
+                'max': values[-1] if values else None,
+            }
+
+        by_backend = {}
+        for t in timings:
+            entry = by_backend.setdefault(t.backend, {'count': 0, 'seconds': 0.0})
+            entry['count'] += 1
+            entry['seconds'] += t.total or 0
+
+        errors = {}
+        for t in checks:
+            if t.error_class is not None:
+                errors[t.error_class] = errors.get(t.error_class, 0) + 1
+
+        hosts = {}
+        for t in checks:
+            hosts.setdefault(t.host, []).append(t.total or 0)
+        slowest_hosts = sorted(
+            ({'host': host, 'count': len(values), 'max': max(values), 'mean': sum(values) / len(values)}
+             for host, values in hosts.items()),
+            key=lambda entry: entry['max'], reverse=True,
+        )[:slowest]
+
+        return {
+            'started_at': self.started_at,
+            'wall_seconds': wall_seconds,
+            'urls_checked': len(checks),
+            'urls_per_second': len(checks) / wall_seconds if wall_seconds > 0 else 0.0,
+            'skipped': counters,
+            'by_backend': by_backend,
+            'latency_seconds': latency,
+            'errors_by_class': dict(sorted(errors.items())),
+            'timeouts': sum(count for name, count in errors.items() if 'Timeout' in name),
+            'slowest_hosts': slowest_hosts,
+        }
+
+def write_json_summary(summary, path=DEFAULT_SUMMARY_PATH):
+    with open(path, 'w') as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Função para gravar o resumo no formato textfile do Prometheus (node_exporter --collector.textfile).
+# O arquivo é gravado em um temporário e renomeado, para o coletor nunca ler um arquivo pela metade.
+def write_prometheus_textfile(summary, path=DEFAULT_PROMETHEUS_PATH):
+    lines = []
+
+    def metric(name, metric_type, help_text, samples):
+        full_name = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {metric_type}")
+        for labels, value in samples:
+            if value is None:
+                continue
+            label_text = ','.join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+            lines.append(f"{full_name}{{{label_text}}} {value}" if label_text else f"{full_name} {value}")
+
+    metric('last_run_timestamp_seconds', 'gauge', 'Início da última execução.', [({}, summary['started_at'])])
+    metric('run_duration_seconds', 'gauge', 'Duração total da execução.', [({}, summary['wall_seconds'])])
+    metric('urls_checked', 'gauge', 'URLs verificadas na execução.', [({}, summary['urls_checked'])])
+    metric('urls_per_second', 'gauge', 'URLs verificadas por segundo.', [({}, summary['urls_per_second'])])
+    metric('urls_skipped', 'gauge', 'URLs sem verificação HTTP (cache, DNS).',
+           [({'reason': reason}, count) for reason, count in sorted(summary['skipped'].items())])
+    metric('backend_checks', 'gauge', 'Verificações por backend.',
+           [({'backend': backend}, entry['count']) for backend, entry in sorted(summary['by_backend'].items())])
+    metric('backend_seconds', 'gauge', 'Tempo somado das verificações por backend.',
+           [({'backend': backend}, entry['seconds']) for backend, entry in sorted(summary['by_backend'].items())])
+    metric('check_latency_seconds', 'gauge', 'Percentis da duração de cada fase da verificação.',
+           [({'phase': phase, 'quantile': p / 100}, stats[f"p{p}"])
+            for phase, stats in summary['latency_seconds'].items() for p in PERCENTILES])
+    metric('errors', 'gauge', 'Verificações com erro, por classe do erro.',
+           [({'class': name}, count) for name, count in summary['errors_by_class'].items()])
+    metric('timeouts', 'gauge', 'Verificações encerradas por timeout.', [({}, summary['timeouts'])])
+    metric('slowest_host_seconds', 'gauge', 'Maior duração de verificação dos hosts mais lentos.',
+           [({'host': entry['host']}, entry['max']) for entry in summary['slowest_hosts']])
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
@@ -0,0 +1,149 @@
+import heapq
+import itertools
+import threading
+import time
+
+from result_cache import DEFAULT_RESULT_TTL
+
+# Prioridades do agendador (menor valor = verificado antes)
+PRIORITY_NEW = 0       # URL nunca verificada
+PRIORITY_CHANGED = 1   # Regra adicionada/alterada no último ruleset, ou último resultado com falha
+PRIORITY_STALE = 2     # Último resultado foi sucesso (200), mas já passou do TTL
+
+PRIORITY_NAMES = {PRIORITY_NEW: 'nova', PRIORITY_CHANGED: 'alterada/falha', PRIORITY_STALE: 'velha'}
+
+# Configurações padrão do modo daemon
+DEFAULT_FAILURE_TTL = 60 * 60   # Segundos até uma URL com falha ser verificada de novo
+DEFAULT_RATE = 5.0              # Verificações iniciadas por segundo
+DEFAULT_BURST = 10
+DEFAULT_BATCH_SIZE = 100        # URLs retiradas da fila a cada rodada
+DEFAULT_FEED_INTERVAL = 6 * 60 * 60   # Segundos entre atualizações do feed de assinaturas
+DEFAULT_WRITE_INTERVAL = 5 * 60       # Segundos entre regravações dos arquivos de resultado e métricas
+
+# Limitador de taxa (token bucket): no máximo rate requisições por segundo, com rajadas de até burst
+class RateLimiter:
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Espera até haver uma ficha disponível. Retorna False se stop_event for acionado antes.
+    def acquire(self, stop_event=None):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+# Agendador por prioridade das URLs do plano de trabalho. Cada URL tem um instante em que volta a
+# ficar pendente (due_at); entre as pendentes, sai primeiro a de menor prioridade e, no empate, a mais antiga:
+# nunca verificadas, depois alteradas ou com falha e, por último, sucessos velhos.
+class PriorityScheduler:
+    def __init__(self, ttl=DEFAULT_RESULT_TTL, failure_ttl=DEFAULT_FAILURE_TTL):
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self._waiting = []   # heap (due_at, seq, prioridade, url)
+        self._ready = []     # heap (prioridade, due_at, seq, url)
+        self._entries = {}   # url -> seq da entrada válida (entradas antigas nos heaps são ignoradas)
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def schedule(self, url, priority, due_at=0.0):
+        seq = next(self._seq)
+        self._entries[url] = seq
+        heapq.heappush(self._waiting, (due_at, seq, priority, url))
+
+    def discard(self, url):
+        self._entries.pop(url, None)
+
+    # Agenda uma URL a partir do último resultado em cache (CachedResult ou None)
+    def schedule_from_cache(self, url, cached, changed=False):
+        if cached is None or cached.status_code is None:
+            self.schedule(url, PRIORITY_NEW)
+        elif changed:
+            self.schedule(url, PRIORITY_CHANGED)
+        elif cached.status_code == 200:
+            self.schedule(url, PRIORITY_STALE, cached.checked_at + self.ttl)
+        else:
+            self.schedule(url, PRIORITY_CHANGED, cached.checked_at + self.failure_ttl)
+
+    # Reagenda a URL depois de uma verificação: sucessos voltam após o TTL, falhas após failure_ttl.
+    # retry_after antecipa a próxima tentativa (ex.: URL não verificada porque o circuito do domínio estava aberto).
+    def record(self, url, status_code, now=None, retry_after=None):
+        if url not in self._entries:
+            return
+        now = now or time.time()
+        if retry_after is not None:
+            self.schedule(url, PRIORITY_CHANGED, now + retry_after)
+        elif status_code == 200:
+            self.schedule(url, PRIORITY_STALE, now + self.ttl)
+        else:
+            self.schedule(url, PRIORITY_CHANGED, now + self.failure_ttl)
+
+    def _promote(self, now):
+        while self._waiting and self._waiting[0][0] <= now:
+            due_at, seq, priority, url = heapq.heappop(self._waiting)
+            if self._entries.get(url) == seq:
+                heapq.heappush(self._ready, (priority, due_at, seq, url))
+
+    # Retorna até size URLs pendentes, na ordem de prioridade. As URLs retornadas saem da fila até record().
+    def next_batch(self, size, now=None):
+        self._promote(now or time.time())
+        batch = []
+        while self._ready and len(batch) < size:
+            priority, _due_at, seq, url = heapq.heappop(self._ready)
+            if self._entries.get(url) != seq:
+                continue
+            self._entries[url] = None  # Em verificação
+            batch.append((url, priority))
+        return batch
+
+    # Instante em que a próxima URL fica pendente (None se não houver nenhuma agendada)
+    def next_due(self):
+        if self._ready:
+            return 0.0
+        while self._waiting and self._entries.get(self._waiting[0][3]) != self._waiting[0][1]:
+            heapq.heappop(self._waiting)
+        return self._waiting[0][0] if self._waiting else None
+
+    # Quantidade de URLs agendadas por prioridade (para o log)
+    def counts(self):
+        counts = {}
+        for heap_entry in self._waiting:
+            due_at, seq, priority, url = heap_entry
+            if self._entries.get(url) == seq:
+                counts[priority] = counts.get(priority, 0) + 1
+        for priority, _due_at, seq, url in self._ready:
+            if self._entries.get(url) == seq:
+                counts[priority] = counts.get(priority, 0) + 1
+        return {PRIORITY_NAMES[priority]: count for priority, count in sorted(counts.items())}
+
+# Função para montar o agendador a partir do plano de trabalho e do cache de resultados.
+# changed_rules são as chaves gid:sid adicionadas/alteradas no último ruleset.
+def build_scheduler(plan, result_cache, changed_rules=None, ttl=DEFAULT_RESULT_TTL, failure_ttl=DEFAULT_FAILURE_TTL):
+    scheduler = PriorityScheduler(ttl, failure_ttl)
+    cached_results = {cached.url: cached for cached in result_cache.iter_results()}
+    for url, item in plan.items.items():
+        cached = cached_results.get(url)
+        changed = bool(changed_rules) and plan.touches_rules(url, changed_rules)
+        if cached is not None and not changed and cached.status_code is not None:
+            # Regra com revisão diferente da registrada no cache também conta como alterada
+            changed = any(
+                rev is not None and cached.rules.get(sid) not in (None, rev)
+                for sid, rev in item.rules.items()
+            )
+        scheduler.schedule_from_cache(url, cached, changed)
+    return scheduler
@@ -0,0 +1,81 @@
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium.common.exceptions import TimeoutException
+
+from concurrent_checker import url_host
+from run_metrics import record_error, BACKEND_SCREENSHOT
+
+# Configurações padrão da captura headless
+DEFAULT_SCREENSHOT_DIR = 'screenshot'
+DEFAULT_LOAD_TIMEOUT = 10   # Tempo máximo (s) de espera pelo evento load da página
+DEFAULT_CAPTURE_WORKERS = 4
+
+# Função para montar o caminho do arquivo de captura, no mesmo padrão de open_chrome_incognito
+def screenshot_path_for(url, screenshot_dir=DEFAULT_SCREENSHOT_DIR):
+    sanitized_url = re.sub(r'\W+', '_', url)  # Remove caracteres especiais da URL para usar no nome do arquivo
+    return os.path.join(screenshot_dir, f'screenshot_{sanitized_url}_{int(time.time())}.png')
+
+# Classe para capturar telas com navegadores headless do pool do Selenium.
+# Espera o evento load da página (limitado a load_timeout) em vez de um sleep fixo
+# e captura apenas a área visível da página, sem depender de um monitor real.
+# Com metrics (RunMetrics), o tempo de cada captura é registrado com o backend screenshot.
+# Com store (ScreenshotStore), as capturas vão para a loja endereçada por conteúdo em vez de screenshot_dir.
+class HeadlessScreenshotter:
+    def __init__(self, selenium_pool, screenshot_dir=DEFAULT_SCREENSHOT_DIR, load_timeout=DEFAULT_LOAD_TIMEOUT, max_workers=DEFAULT_CAPTURE_WORKERS, metrics=None, store=None):
+        self.selenium_pool = selenium_pool
+        self.screenshot_dir = screenshot_dir
+        self.load_timeout = load_timeout
+        self.max_workers = max(1, int(max_workers))
+        self.metrics = metrics
+        self.store = store
+
+    # Captura a tela de uma URL (sids são os SIDs das regras da URL, registrados na loja).
+    # Retorna o caminho do arquivo ou None em caso de erro.
+    def capture(self, url, sids=()):
+        if self.metrics is None:
+            return self._capture(url, sids)
+        with self.metrics.track(url, url_host(url), BACKEND_SCREENSHOT):
+            return self._capture(url, sids)
+
+    def _capture(self, url, sids=()):
+        if self.store is None:
+            os.makedirs(self.screenshot_dir, exist_ok=True)
+        try:
+            with self.selenium_pool.driver() as driver:
+                driver.set_page_load_timeout(self.load_timeout)
+                try:
+                    driver.get(url)  # Retorna quando o evento load é disparado
+                except TimeoutException:
+                    # Página lenta: interrompe o carregamento e captura o que já foi renderizado
+                    logging.info(f"Carregamento de {url} excedeu {self.load_timeout}s; capturando a página parcial.")
+                    driver.execute_script("window.stop();")
+
+                if self.store is not None:
+                    png_bytes = driver.get_screenshot_as_png()
+                else:
+                    screenshot_path = screenshot_path_for(url, self.screenshot_dir)
+                    if not driver.save_screenshot(screenshot_path):
+                        raise RuntimeError("o driver não gerou a captura")
+            if self.store is not None:
+                return self.store.add(url, png_bytes, sids).path
+        except Exception as e:
+            logging.error(f"Erro ao capturar a tela de {url}: {e}")
+            record_error(e)
+            return None
+
+        logging.info(f"Captura de tela salva em: {screenshot_path}")
+        return screenshot_path
+
+    # Captura várias URLs em paralelo. url_sids mapeia a URL para os SIDs das suas regras.
+    # Retorna o dicionário URL -> caminho (ou None).
+    def capture_many(self, urls, url_sids=None):
+        urls = list(urls)
+        if not urls:
+            return {}
+        url_sids = url_sids or {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as executor:
+            return dict(zip(urls, executor.map(lambda url: self.capture(url, url_sids.get(url, ())), urls)))
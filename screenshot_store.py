@@ -0,0 +1,243 @@
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from concurrent_checker import url_host
+
+# Pillow é opcional: sem ele, a loja deduplica apenas capturas idênticas e não gera miniaturas
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Configurações padrão da loja de capturas de tela
+DEFAULT_STORE_DIR = 'screenshot_store'
+DEFAULT_MAX_DISTANCE = 6             # Bits diferentes (de 64) do hash perceptual para considerar repetida uma captura do mesmo host
+DEFAULT_CROSS_HOST_DISTANCE = 2      # Limite, mais estreito, para capturas de hosts diferentes (None desliga)
+DEFAULT_THUMBNAIL_SIZE = (320, 200)
+DEFAULT_THUMBNAIL_QUALITY = 70       # Qualidade JPEG das miniaturas
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS captures (
+    sha256 TEXT PRIMARY KEY,
+    phash TEXT,
+    path TEXT NOT NULL,
+    thumbnail TEXT,
+    width INTEGER,
+    height INTEGER,
+    size INTEGER NOT NULL,
+    first_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS url_history (
+    url TEXT NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES captures(sha256),
+    sids TEXT NOT NULL DEFAULT '',
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    seen_count INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (url, sha256)
+);
+CREATE INDEX IF NOT EXISTS idx_url_history_sha256 ON url_history(sha256);
+'''
+
+# Hash perceptual (dHash de 64 bits): compara o brilho de pixels vizinhos em uma versão 9x8 em tons
+# de cinza. Imagens quase iguais (mesma página com relógio, anúncio ou compressão diferentes) têm
+# hashes a poucos bits de distância.
+def perceptual_hash(image):
+    small = image.convert('L').resize((9, 8), Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+# Captura armazenada: arquivo único (endereçado pelo SHA-256), hash perceptual e miniatura.
+# duplicate indica que a imagem recebida já existia (idêntica ou quase igual) e não foi gravada de novo.
+class StoredCapture:
+    __slots__ = ('sha256', 'path', 'thumbnail', 'phash', 'duplicate')
+
+    def __init__(self, sha256, path, thumbnail=None, phash=None, duplicate=False):
+        self.sha256 = sha256
+        self.path = path
+        self.thumbnail = thumbnail
+        self.phash = phash
+        self.duplicate = duplicate
+
+# Entrada do histórico de uma URL: uma captura única com o período em que foi vista
+class CaptureHistory:
+    __slots__ = ('url', 'sha256', 'path', 'thumbnail', 'sids', 'first_seen', 'last_seen', 'seen_count')
+
+    def __init__(self, url, sha256, path, thumbnail, sids, first_seen, last_seen, seen_count):
+        self.url = url
+        self.sha256 = sha256
+        self.path = path
+        self.thumbnail = thumbnail
+        self.sids = sids
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+        self.seen_count = seen_count
+
+# Loja de capturas de tela endereçada por conteúdo:
+# - cada imagem é gravada uma única vez em objects/<aa>/<sha256>.png;
+# - imagens quase iguais (hash perceptual) a uma já armazenada não são gravadas e apontam para ela. Entre
+#   hosts diferentes o limite é mais estreito (cross_host_distance): páginas praticamente iguais (domínio
+#   estacionado, página de erro da CDN) são compartilhadas, mas sites distintos que só têm o mesmo layout
+#   (templates parecidos) ficam acima dele e mantêm a própria captura;
+# - miniaturas JPEG em thumbnails/<aa>/<sha256>.jpg para revisão;
+# - index.sqlite3 liga cada URL (e seus SIDs) ao histórico de capturas únicas.
+class ScreenshotStore:
+    def __init__(self, root=DEFAULT_STORE_DIR, max_distance=DEFAULT_MAX_DISTANCE, thumbnail_size=DEFAULT_THUMBNAIL_SIZE, thumbnail_quality=DEFAULT_THUMBNAIL_QUALITY, cross_host_distance=DEFAULT_CROSS_HOST_DISTANCE):
+        self.root = root
+        self.max_distance = max_distance
+        self.cross_host_distance = cross_host_distance
+        self.thumbnail_size = thumbnail_size
+        self.thumbnail_quality = thumbnail_quality
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, 'index.sqlite3'), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        # Hashes perceptuais em memória para a busca de capturas quase iguais: todos e, por host, os das
+        # capturas ligadas a URLs do host
+        self._all_phashes = {
+            sha256: int(phash, 16)
+            for sha256, phash in self._conn.execute('SELECT sha256, phash FROM captures WHERE phash IS NOT NULL')
+        }
+        self._phashes = {}
+        for url, sha256 in self._conn.execute('SELECT DISTINCT url, sha256 FROM url_history'):
+            if sha256 in self._all_phashes:
+                self._phashes.setdefault(url_host(url), {})[sha256] = self._all_phashes[sha256]
+        if Image is None:
+            logging.warning("Pillow não instalado: capturas quase iguais não serão deduplicadas e não haverá miniaturas.")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _object_path(self, kind, sha256, extension):
+        return os.path.join(self.root, kind, sha256[:2], f"{sha256}.{extension}")
+
+    @staticmethod
+    def _write_file(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _thumbnail_bytes(self, image):
+        thumbnail = image.convert('RGB')
+        thumbnail.thumbnail(self.thumbnail_size)
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, 'JPEG', quality=self.thumbnail_quality, optimize=True)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _closest(phash, candidates, max_distance):
+        best = None
+        best_distance = max_distance + 1
+        for sha256, other in candidates.items():
+            distance = hamming_distance(phash, other)
+            if distance < best_distance:
+                best, best_distance = sha256, distance
+        return best
+
+    # Captura mais próxima do hash perceptual: do mesmo host, dentro de max_distance, ou de qualquer
+    # host, dentro de cross_host_distance
+    def _nearest(self, host, phash):
+        best = self._closest(phash, self._phashes.get(host, {}), self.max_distance)
+        if best is None and self.cross_host_distance is not None:
+            best = self._closest(phash, self._all_phashes, self.cross_host_distance)
+        return best
+
+    # Função para guardar a captura (PNG) de uma URL. Retorna o StoredCapture da imagem armazenada,
+    # que pode ser uma captura anterior idêntica ou quase igual (ver cross_host_distance).
+    def add(self, url, png_bytes, sids=(), captured_at=None):
+        captured_at = captured_at or time.time()
+        sha256 = hashlib.sha256(png_bytes).hexdigest()
+        host = url_host(url)
+
+        # Decodificação e hash perceptual fora da trava (capturas chegam de várias threads)
+        image = phash = None
+        if Image is not None:
+            try:
+                image = Image.open(io.BytesIO(png_bytes))
+                image.load()
+                phash = perceptual_hash(image)
+            except Exception as e:
+                logging.warning(f"Não foi possível ler a captura de {url}: {e}")
+                image = None
+
+        with self._lock:
+            row = self._conn.execute('SELECT sha256, path, thumbnail, phash FROM captures WHERE sha256 = ?', (sha256,)).fetchone()
+            if row is None and phash is not None:
+                similar = self._nearest(host, phash)
+                if similar is not None:
+                    row = self._conn.execute('SELECT sha256, path, thumbnail, phash FROM captures WHERE sha256 = ?', (similar,)).fetchone()
+
+            if row is None:
+                path = self._object_path('objects', sha256, 'png')
+                self._write_file(path, png_bytes)
+                thumbnail = None
+                if image is not None:
+                    thumbnail_bytes = self._thumbnail_bytes(image)
+                    thumbnail = self._object_path('thumbnails', sha256, 'jpg')
+                    self._write_file(thumbnail, thumbnail_bytes)
+                phash_text = f"{phash:016x}" if phash is not None else None
+                self._conn.execute(
+                    'INSERT OR IGNORE INTO captures (sha256, phash, path, thumbnail, width, height, size, first_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (sha256, phash_text, path, thumbnail, image.width if image else None, image.height if image else None, len(png_bytes), captured_at),
+                )
+                stored = StoredCapture(sha256, path, thumbnail, phash_text)
+            else:
+                stored = StoredCapture(row[0], row[1], row[2], row[3], duplicate=True)
+            if stored.phash is not None:
+                self._all_phashes[stored.sha256] = int(stored.phash, 16)
+                self._phashes.setdefault(host, {})[stored.sha256] = int(stored.phash, 16)
+
+            # Histórico da URL: uma linha por captura única, com primeira/última vez e quantas vezes foi vista
+            sids_text = ','.join(str(sid) for sid in sorted(sids, key=str))
+            self._conn.execute(
+                'INSERT INTO url_history (url, sha256, sids, first_seen, last_seen) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(url, sha256) DO UPDATE SET last_seen = excluded.last_seen, seen_count = seen_count + 1, '
+                'sids = CASE WHEN excluded.sids != \'\' THEN excluded.sids ELSE sids END',
+                (url, stored.sha256, sids_text, captured_at, captured_at),
+            )
+            self._conn.commit()
+
+        if stored.duplicate:
+            logging.info(f"Captura de {url} igual ou quase igual a {stored.path}; imagem não gravada de novo.")
+        else:
+            logging.info(f"Captura de tela salva em: {stored.path}")
+        return stored
+
+    # Histórico de capturas únicas de uma URL, da mais antiga para a mais recente
+    def history(self, url):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT h.url, h.sha256, c.path, c.thumbnail, h.sids, h.first_seen, h.last_seen, h.seen_count '
+                'FROM url_history h JOIN captures c ON c.sha256 = h.sha256 WHERE h.url = ? ORDER BY h.first_seen',
+                (url,),
+            ).fetchall()
+        return [CaptureHistory(*row) for row in rows]
+
+    # URLs ligadas a uma captura (ex.: a mesma página de domínio estacionado em vários sites)
+    def urls_for(self, sha256):
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT url FROM url_history WHERE sha256 = ? ORDER BY url', (sha256,))]
@@ -0,0 +1,109 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+# Valores padrão do pool de drivers do Selenium
+DEFAULT_POOL_SIZE = 4      # Quantidade de navegadores headless mantidos abertos
+DEFAULT_MAX_PAGES = 50     # Páginas por driver antes de reciclá-lo
+
+# Driver do pool com o contador de páginas já abertas
+class _PooledDriver:
+    __slots__ = ('driver', 'pages')
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+# Classe que mantém N drivers do Selenium de longa duração, reciclando-os após
+# um número de páginas ou quando o navegador deixa de responder
+class SeleniumDriverPool:
+    def __init__(self, driver_factory, size=DEFAULT_POOL_SIZE, max_pages=DEFAULT_MAX_PAGES):
+        self.driver_factory = driver_factory
+        self.size = max(1, int(size))
+        self.max_pages = max(1, int(max_pages))
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._all = set()
+        self._closed = False
+
+    # Obtém um driver livre, criando um novo se o pool ainda não estiver cheio
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pooled = _PooledDriver(self.driver_factory())
+                with self._lock:
+                    self._all.add(pooled)
+                logging.info(f"Novo driver do Selenium iniciado ({len(self._all)}/{self.size}).")
+                return pooled
+        except Exception:
+            self._slots.release()
+            raise
+
+    # Devolve o driver ao pool ou o descarta se atingiu o limite de páginas ou travou
+    def _release(self, pooled, healthy):
+        try:
+            pooled.pages += 1
+            if self._closed or not healthy or pooled.pages >= self.max_pages or not _driver_alive(pooled.driver):
+                if healthy and not self._closed and pooled.pages >= self.max_pages:
+                    logging.info(f"Reciclando driver do Selenium após {pooled.pages} páginas.")
+                elif not self._closed:
+                    logging.warning("Driver do Selenium não responde mais e será reiniciado.")
+                self._discard(pooled)
+            else:
+                self._idle.put(pooled)
+        finally:
+            self._slots.release()
+
+    def _discard(self, pooled):
+        with self._lock:
+            self._all.discard(pooled)
+        _quit_driver(pooled.driver)
+
+    # Context manager que empresta um driver do pool
+    @contextmanager
+    def driver(self):
+        if self._closed:
+            raise RuntimeError("Pool de drivers do Selenium já foi fechado.")
+        pooled = self._acquire()
+        healthy = False
+        try:
+            yield pooled.driver
+            healthy = True
+        finally:
+            self._release(pooled, healthy)
+
+    # Fecha todos os drivers do pool
+    def close(self):
+        self._closed = True
+        with self._lock:
+            drivers = list(self._all)
+            self._all.clear()
+        for pooled in drivers:
+            _quit_driver(pooled.driver)
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+# Verifica se a sessão do navegador continua ativa
+def _driver_alive(driver):
+    try:
+        driver.window_handles
+        return True
+    except Exception:
+        return False
+
+def _quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        logging.warning(f"Erro ao encerrar driver do Selenium: {e}")
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tarfile
+import time
+import urllib.error
+import urllib.request
+
+# Arquivo com o estado do último download de cada feed (ETag, Last-Modified e checksum)
+DEFAULT_STATE_PATH = 'feed_state.json'
+DOWNLOAD_TIMEOUT = 60
+STAGING_DIR_NAME = '.staging'
+EXTRACTED_MARKER_NAME = '.feed.json'  # Registro, dentro da pasta de extração, do feed extraído nela
+
+# Leitor que calcula o SHA-256 do conteúdo à medida que ele é lido do download
+class _HashingReader:
+    def __init__(self, stream):
+        self.stream = stream
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.sha256.update(data)
+        self.size += len(data)
+        return data
+
+    # Lê o restante do conteúdo para que o checksum cubra o arquivo inteiro
+    def drain(self, chunk_size=64 * 1024):
+        while self.read(chunk_size):
+            pass
+
+def load_feed_state(path=DEFAULT_STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_feed_state(state, path=DEFAULT_STATE_PATH):
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+# Registro do feed cujas regras estão extraídas em extract_path (URL, checksum e arquivos), ou None
+def load_extracted_marker(extract_path):
+    path = os.path.join(extract_path, EXTRACTED_MARKER_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_extracted_marker(extract_path, url, checksum, files):
+    with open(os.path.join(extract_path, EXTRACTED_MARKER_NAME), 'w') as f:
+        json.dump({'url': url, 'sha256': checksum, 'files': sorted(files)}, f, indent=2, sort_keys=True)
+
+# Indica se extract_path tem as regras do feed url com o checksum registrado: o registro da pasta
+# aponta para o mesmo feed e todos os arquivos .rules extraídos dele ainda existem
+def has_extracted_feed(extract_path, url, checksum):
+    marker = load_extracted_marker(extract_path)
+    if marker is None or marker.get('url') != url or marker.get('sha256') != checksum:
+        return False
+    files = marker.get('files') or []
+    return bool(files) and all(os.path.isfile(os.path.join(extract_path, name)) for name in files)
+
+# Retorna o caminho de destino de um membro do tar, ou None se ele tentar sair do diretório de destino
+def _safe_member_path(member_name, dest_dir):
+    if os.path.isabs(member_name) or '..' in member_name.replace('\\', '/').split('/'):
+        return None
+    dest_root = os.path.realpath(dest_dir)
+    target = os.path.realpath(os.path.join(dest_root, member_name))
+    if os.path.commonpath([dest_root, target]) != dest_root:
+        return None
+    return target
+
+# Extrai, em streaming, apenas os arquivos regulares .rules do tar.gz para dest_dir.
+# Retorna a lista de caminhos relativos extraídos.
+def extract_rules_stream(fileobj, dest_dir):
+    extracted = []
+    with tarfile.open(fileobj=fileobj, mode='r|gz') as tar:
+        for member in tar:
+            if not member.isreg() or not member.name.endswith('.rules'):
+                continue
+            target = _safe_member_path(member.name, dest_dir)
+            if target is None:
+                logging.warning(f"Membro ignorado por tentar sair do diretório de destino: {member.name}")
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            source = tar.extractfile(member)
+            with open(target, 'wb') as f_out:
+                shutil.copyfileobj(source, f_out)
+            extracted.append(os.path.relpath(target, os.path.realpath(dest_dir)))
+    return extracted
+
+# Substitui os arquivos .rules de extract_path pelos extraídos em staging_dir
+def _replace_rules_files(staging_dir, extract_path, extracted):
+    for root, _dirs, files in os.walk(extract_path):
+        if os.path.realpath(root).startswith(os.path.realpath(staging_dir)):
+            continue
+        for name in files:
+            if name.endswith('.rules'):
+                os.remove(os.path.join(root, name))
+    for relative_path in extracted:
+        target = os.path.join(extract_path, relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(os.path.join(staging_dir, relative_path), target)
+
+# Função para baixar o feed de assinaturas de forma condicional e em streaming.
+# - Envia If-None-Match / If-Modified-Since e não baixa nada se o servidor responder 304;
+# - extrai apenas os membros .rules enquanto o download acontece, com proteção contra path traversal;
+# - calcula o SHA-256 do conteúdo e descarta a extração se ele for igual ao do último download.
+# Como produção e homologação compartilham extract_path, o download condicional e o descarte por
+# checksum só valem quando a pasta ainda tem as regras desse mesmo feed (ver has_extracted_feed).
+# Retorna True se as regras em extract_path foram atualizadas.
+def fetch_signatures(url, extract_path, state_path=DEFAULT_STATE_PATH, timeout=DOWNLOAD_TIMEOUT):
+    state = load_feed_state(state_path)
+    feed_state = state.get(url, {})
+    current = has_extracted_feed(extract_path, url, feed_state.get('sha256'))
+
+    request = urllib.request.Request(url)
+    if current and feed_state.get('etag'):
+        request.add_header('If-None-Match', feed_state['etag'])
+    if current and feed_state.get('last_modified'):
+        request.add_header('If-Modified-Since', feed_state['last_modified'])
+
+    os.makedirs(extract_path, exist_ok=True)
+    staging_dir = os.path.join(extract_path, STAGING_DIR_NAME)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    try:
+        try:
+            response = urllib.request.urlopen(request, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                logging.info(f"Feed {url} sem alterações (HTTP 304); download ignorado.")
+                return False
+            raise
+
+        with response:
+            reader = _HashingReader(response)
+            extracted = extract_rules_stream(reader, staging_dir)
+            reader.drain()
+            checksum = reader.sha256.hexdigest()
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+        changed = not current or checksum != feed_state.get('sha256')
+        if changed:
+            _replace_rules_files(staging_dir, extract_path, extracted)
+            save_extracted_marker(extract_path, url, checksum, extracted)
+            logging.info(f"Feed {url} atualizado: {len(extracted)} arquivos .rules extraídos ({reader.size} bytes, sha256 {checksum}).")
+        else:
+            logging.info(f"Feed {url} com o mesmo checksum do último download; regras mantidas.")
+
+        state[url] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'sha256': checksum,
+            'size': reader.size,
+            'files': sorted(extracted),
+            'fetched_at': time.time(),
+        }
+        save_feed_state(state, state_path)
+        return changed
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
@@ -3,15 +3,36 @@ import requests
 import os
 import logging
 import subprocess
+import argparse
+import signal
+import socket
+import threading
+import multiprocessing
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.chrome.options import Options
-from datetime import datetime
 import time
+import glob
 import mss
-import tarfile
-import urllib.request
 import shutil
+from concurrent_checker import check_urls_concurrently, url_host, DEFAULT_MAX_WORKERS, DEFAULT_MAX_PER_HOST
+from selenium_pool import SeleniumDriverPool, DEFAULT_POOL_SIZE, DEFAULT_MAX_PAGES
+from host_guard import get_host_guard, configure_host_guard, CircuitOpenError, CIRCUIT_OPEN_STATUS, DEFAULT_MAX_RETRIES, DEFAULT_FAILURE_THRESHOLD, DEFAULT_CIRCUIT_RESET
+from dns_prefetch import DnsCache, prefetch_hosts, UNRESOLVED_STATUS, UNRESOLVED_DESCRIPTION, DEFAULT_DNS_TTL
+from result_cache import ResultCache, import_legacy_files, DEFAULT_CACHE_PATH, DEFAULT_RESULT_TTL
+from work_plan import build_work_plan, SOURCE_HOMOLOGATED, SOURCE_CUSTOM
+from screenshot_capture import HeadlessScreenshotter, DEFAULT_LOAD_TIMEOUT, DEFAULT_CAPTURE_WORKERS
+from screenshot_store import ScreenshotStore, DEFAULT_STORE_DIR
+from results_writer import ResultsWriter, render_legacy_files, write_csv, DEFAULT_RECORDS_NAME, DEFAULT_CSV_NAME
+from results_index import ResultsIndex, DEFAULT_INDEX_PATH, DEFAULT_HISTORY_RUNS, DEFAULT_QUERY_LIMIT
+from ruleset_manifest import update_ruleset_manifest, load_diff
+from signature_download import fetch_signatures
+from tiered_checker import TieredChecker, CheckResult, as_check_result, browser_verdict, TIER_DNS
+from scheduler import build_scheduler, RateLimiter, DEFAULT_RATE, DEFAULT_BATCH_SIZE, DEFAULT_FEED_INTERVAL, DEFAULT_WRITE_INTERVAL, DEFAULT_FAILURE_TTL
+from work_queue import WorkQueue, CHECKED_BY_CACHE, ABANDONED_DESCRIPTION, DEFAULT_QUEUE_PATH, DEFAULT_LEASE_SECONDS, DEFAULT_LEASE_BATCH
+from ip_rules import check_ip_rules, write_ip_report, DEFAULT_PROBE_PORTS, DEFAULT_CONNECT_TIMEOUT, DEFAULT_PROBE_WORKERS, DEFAULT_REPORT_PATH as DEFAULT_IP_REPORT_PATH
+from rule_hosts import iter_rule_hosts, check_rule_hosts, DEFAULT_HOST_BATCH, DEFAULT_REPORT_PATH as DEFAULT_HOSTS_REPORT_PATH
+from run_metrics import RunMetrics, record_error, write_json_summary, write_prometheus_textfile, BACKEND_REQUESTS, BACKEND_SCREENSHOT, DEFAULT_SUMMARY_PATH, DEFAULT_PROMETHEUS_PATH
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -34,10 +55,6 @@ status_descriptions = {
     504: "Tempo Limite da Conexão Excedido",
 }
 
-# Regex para extrair URL e SID das regras Suricata
-url_pattern = re.compile(r'reference:url,([^;]+);')
-sid_pattern = re.compile(r'sid:(\d+);')
-
 # Função para carregar URLs de um arquivo em uma lista
 def load_urls_from_file(file_path):
     if os.path.exists(file_path):
@@ -66,24 +83,18 @@ def download_and_extract_signatures(is_production=True):
         url = 'http://wsutm.bluepex.com/fapp_homologation/rules0.tar.gz'
         print("Modo de Homologação selecionado.")
 
-    download_path = 'fapp_rules/rules0.tar.gz'
     extract_path = 'fapp_rules'
 
-    # Cria o diretório fapp_rules, se não existir
-    os.makedirs(extract_path, exist_ok=True)
-
-    # Faz o download do arquivo
+    # Faz o download condicional (ETag/If-Modified-Since) extraindo apenas os arquivos .rules durante o download
     print(f"Baixando assinaturas de {url}...")
-    urllib.request.urlretrieve(url, download_path)
-
-    # Extrai o arquivo tar.gz
-    print("Extraindo o arquivo rules0.tar.gz...")
-    with tarfile.open(download_path, "r:gz") as tar:
-        tar.extractall(path=extract_path)
+    if not fetch_signatures(url, extract_path):
+        print("As assinaturas não mudaram desde o último download.")
+        return False
 
-    # Remove o arquivo tar.gz
-    print("Removendo arquivo rules0.tar.gz...")
-    os.remove(download_path)
+    # Compara o novo ruleset com o anterior por (sid, rev, url) e grava o relatório de diferenças
+    diff = update_ruleset_manifest(extract_path)
+    print(f"Regras adicionadas: {len(diff.added)}, alteradas: {len(diff.changed)}, removidas: {len(diff.removed)} (detalhes em ruleset_diff.txt).")
+    return True
 
 # Pergunta ao usuário se deseja fazer o download das assinaturas
 def ask_to_download_signatures():
@@ -97,20 +108,23 @@ def ask_to_download_signatures():
         print("Opção inválida. Nenhum download será realizado.")
         return
 
-    # Limpa as pastas rules e rules_navigate após o download
+    clean_rules_directories()
+
+# Função para limpar as pastas rules e rules_navigate após o download
+def clean_rules_directories():
     clean_directory('rules')
     clean_directory('rules_navigate')
     print("Pastas 'rules' e 'rules_navigate' limpas.")
 
+# Função para listar os arquivos .rules extraídos na pasta fapp_rules
+def list_extracted_rules(extracted_path='fapp_rules'):
+    if not os.path.isdir(extracted_path):
+        return []
+    return [f for f in os.listdir(extracted_path) if f.endswith('.rules')]
 
 # Função para listar os arquivos extraídos e perguntar qual homologar
 def ask_category_to_approve():
-    extracted_path = 'fapp_rules'
-    homologated_path = 'rules'
-    navigate_path = 'rules_navigate'
-
-    # Lista os arquivos na pasta fapp_rules
-    files = [f for f in os.listdir(extracted_path) if f.endswith('.rules')]
+    files = list_extracted_rules()
 
     if not files:
         print("Nenhum arquivo de regras encontrado na pasta 'fapp_rules'.")
@@ -133,6 +147,15 @@ def ask_category_to_approve():
         print("Entrada inválida.")
         return
 
+    approve_category(selected_file, files)
+
+# Função para homologar uma categoria: copia o arquivo escolhido para 'rules' e os demais para 'rules_navigate'
+def approve_category(selected_file, files=None, extracted_path='fapp_rules', homologated_path='rules', navigate_path='rules_navigate'):
+    files = files if files is not None else list_extracted_rules(extracted_path)
+    if selected_file not in files:
+        logging.error(f"Arquivo {selected_file} não encontrado na pasta '{extracted_path}'.")
+        return False
+
     # Copia o arquivo homologado para a pasta 'rules'
     os.makedirs(homologated_path, exist_ok=True)
     shutil.copy(os.path.join(extracted_path, selected_file), homologated_path)
@@ -144,6 +167,21 @@ def ask_category_to_approve():
         if file != selected_file:
             shutil.copy(os.path.join(extracted_path, file), navigate_path)
             print(f"Arquivo {file} copiado para a pasta 'rules_navigate'.")
+    return True
+
+# Função para atualizar as assinaturas sem interação (modo daemon ou linha de comando): baixa o feed
+# de produção ('p') ou homologação ('h') e, se ele mudou (ou ainda não há regras homologadas),
+# refaz as pastas rules e rules_navigate com a categoria informada. Retorna True se as regras mudaram.
+def update_signatures(mode, selected_file):
+    downloaded = download_and_extract_signatures(is_production=(mode == 'p'))
+    if not downloaded and has_rules_files('rules'):
+        return False
+    clean_rules_directories()
+    return approve_category(selected_file)
+
+# Indica se a pasta tem algum arquivo .rules
+def has_rules_files(directory):
+    return os.path.isdir(directory) and any(f.endswith('.rules') for f in os.listdir(directory))
 
 # Função para configurar o ChromeDriver para o Selenium
 def configure_selenium():
@@ -156,41 +194,55 @@ def configure_selenium():
     chrome_options.add_argument("--headless")  # Executa o Chrome sem abrir a janela
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--window-size=1366,768")  # Tamanho da área visível nas capturas de tela headless
     
     service = ChromeService(driver_path)  # Substitua 'Service' por 'ChromeService'
     driver = webdriver.Chrome(service=service, options=chrome_options)
+    driver.set_page_load_timeout(30)  # Evita que uma página travada prenda o driver do pool
     
     return driver
 
 # Função para verificar o status do site usando Requests
+# Usa a sessão compartilhada (keep-alive) e lê apenas os cabeçalhos da resposta, com timeout adaptativo
+# por host, retentativas de erros transitórios e circuit breaker por domínio (host_guard.py)
 def check_url_with_requests(url):
     try:
-        response = requests.get(url, timeout=5)
-        status_code = response.status_code
+        probe = get_host_guard().probe(url)
+        status_code = probe.status_code
         description = status_descriptions.get(status_code, "Erro desconhecido")
+        if probe.redirects:
+            chain = " -> ".join(f"{hop_url} ({hop_code})" for hop_code, hop_url in probe.redirects)
+            logging.debug(f"Redirecionamentos de {url}: {chain} -> {probe.url} ({status_code})")
+    except CircuitOpenError as e:
+        status_code = CIRCUIT_OPEN_STATUS
+        description = str(e)
+        record_error(e)
     except requests.exceptions.RequestException as e:
         status_code = "Erro"
         description = str(e)
         logging.error(f"Erro ao acessar URL: {url}, Erro: {description}")
+        record_error(e)
 
     return status_code, description
 
 # Função para verificar o status do site usando Selenium
+# A página só é considerada 200 se carregar sem erro do navegador e sem página de desafio anti-bot
 def check_url_with_selenium(url, driver):
     try:
-        driver.get(url)
-        status_code = 200  # Se carregar corretamente, assume código 200
-        description = status_descriptions.get(200)
+        status_code, description = browser_verdict(url, driver)
     except Exception as e:
+        record_error(e)
         status_code = "Erro"
         description = str(e)
     
     return status_code, description
 
-# Função para abrir o Chrome no modo incógnito e capturar a tela
-def open_chrome_incognito(url, screenshot_dir='screenshot', use_flatpak=False, monitor_number=2):
+# Função para abrir o Chrome no modo incógnito e capturar a tela.
+# Com store (ScreenshotStore), a captura vai para a loja endereçada por conteúdo, com os SIDs da URL.
+def open_chrome_incognito(url, screenshot_dir='screenshot', use_flatpak=False, monitor_number=2, store=None, sids=()):
     try:
-        os.makedirs(screenshot_dir, exist_ok=True)
+        if store is None:
+            os.makedirs(screenshot_dir, exist_ok=True)
 
         # Inicia o Chrome dependendo do valor de use_flatpak
         if use_flatpak:
@@ -209,11 +261,16 @@ def open_chrome_incognito(url, screenshot_dir='screenshot', use_flatpak=False, m
                 monitor_number = 1  # Se o monitor escolhido não existir, usa o primeiro
 
             monitor = monitors[monitor_number]  # Seleciona o monitor
+            sct_img = sct.grab(monitor)
+            if store is not None:
+                store.add(url, mss.tools.to_png(sct_img.rgb, sct_img.size), sids)
+                process.terminate()
+                return
+
             sanitized_url = re.sub(r'\W+', '_', url)  # Remove caracteres especiais da URL para usar no nome do arquivo
             screenshot_path = os.path.join(screenshot_dir, f'screenshot_{sanitized_url}_{int(time.time())}.png')
 
-            # Captura a tela do monitor selecionado
-            sct_img = sct.grab(monitor)
+            # Grava a captura do monitor selecionado
             mss.tools.to_png(sct_img.rgb, sct_img.size, output=screenshot_path)
 
             print(f"Captura de tela salva em: {screenshot_path}")
@@ -222,179 +279,831 @@ def open_chrome_incognito(url, screenshot_dir='screenshot', use_flatpak=False, m
     except Exception as e:
         logging.error(f"Erro ao abrir o Chrome no modo incógnito ou capturar a tela: {e}")
 
-# Função para processar arquivo .rules e extrair URLs
-def extract_urls_from_rules(file_input, file_output, analytics_file, analytics_200_file, processed_urls_file, debug_mode, use_selenium, real_mode, use_flatpak, test_false_positives, except_urls):
-    processed_urls = set()
-
-    if os.path.exists(processed_urls_file):
-        with open(processed_urls_file, 'r') as f_processed:
-            processed_urls.update(line.strip() for line in f_processed.readlines())
-
-    driver = None  # Inicializando a variável 'driver' para evitar referência antes de definição
-
-    with open(file_input, 'r') as f_in, open(file_output, 'w') as f_out, \
-         open(analytics_file, 'a') as f_analytics, open(analytics_200_file, 'a') as f_analytics_200, \
-         open(processed_urls_file, 'a') as f_processed:
-
-        rules = f_in.readlines()
-        for rule in rules:
-            url_match = url_pattern.search(rule)
-            sid_match = sid_pattern.search(rule)
-
-            if url_match and sid_match:
-                url = url_match.group(1).strip()
-                full_url = f"https://{url}"
-                sid = sid_match.group(1)
-
-                if full_url in processed_urls:
-                    logging.info(f"URL já processada: {full_url}")
-                    continue
-                
-                if full_url in except_urls:
-                    logging.info(f"URL ignorada por estar na lista de exceções (except_urls): {full_url}")
-                    continue
-
-                logging.info(f"Processando URL: {full_url} (SID: {sid})")
-
-                if use_selenium:
-                    driver = configure_selenium()
-                    status_code, description = check_url_with_selenium(full_url, driver)
-                    driver.quit()
-                else:
-                    status_code, description = check_url_with_requests(full_url)
-
-                if debug_mode:
-                    print(f"SID: {sid} - {full_url} - Código: {status_code}, Descrição: {description}")
-
-                # Grava a informação no arquivo de saída
-                f_out.write(f"SID: {sid} - {full_url} - Código: {status_code}, Descrição: {description}\n")
-
-                if status_code == 200:
-                    f_analytics_200.write(f"SID: {sid} - {full_url} - Código: {status_code}, Descrição: {description}\n")
-                    
-                    # Se o código de status for 200 e o real_mode estiver ativado, captura a tela
-                    if real_mode:
-                        open_chrome_incognito(full_url, use_flatpak=use_flatpak)
-                else:
-                    f_analytics.write(f"SID: {sid} - {full_url} - Código: {status_code}, Descrição: {description}\n")
-
-                processed_urls.add(full_url)
-                f_processed.write(f"{full_url}\n")
-
-    # Fechar o driver se ele foi usado
-    if driver is not None:
-        driver.quit()
-
-    # Se o parâmetro test_false_positives for True, faz o teste de falso positivo
-    if test_false_positives:
-        navigate_file = 'rules_navigate'
-        analytics_error_file = 'Navigate_Error.txt'
-        analytics_200_file = 'Navigate_200.txt'
-
-        for file_input in os.listdir(navigate_file):
-            if file_input.endswith('.rules'):
-                input_path = os.path.join(navigate_file, file_input)
-                output_path = os.path.join('result', f"result_{file_input}.txt")
-                logging.info(f"Testando falso positivo em {file_input}...")
-
-                # No teste de falso positivo, apenas utiliza requests, sem real_mode ou Selenium
-                extract_urls_from_rules(input_path, output_path, analytics_error_file, analytics_200_file, processed_urls_file, debug_mode, use_selenium=False, real_mode=False, use_flatpak=use_flatpak, test_false_positives=False, except_urls=except_urls)
-
-# Função para navegar em URLs customizadas após rules_navigate
-def navigate_custom_urls(use_selenium, real_mode, use_flatpak, debug_mode):
-    custom_urls_file = 'custom_urls_navigate.txt'
-    processed_urls_file = 'processed_urls.txt'
-    
-    custom_urls = load_urls_from_file(custom_urls_file)
-    processed_urls = load_urls_from_file(processed_urls_file)
-    
-    # Remove URLs que já foram processadas
-    custom_urls -= processed_urls
-    
-    if not custom_urls:
-        logging.info("Nenhuma URL personalizada para processar.")
-        return
-    
-    logging.info("Navegando em URLs personalizadas.")
-    
-    driver = None
-    for url in custom_urls:
-        full_url = f"https://{url}"
-        logging.info(f"Processando URL personalizada: {full_url}")
-
-        if full_url in except_urls:
-            logging.info(f"URL personalizada ignorada por estar na lista de exceções (except_urls): {full_url}")
-            continue
-
-        if use_selenium:
-            driver = configure_selenium()
-            status_code, description = check_url_with_selenium(full_url, driver)
-            driver.quit()
+# Função para escolher a função de verificação usada pelo motor concorrente: apenas Requests ou,
+# com use_selenium, a verificação em camadas (sondagem HTTP para todas as URLs e o navegador
+# do pool apenas para as que parecem exigir um navegador real)
+def build_check_function(use_selenium, selenium_pool=None):
+    if not use_selenium:
+        return check_url_with_requests
+    return TieredChecker(status_descriptions, selenium_pool)
+
+# Função para separar as URLs cujo host não resolve no DNS, que já recebem o resultado final
+# sem passar pela verificação HTTP
+def split_unresolvable_urls(urls, dns_cache):
+    unresolvable_hosts = prefetch_hosts({url_host(url) for url in urls}, dns_cache)
+    results = {}
+    resolvable = []
+    for url in urls:
+        if url_host(url) in unresolvable_hosts:
+            results[url] = CheckResult(UNRESOLVED_STATUS, UNRESOLVED_DESCRIPTION, TIER_DNS)
+        else:
+            resolvable.append(url)
+    return results, resolvable
+
+# Função para verificar um conjunto de URLs únicas, cada uma uma única vez.
+# url_rules mapeia cada URL para o dicionário SID -> rev das regras que a referenciam.
+# Reaproveita o cache, descarta hosts sem DNS, verifica o restante em paralelo e grava no cache.
+# Com browser_urls, apenas essas URLs usam o Selenium e a captura de tela do real_mode; as demais
+# usam somente requests. Com metrics (RunMetrics), registra as fases de cada verificação.
+# Com use_cache=False, verifica todas as URLs mesmo com resultado válido em cache (modo daemon);
+# com rate_limiter (RateLimiter), cada verificação espera uma ficha antes de começar e, com stop_event,
+# as URLs que ainda esperam ficha quando ele é acionado não são verificadas nem entram no resultado. Com
+# screenshot_store (ScreenshotStore), as capturas do Chrome do desktop vão para a loja de capturas.
+# Com on_result (ex.: ResultsWriter.emit), cada resultado é entregue assim que fica pronto, com o
+# CheckTiming da verificação quando há métricas. Retorna o dicionário URL -> CheckResult.
+def check_unique_urls(url_rules, result_cache, debug_mode, use_selenium, real_mode, use_flatpak, max_workers=DEFAULT_MAX_WORKERS, max_per_host=DEFAULT_MAX_PER_HOST, selenium_pool=None, dns_cache=None, screenshotter=None, browser_urls=None, metrics=None, use_cache=True, rate_limiter=None, screenshot_store=None, on_result=None, stop_event=None):
+    results = {}
+    to_check = []
+    for full_url, sid_revs in url_rules.items():
+        cached = result_cache.get_fresh(full_url, sid_revs) if use_cache else None
+        if cached is not None:
+            logging.info(f"Resultado em cache para {full_url}, verificado em {time.strftime('%Y-%m-%d %H:%M', time.localtime(cached.checked_at))}")
+            results[full_url] = CheckResult(cached.status_code, cached.description, cached.tier)
+            if on_result is not None:
+                on_result(full_url, results[full_url], cached=True, checked_at=cached.checked_at)
         else:
-            status_code, description = check_url_with_requests(full_url)
+            to_check.append(full_url)
+
+    if metrics is not None:
+        metrics.count('cache', len(results))
+
+    if not to_check:
+        return results
+
+    # Hosts que não resolvem no DNS são registrados imediatamente, sem requisição HTTP
+    dns_cache = dns_cache or DnsCache()
+    checked, resolvable_urls = split_unresolvable_urls(to_check, dns_cache)
+    if metrics is not None:
+        metrics.count('dns', len(checked))
+    if on_result is not None:
+        for full_url, result in checked.items():
+            on_result(full_url, result)
+
+    def uses_browser(url):
+        return browser_urls is None or url in browser_urls
+
+    # Sem um pool recebido do chamador, cria um pool temporário apenas para esta verificação
+    use_selenium = use_selenium and any(uses_browser(url) for url in resolvable_urls)
+    own_pool = use_selenium and selenium_pool is None
+    if own_pool:
+        selenium_pool = SeleniumDriverPool(configure_selenium)
+
+    to_capture = []
+    timings = {}  # URL -> CheckTiming, para entregar os tempos junto com o resultado
+    try:
+        browser_check = build_check_function(use_selenium, selenium_pool)
+
+        def check_func(url):
+            check = browser_check if uses_browser(url) else check_url_with_requests
+            if rate_limiter is not None and not rate_limiter.acquire(stop_event):
+                return None  # Encerramento pedido enquanto esperava a ficha
+            if metrics is None:
+                return check(url)
+            host = url_host(url)
+            with metrics.track(url, host, BACKEND_REQUESTS, dns_cache.resolve_seconds.get(host)) as timing:
+                result = as_check_result(check(url))
+                timing.status_code = result.status_code
+                timings[url] = timing
+                return result
+
+        for full_url, result in check_urls_concurrently(resolvable_urls, check_func, max_workers, max_per_host):
+            if result is None:
+                continue
+            result = as_check_result(result)
+            sids = ",".join(url_rules[full_url]) or "-"
+            logging.info(f"URL verificada: {full_url} (SID: {sids}, camada: {result.tier})")
+            if debug_mode:
+                print(f"SID: {sids} - {full_url} - Código: {result.status_code}, Descrição: {result.description}")
+
+            # Se o código de status for 200 e o real_mode estiver ativado, captura a tela
+            if real_mode and result.status_code == 200 and uses_browser(full_url):
+                to_capture.append(full_url)
+
+            checked[full_url] = result
+            if on_result is not None:
+                on_result(full_url, result, timings.pop(full_url, None))
+    finally:
+        if own_pool:
+            selenium_pool.close()
+
+    capture_screenshots(to_capture, use_flatpak, screenshotter, metrics, url_rules, screenshot_store)
+
+    # URLs não verificadas por circuito aberto não vão para o cache e são verificadas de novo na próxima execução.
+    # Sem result_cache (workers de uma execução particionada), os resultados ficam apenas na fila de trabalho.
+    if result_cache is not None:
+        result_cache.store_many(
+            (full_url, result.status_code, result.description, url_rules[full_url], None, result.tier)
+            for full_url, result in checked.items() if result.status_code != CIRCUIT_OPEN_STATUS
+        )
+    results.update(checked)
+    return results
+
+# Função para capturar a tela das URLs com código 200 no real_mode: em paralelo com navegadores
+# headless (screenshotter) ou, sem ele, abrindo o Chrome do desktop para cada URL.
+# url_rules (URL -> SID -> rev) liga cada captura da loja (store) aos SIDs das regras da URL.
+def capture_screenshots(urls, use_flatpak, screenshotter=None, metrics=None, url_rules=None, store=None):
+    url_sids = {url: tuple((url_rules or {}).get(url, {})) for url in urls}
+    if screenshotter is not None:
+        screenshotter.capture_many(urls, url_sids)
+    else:
+        for url in urls:
+            if metrics is None:
+                open_chrome_incognito(url, use_flatpak=use_flatpak, store=store, sids=url_sids[url])
+                continue
+            with metrics.track(url, url_host(url), BACKEND_SCREENSHOT):
+                open_chrome_incognito(url, use_flatpak=use_flatpak, store=store, sids=url_sids[url])
+
+# Função para montar o plano de trabalho em uma única etapa: lê rules/, rules_navigate/ (apenas no
+# teste de falso positivo), custom_urls_navigate.txt e except_urls.txt uma única vez
+def plan_work(input_dir='rules', navigate_dir='rules_navigate', custom_urls_file='custom_urls_navigate.txt', except_urls_file='except_urls.txt', test_false_positives=False):
+    rules_paths = [os.path.join(input_dir, f) for f in sorted(os.listdir(input_dir)) if f.endswith('.rules')]
+    navigate_paths = []
+    if test_false_positives and os.path.isdir(navigate_dir):
+        navigate_paths = [os.path.join(navigate_dir, f) for f in sorted(os.listdir(navigate_dir)) if f.endswith('.rules')]
+    custom_urls = [f"https://{url}" for url in sorted(load_urls_from_file(custom_urls_file))]
+
+    plan = build_work_plan(rules_paths, navigate_paths, custom_urls, load_urls_from_file(except_urls_file))
+    logging.info(f"Plano de trabalho: {len(plan)} URLs únicas de {len(rules_paths)} arquivos em {input_dir}, "
+                 f"{len(navigate_paths)} em {navigate_dir} e {len(custom_urls)} URLs personalizadas.")
+    return plan
+
+# Função para verificar toda a fila do plano de trabalho em uma única passada.
+# URLs homologadas e personalizadas usam o Selenium e o real_mode conforme configurado; URLs que só
+# aparecem no teste de falso positivo (rules_navigate) usam apenas requests, sem captura de tela.
+# URLs com resultado válido em cache não são verificadas de novo, exceto as de regras em changed_rules
+# (chaves gid:sid adicionadas/alteradas no último download), sempre verificadas. Com use_cache=False,
+# todas são verificadas. on_result recebe cada resultado (ver check_unique_urls).
+# Retorna o dicionário URL -> CheckResult.
+def run_work_plan(plan, result_cache, debug_mode, use_selenium, real_mode, use_flatpak, max_workers=DEFAULT_MAX_WORKERS, max_per_host=DEFAULT_MAX_PER_HOST, selenium_pool=None, dns_cache=None, screenshotter=None, changed_rules=None, metrics=None, screenshot_store=None, on_result=None, use_cache=True):
+    url_results = {}
+    pending = {}
+    for item in plan.items.values():
+        changed = changed_rules is not None and item.rules and plan.touches_rules(item.url, changed_rules)
+        cached = result_cache.get_fresh(item.url, item.rules) if use_cache and not changed else None
+        if cached is None:
+            pending[item.url] = item.rules
+            continue
+        logging.info(f"Resultado em cache para {item.url}, verificado em {time.strftime('%Y-%m-%d %H:%M', time.localtime(cached.checked_at))}")
+        url_results[item.url] = CheckResult(cached.status_code, cached.description, cached.tier)
+        if on_result is not None:
+            on_result(item.url, url_results[item.url], cached=True, checked_at=cached.checked_at)
+    if metrics is not None:
+        metrics.count('cache', len(url_results))
+
+    # O cache já foi consultado acima: as URLs pendentes são todas verificadas
+    if pending:
+        browser_urls = {item.url for item in plan.items_for(SOURCE_HOMOLOGATED, SOURCE_CUSTOM)}
+        url_results.update(check_unique_urls(pending, result_cache, debug_mode, use_selenium, real_mode, use_flatpak, max_workers, max_per_host, selenium_pool, dns_cache, screenshotter, browser_urls, metrics, use_cache=False, screenshot_store=screenshot_store, on_result=on_result))
+    return url_results
+
+# Função para gerar, a partir do JSONL canônico da execução (records_path), os arquivos de texto
+# legados (result/result_*.txt, Analytics*.txt e Navigate_*.txt) e a versão CSV. Antes, o JSONL e os
+# arquivos de texto ainda não sobrescritos entram no índice de consultas (index_path)
+def render_results(plan, records_path, output_dir='result', analytics_file='Analytics.txt', analytics_200_file='Analytics_200.txt', navigate_error_file='Navigate_Error.txt', navigate_200_file='Navigate_200.txt', index_path=DEFAULT_INDEX_PATH):
+    if index_path:
+        update_results_index(index_path, records_path)
+    render_legacy_files(plan, records_path, output_dir, analytics_file, analytics_200_file, navigate_error_file, navigate_200_file)
+    write_csv(records_path, os.path.join(output_dir, DEFAULT_CSV_NAME))
+
+# Função para atualizar o índice de consultas com as regras e os resultados novos. Uma falha no índice
+# não interrompe a verificação.
+def update_results_index(index_path=DEFAULT_INDEX_PATH, records_path=os.path.join('result', DEFAULT_RECORDS_NAME)):
+    try:
+        with ResultsIndex(index_path) as index:
+            return index.update(records_path=records_path)
+    except Exception as e:
+        logging.error(f"Erro ao atualizar o índice de consultas {index_path}: {e}")
+        return None
 
-        if debug_mode:
-            print(f"URL: {full_url} - Código: {status_code}, Descrição: {description}")
-        
-        if real_mode and status_code == 200:
-            open_chrome_incognito(full_url, use_flatpak=use_flatpak)
+# Função para recriar os arquivos de análise apenas com o cabeçalho
+def reset_analytics_files(analytics_file='Analytics.txt', analytics_200_file='Analytics_200.txt'):
+    with open(analytics_file, 'w') as f_analytics:
+        f_analytics.write("URLs com erro ou código diferente de 200:\n")
 
-        with open(processed_urls_file, 'a') as f_processed:
-            f_processed.write(f"{full_url}\n")
+    with open(analytics_200_file, 'w') as f_analytics_200:
+        f_analytics_200.write("URLs com código 200 Sucesso:\n")
 
-    # Fechar o driver se ele foi usado
-    if driver is not None:
-        driver.quit()
+# Função para abrir o cache de resultados por URL; na primeira execução importa os arquivos legados
+# (processed_urls_*.txt e arquivos de resultado) antes que sejam sobrescritos
+def open_result_cache(result_cache_path=DEFAULT_CACHE_PATH, result_ttl=DEFAULT_RESULT_TTL, output_dir='result', analytics_file='Analytics.txt', analytics_200_file='Analytics_200.txt'):
+    result_cache = ResultCache(result_cache_path, ttl=result_ttl)
+    if len(result_cache) == 0:
+        import_legacy_files(
+            result_cache,
+            processed_files=sorted(glob.glob('processed_urls*.txt')),
+            result_files=sorted(glob.glob(os.path.join(output_dir, 'result_*.txt'))) + ['Navigate_200.txt', 'Navigate_Error.txt', analytics_file, analytics_200_file],
+        )
+    return result_cache
 
 # Função para processar todos os arquivos .rules e custom_urls_navigate.txt
-def process_all_rules_files(debug_mode=False, use_selenium=False, real_mode=False, use_flatpak=False, test_false_positives=False):
+def process_all_rules_files(debug_mode=False, use_selenium=False, real_mode=False, use_flatpak=False, test_false_positives=False, max_workers=DEFAULT_MAX_WORKERS, max_per_host=DEFAULT_MAX_PER_HOST, selenium_pool_size=DEFAULT_POOL_SIZE, selenium_max_pages=DEFAULT_MAX_PAGES, dns_resolver=None, dns_ttl=DEFAULT_DNS_TTL, result_cache_path=DEFAULT_CACHE_PATH, result_ttl=DEFAULT_RESULT_TTL, screenshot_mode='desktop', screenshot_workers=DEFAULT_CAPTURE_WORKERS, screenshot_load_timeout=DEFAULT_LOAD_TIMEOUT, only_changed=True, metrics_path=DEFAULT_SUMMARY_PATH, prometheus_path=DEFAULT_PROMETHEUS_PATH, max_retries=DEFAULT_MAX_RETRIES, failure_threshold=DEFAULT_FAILURE_THRESHOLD, circuit_reset=DEFAULT_CIRCUIT_RESET, screenshot_store_dir=DEFAULT_STORE_DIR):
     input_dir = 'rules'
     output_dir = 'result'
     analytics_file = 'Analytics.txt'
     analytics_200_file = 'Analytics_200.txt'
-    processed_urls_file = 'processed_urls.txt'
-    except_urls_file = 'except_urls.txt'
 
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    with open(analytics_file, 'w') as f_analytics:
-        f_analytics.write("URLs com erro ou código diferente de 200:\n")
-    
-    with open(analytics_200_file, 'w') as f_analytics_200:
-        f_analytics_200.write("URLs com código 200 Sucesso:\n")
-
-    files = [f for f in os.listdir(input_dir) if f.endswith('.rules')]
-    if not files:
+    if not any(f.endswith('.rules') for f in os.listdir(input_dir)):
         logging.error("Nenhum arquivo .rules encontrado na pasta 'rules'.")
         return
 
-    # Carregar URLs a serem ignoradas
-    except_urls = load_urls_from_file(except_urls_file)
-
-    for file_input in files:
-        input_path = os.path.join(input_dir, file_input)
-        output_path = os.path.join(output_dir, f"result_{file_input}.txt")
-        logging.info(f"Processando {file_input}...")
-        extract_urls_from_rules(input_path, output_path, analytics_file, analytics_200_file, processed_urls_file, debug_mode, use_selenium, real_mode, use_flatpak, test_false_positives, except_urls)
-        logging.info(f"Resultado salvo em {output_path}")
+    result_cache = open_result_cache(result_cache_path, result_ttl, output_dir, analytics_file, analytics_200_file)
+    reset_analytics_files(analytics_file, analytics_200_file)
+
+    # Métricas da execução (fases de cada verificação), gravadas ao final em JSON e no formato do Prometheus
+    metrics = RunMetrics()
+
+    # Timeouts adaptativos, orçamento de retentativas e circuit breaker novos a cada execução
+    configure_host_guard(max_retries=max_retries, failure_threshold=failure_threshold, circuit_reset=circuit_reset)
+
+    # Planejamento: fila única e deduplicada de rules, rules_navigate e URLs personalizadas
+    plan = plan_work(input_dir, test_false_positives=test_false_positives)
+
+    # Pré-resolução de DNS de todos os hosts da fila antes de qualquer requisição HTTP
+    dns_cache = DnsCache(dns_resolver, ttl=dns_ttl)
+    prefetch_hosts({url_host(url) for url in plan.items}, dns_cache)
+
+    # Pool de navegadores headless compartilhado por todo o processamento
+    selenium_pool = SeleniumDriverPool(configure_selenium, selenium_pool_size, selenium_max_pages) if use_selenium else None
+
+    # No real_mode, as capturas vão para a loja endereçada por conteúdo (sem screenshot_store_dir, ficam
+    # soltas em screenshot/ como antes)
+    screenshot_store = ScreenshotStore(screenshot_store_dir) if real_mode and screenshot_store_dir else None
+
+    # No real_mode com screenshot_mode='headless', as capturas usam um pool próprio de navegadores headless
+    # em vez de abrir o Chrome do desktop e capturar o monitor inteiro
+    screenshot_pool = None
+    screenshotter = None
+    if real_mode and screenshot_mode == 'headless':
+        screenshot_pool = SeleniumDriverPool(configure_selenium, screenshot_workers, selenium_max_pages)
+        screenshotter = HeadlessScreenshotter(screenshot_pool, load_timeout=screenshot_load_timeout, max_workers=screenshot_workers, metrics=metrics, store=screenshot_store)
+
+    # Verificação incremental: as regras adicionadas ou alteradas no último download de assinaturas são
+    # sempre verificadas e as demais reaproveitam o cache; com only_changed=False, tudo é verificado
+    ruleset_diff = load_diff() if only_changed else None
+    changed_rules = ruleset_diff.to_check if ruleset_diff is not None else None
+    if changed_rules is not None:
+        logging.info(f"Verificação incremental: {len(changed_rules)} regras adicionadas ou alteradas no último ruleset.")
+    elif not only_changed:
+        logging.info("Verificação completa: o cache de resultados não é reaproveitado.")
+
+    # Cada resultado vira registros estruturados (um por SID) gravados em result/results.jsonl por uma
+    # única thread, à medida que as verificações terminam; os arquivos de texto são gerados a partir dele
+    records_path = os.path.join(output_dir, DEFAULT_RECORDS_NAME)
+    results_writer = ResultsWriter(records_path, plan)
+    try:
+        run_work_plan(plan, result_cache, debug_mode, use_selenium, real_mode, use_flatpak, max_workers, max_per_host, selenium_pool, dns_cache, screenshotter, changed_rules, metrics, screenshot_store, results_writer.emit, use_cache=only_changed)
+        results_writer.close()
+        render_results(plan, records_path, output_dir, analytics_file, analytics_200_file)
+    finally:
+        results_writer.close()
+        if selenium_pool is not None:
+            selenium_pool.close()
+        if screenshot_pool is not None:
+            screenshot_pool.close()
+        if screenshot_store is not None:
+            screenshot_store.close()
+        result_cache.close()
+        write_run_metrics(metrics, metrics_path, prometheus_path)
+
+# Função para gravar o resumo das métricas da execução (JSON e textfile do Prometheus) e mostrar os principais números
+def write_run_metrics(metrics, metrics_path=DEFAULT_SUMMARY_PATH, prometheus_path=DEFAULT_PROMETHEUS_PATH):
+    summary = metrics.summary()
+    if metrics_path:
+        write_json_summary(summary, metrics_path)
+    if prometheus_path:
+        write_prometheus_textfile(summary, prometheus_path)
+
+    total = summary['latency_seconds']['total']
+    logging.info(f"Métricas: {summary['urls_checked']} URLs verificadas em {summary['wall_seconds']:.1f}s "
+                 f"({summary['urls_per_second']:.2f} URLs/s), p50 {total['p50'] or 0:.2f}s, p95 {total['p95'] or 0:.2f}s, "
+                 f"{summary['timeouts']} timeouts. Resumo em {metrics_path} e {prometheus_path}")
+    for entry in summary['slowest_hosts'][:3]:
+        logging.info(f"Host lento: {entry['host']} ({entry['max']:.2f}s em {entry['count']} verificações)")
+    return summary
+
+# Função para colocar o plano de trabalho na fila de uma execução particionada em num_shards partições.
+# Como em run_work_plan, URLs com resultado válido em cache já entram concluídas, exceto as de regras
+# em changed_rules (ou todas, com use_cache=False); as demais ficam pendentes para os workers. options
+# são as opções de verificação gravadas na fila e lidas pelos workers, que podem rodar em outras máquinas.
+def enqueue_work_plan(plan, queue, num_shards, result_cache, changed_rules=None, options=None, use_cache=True):
+    browser_urls = {item.url for item in plan.items_for(SOURCE_HOMOLOGATED, SOURCE_CUSTOM)}
+    pending = []
+    done = []
+    for item in plan.items.values():
+        browser = item.url in browser_urls
+        changed = changed_rules is not None and item.rules and plan.touches_rules(item.url, changed_rules)
+        cached = result_cache.get_fresh(item.url, item.rules) if use_cache and not changed else None
+        if cached is not None:
+            done.append((item.url, item.rules, browser, cached.status_code, cached.description, cached.tier, cached.checked_at))
+        else:
+            pending.append((item.url, item.rules, browser))
+
+    queue.reset(num_shards, options)
+    queue.add_done(done)
+    queue.add_pending(pending)
+    logging.info(f"Fila de trabalho {queue.path}: {len(pending)} URLs pendentes em {num_shards} partições e {len(done)} com resultado em cache.")
+
+# Função para rodar um worker de uma execução particionada: recebe da fila lotes de URLs por concessão,
+# primeiro da própria partição (shard), verifica e grava os resultados na fila até não restar URL pendente.
+# Uma thread renova as concessões enquanto o worker trabalha; se ele morrer, elas expiram e outro worker
+# retoma as URLs. As opções de verificação vêm da fila, gravadas pelo coordenador.
+def run_shard_worker(queue_path=DEFAULT_QUEUE_PATH, shard=0, lease_seconds=DEFAULT_LEASE_SECONDS, lease_batch=DEFAULT_LEASE_BATCH, metrics_path=None, dns_resolver=None):
+    queue = WorkQueue(queue_path)
+    options = queue.options
+    owner = f"{socket.gethostname()}:{os.getpid()}:{shard}"
+    debug_mode = options.get('debug_mode', False)
+    use_selenium = options.get('use_selenium', False)
+    real_mode = options.get('real_mode', False)
+    max_workers = options.get('max_workers', DEFAULT_MAX_WORKERS)
+    max_per_host = options.get('max_per_host', DEFAULT_MAX_PER_HOST)
+    selenium_max_pages = options.get('selenium_max_pages', DEFAULT_MAX_PAGES)
+    screenshot_workers = options.get('screenshot_workers', DEFAULT_CAPTURE_WORKERS)
+
+    configure_host_guard(max_retries=options.get('max_retries', DEFAULT_MAX_RETRIES), failure_threshold=options.get('failure_threshold', DEFAULT_FAILURE_THRESHOLD), circuit_reset=options.get('circuit_reset', DEFAULT_CIRCUIT_RESET))
+    metrics = RunMetrics()
+    dns_cache = DnsCache(dns_resolver, ttl=options.get('dns_ttl', DEFAULT_DNS_TTL))
+
+    # Cada worker tem os seus navegadores; as capturas do real_mode sempre usam navegadores headless
+    selenium_pool = SeleniumDriverPool(configure_selenium, options.get('selenium_pool_size', DEFAULT_POOL_SIZE), selenium_max_pages) if use_selenium else None
+    screenshot_pool = None
+    screenshotter = None
+    screenshot_store = None
+    if real_mode:
+        screenshot_store_dir = options.get('screenshot_store_dir', DEFAULT_STORE_DIR)
+        screenshot_store = ScreenshotStore(screenshot_store_dir) if screenshot_store_dir else None
+        screenshot_pool = SeleniumDriverPool(configure_selenium, screenshot_workers, selenium_max_pages)
+        screenshotter = HeadlessScreenshotter(screenshot_pool, load_timeout=options.get('screenshot_load_timeout', DEFAULT_LOAD_TIMEOUT), max_workers=screenshot_workers, metrics=metrics, store=screenshot_store)
+
+    # A conexão SQLite não pode ser compartilhada entre threads: a renovação usa uma conexão própria
+    stop_heartbeat = threading.Event()
+
+    def heartbeat():
+        with WorkQueue(queue_path) as heartbeat_queue:
+            while not stop_heartbeat.wait(lease_seconds / 3):
+                heartbeat_queue.renew(owner, lease_seconds)
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    logging.info(f"Worker {owner} iniciado na partição {shard} de {queue.num_shards}.")
+    checked = 0
+    try:
+        while True:
+            items = queue.lease(owner, shard, lease_batch, lease_seconds)
+            if not items:
+                if queue.unfinished() == 0:
+                    break
+                # Restam apenas URLs concedidas a outros workers: espera que sejam concluídas ou que a concessão expire
+                time.sleep(min(lease_seconds, 5))
+                continue
+            url_rules = {item.url: item.rules for item in items}
+            browser_urls = {item.url for item in items if item.browser}
+            results = check_unique_urls(url_rules, None, debug_mode, use_selenium, real_mode, False, max_workers, max_per_host, selenium_pool, dns_cache, screenshotter, browser_urls, metrics, use_cache=False)
+            queue.complete(owner, results)
+            checked += len(results)
+    finally:
+        stop_heartbeat.set()
+        if selenium_pool is not None:
+            selenium_pool.close()
+        if screenshot_pool is not None:
+            screenshot_pool.close()
+        if screenshot_store is not None:
+            screenshot_store.close()
+        queue.close()
+        if metrics_path:
+            write_run_metrics(metrics, metrics_path, None)
+    logging.info(f"Worker {owner} concluído: {checked} URLs verificadas.")
+    return checked
+
+# Função para consolidar uma execução particionada: grava no cache os resultados verificados pelos workers
+# e gera result/result_*.txt e os arquivos de análise. Os arquivos seguem a ordem das regras do plano,
+# então o resultado não depende de qual worker verificou cada URL nem da ordem em que terminaram.
+def merge_work_queue(plan, queue, result_cache, output_dir='result', analytics_file='Analytics.txt', analytics_200_file='Analytics_200.txt'):
+    unfinished = queue.unfinished()
+    if unfinished:
+        logging.warning(f"{unfinished} URLs da fila ainda não foram concluídas e ficam fora do resultado.")
+
+    os.makedirs(output_dir, exist_ok=True)
+    records_path = os.path.join(output_dir, DEFAULT_RECORDS_NAME)
+    url_results = {}
+    checked = []
+    with ResultsWriter(records_path, plan) as results_writer:
+        for item in queue.results():
+            url_results[item.url] = CheckResult(item.status_code, item.description, item.tier)
+            results_writer.emit(item.url, url_results[item.url], cached=item.checked_by == CHECKED_BY_CACHE, checked_at=item.checked_at)
+            # Resultados vindos do cache, de circuito aberto ou de URLs abandonadas não vão para o cache
+            if item.checked_by == CHECKED_BY_CACHE or item.status_code == CIRCUIT_OPEN_STATUS or item.description == ABANDONED_DESCRIPTION:
+                continue
+            checked.append((item.url, item.status_code, item.description, item.rules, item.checked_at, item.tier))
+    result_cache.store_many(checked)
+
+    reset_analytics_files(analytics_file, analytics_200_file)
+    render_results(plan, records_path, output_dir, analytics_file, analytics_200_file)
+    logging.info(f"Consolidação: {len(url_results)} URLs com resultado, {len(checked)} verificadas pelos workers.")
+    return url_results
+
+# Função para processar as regras em uma execução particionada: monta o plano, coloca as URLs na fila
+# (queue_path) particionadas por hash do host em num_shards partições, roda um worker por partição em
+# processos separados e consolida os resultados. Com enqueue_only, só monta a fila, para os workers
+# rodarem em outras máquinas (--worker) e a consolidação depois (--merge).
+def process_sharded(num_shards, queue_path=DEFAULT_QUEUE_PATH, enqueue_only=False, debug_mode=False, use_selenium=False, real_mode=False, test_false_positives=False, max_workers=DEFAULT_MAX_WORKERS, max_per_host=DEFAULT_MAX_PER_HOST, selenium_pool_size=DEFAULT_POOL_SIZE, selenium_max_pages=DEFAULT_MAX_PAGES, dns_ttl=DEFAULT_DNS_TTL, result_cache_path=DEFAULT_CACHE_PATH, result_ttl=DEFAULT_RESULT_TTL, screenshot_workers=DEFAULT_CAPTURE_WORKERS, screenshot_load_timeout=DEFAULT_LOAD_TIMEOUT, only_changed=True, lease_seconds=DEFAULT_LEASE_SECONDS, max_retries=DEFAULT_MAX_RETRIES, failure_threshold=DEFAULT_FAILURE_THRESHOLD, circuit_reset=DEFAULT_CIRCUIT_RESET, screenshot_store_dir=DEFAULT_STORE_DIR):
+    input_dir = 'rules'
+    output_dir = 'result'
+    os.makedirs(output_dir, exist_ok=True)
 
-    # Navegar nas URLs personalizadas de custom_urls_navigate.txt
-    navigate_custom_urls(use_selenium, real_mode, use_flatpak, debug_mode)
+    if not has_rules_files(input_dir):
+        logging.error("Nenhum arquivo .rules encontrado na pasta 'rules'.")
+        return
 
-    current_date = datetime.now().strftime("%Y%m%d")
-    dated_processed_file = f"processed_urls_{current_date}.txt"
-    
-    if os.path.exists(processed_urls_file):
-        os.rename(processed_urls_file, dated_processed_file)
-        logging.info(f"Arquivo de URLs processadas salvo como: {dated_processed_file}")
-    
-    open(processed_urls_file, 'w').close()
+    result_cache = open_result_cache(result_cache_path, result_ttl, output_dir)
+    plan = plan_work(input_dir, test_false_positives=test_false_positives)
+    ruleset_diff = load_diff() if only_changed else None
+    changed_rules = ruleset_diff.to_check if ruleset_diff is not None else None
+
+    options = {
+        'debug_mode': debug_mode,
+        'use_selenium': use_selenium,
+        'real_mode': real_mode,
+        'test_false_positives': test_false_positives,
+        'max_workers': max_workers,
+        'max_per_host': max_per_host,
+        'selenium_pool_size': selenium_pool_size,
+        'selenium_max_pages': selenium_max_pages,
+        'dns_ttl': dns_ttl,
+        'screenshot_workers': screenshot_workers,
+        'screenshot_store_dir': screenshot_store_dir,
+        'screenshot_load_timeout': screenshot_load_timeout,
+        'max_retries': max_retries,
+        'failure_threshold': failure_threshold,
+        'circuit_reset': circuit_reset,
+    }
+    queue = WorkQueue(queue_path)
+    try:
+        enqueue_work_plan(plan, queue, num_shards, result_cache, changed_rules, options, use_cache=only_changed)
+        if enqueue_only:
+            logging.info(f"Fila pronta. Em cada máquina, rode --worker N --queue {queue_path} (N de 0 a {num_shards - 1}) e, ao final, --merge.")
+            return
 
-# Chama a função no início do programa
-ask_to_download_signatures()
-ask_category_to_approve()
-# Configurações
-process_all_rules_files(debug_mode=True, use_selenium=False, real_mode=True, use_flatpak=True, test_false_positives=True)
+        # Processos novos (spawn), sem herdar threads nem conexões do coordenador
+        context = multiprocessing.get_context('spawn')
+        workers = [
+            context.Process(target=run_shard_worker, args=(queue_path, shard, lease_seconds), kwargs={'metrics_path': f"run_metrics_shard{shard}.json"})
+            for shard in range(num_shards)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            if worker.exitcode != 0:
+                logging.error(f"Worker {worker.name} terminou com código {worker.exitcode}; as URLs dele foram retomadas pelos demais workers.")
+
+        merge_work_queue(plan, queue, result_cache, output_dir)
+    finally:
+        queue.close()
+        result_cache.close()
+
+# Função para consolidar uma fila já processada pelos workers (execução em várias máquinas)
+def merge_sharded(queue_path=DEFAULT_QUEUE_PATH, result_cache_path=DEFAULT_CACHE_PATH, result_ttl=DEFAULT_RESULT_TTL):
+    queue = WorkQueue(queue_path)
+    result_cache = open_result_cache(result_cache_path, result_ttl)
+    try:
+        plan = plan_work('rules', test_false_positives=queue.options.get('test_false_positives', False))
+        merge_work_queue(plan, queue, result_cache)
+    finally:
+        queue.close()
+        result_cache.close()
+
+# Função para listar os arquivos .rules das pastas, em ordem
+def list_rules_files(*directories):
+    paths = []
+    for directory in directories:
+        if os.path.isdir(directory):
+            paths.extend(os.path.join(directory, f) for f in sorted(os.listdir(directory)) if f.endswith('.rules'))
+    return paths
+
+# Função para verificar as listas de IPs de destino das regras de rules/ e rules_navigate/: conexões TCP
+# em 443/80 e comparação com o DNS atual do host de referência. Grava o relatório em result/.
+def process_ip_rules(input_dir='rules', navigate_dir='rules_navigate', output_dir='result', report_name=DEFAULT_IP_REPORT_PATH, dns_resolver=None, ports=DEFAULT_PROBE_PORTS, timeout=DEFAULT_CONNECT_TIMEOUT, max_workers=DEFAULT_PROBE_WORKERS):
+    paths = list_rules_files(input_dir, navigate_dir)
+    if not paths:
+        logging.error(f"Nenhum arquivo .rules encontrado nas pastas '{input_dir}' e '{navigate_dir}'.")
+        return None
+
+    os.makedirs(output_dir, exist_ok=True)
+    # Cache de DNS novo, para comparar com as respostas atuais
+    findings = check_ip_rules(paths, DnsCache(dns_resolver), ports, timeout, max_workers)
+    write_ip_report(findings, os.path.join(output_dir, report_name))
+    return findings
+
+# Função para verificar os hosts que as regras de rules/ e rules_navigate/ realmente detectam (content
+# de tls_sni e pcre ancorados), e não só o reference:url. Os hosts são derivados em streaming,
+# deduplicados entre todas as categorias e verificados em rodadas de batch_size hosts novos, com o
+# cache de resultados, o DNS e o motor concorrente de sempre. O relatório tem uma linha por SID e host.
+def process_rule_hosts(input_dir='rules', navigate_dir='rules_navigate', output_dir='result', report_name=DEFAULT_HOSTS_REPORT_PATH, except_urls_file='except_urls.txt', batch_size=DEFAULT_HOST_BATCH, debug_mode=False, use_selenium=False, max_workers=DEFAULT_MAX_WORKERS, max_per_host=DEFAULT_MAX_PER_HOST, selenium_pool_size=DEFAULT_POOL_SIZE, selenium_max_pages=DEFAULT_MAX_PAGES, dns_resolver=None, dns_ttl=DEFAULT_DNS_TTL, result_cache_path=DEFAULT_CACHE_PATH, result_ttl=DEFAULT_RESULT_TTL, max_retries=DEFAULT_MAX_RETRIES, failure_threshold=DEFAULT_FAILURE_THRESHOLD, circuit_reset=DEFAULT_CIRCUIT_RESET):
+    paths = list_rules_files(input_dir, navigate_dir)
+    if not paths:
+        logging.error(f"Nenhum arquivo .rules encontrado nas pastas '{input_dir}' e '{navigate_dir}'.")
+        return None
+
+    os.makedirs(output_dir, exist_ok=True)
+    except_urls = load_urls_from_file(except_urls_file)
+    result_cache = open_result_cache(result_cache_path, result_ttl, output_dir)
+    configure_host_guard(max_retries=max_retries, failure_threshold=failure_threshold, circuit_reset=circuit_reset)
+    dns_cache = DnsCache(dns_resolver, ttl=dns_ttl)
+    selenium_pool = SeleniumDriverPool(configure_selenium, selenium_pool_size, selenium_max_pages) if use_selenium else None
+
+    def check_batch(batch):
+        url_rules = {
+            f"https://{host}": {str(rule.sid): None if rule.rev is None else str(rule.rev) for rule in rules}
+            for host, rules in batch.items()
+        }
+        results = check_unique_urls(url_rules, result_cache, debug_mode, use_selenium, False, False, max_workers, max_per_host, selenium_pool, dns_cache)
+        return {host: results[f"https://{host}"] for host in batch}
+
+    pairs = ((rule, host, origin) for rule, host, origin in iter_rule_hosts(paths) if f"https://{host}" not in except_urls)
+    report_path = os.path.join(output_dir, report_name)
+    counts = {}
+    try:
+        with open(report_path, 'w') as f_report:
+            for rule, host, origin, result in check_rule_hosts(pairs, check_batch, batch_size):
+                if result.status_code == CIRCUIT_OPEN_STATUS:
+                    verdict = "Host não verificado"
+                elif isinstance(result.status_code, int):
+                    verdict = "Host ativo"
+                else:
+                    verdict = "Host inativo"
+                counts[verdict] = counts.get(verdict, 0) + 1
+                f_report.write(f"SID: {rule.sid} - {host} ({origin}) - Código: {result.status_code}, Descrição: {result.description} - {verdict}\n")
+    finally:
+        if selenium_pool is not None:
+            selenium_pool.close()
+        result_cache.close()
+
+    logging.info(f"Relatório dos hosts das regras salvo em {report_path} ({', '.join(f'{verdict}: {count}' for verdict, count in sorted(counts.items()))}).")
+    return counts
+
+# Função para regravar todos os arquivos de resultado do modo daemon com o último veredito de cada URL
+def write_daemon_results(plan, result_cache, output_dir='result', analytics_file='Analytics.txt', analytics_200_file='Analytics_200.txt', navigate_error_file='Navigate_Error.txt', navigate_200_file='Navigate_200.txt'):
+    os.makedirs(output_dir, exist_ok=True)
+    reset_analytics_files(analytics_file, analytics_200_file)
+    for path in (navigate_error_file, navigate_200_file):
+        open(path, 'w').close()
+
+    # Retrato do último veredito de cada URL do plano, regravado por inteiro a cada escrita
+    records_path = os.path.join(output_dir, DEFAULT_RECORDS_NAME)
+    with ResultsWriter(records_path, plan) as results_writer:
+        for cached in result_cache.iter_results():
+            if cached.url in plan.items and cached.status_code is not None:
+                results_writer.emit(cached.url, CheckResult(cached.status_code, cached.description, cached.tier), cached=True, checked_at=cached.checked_at)
+    render_results(plan, records_path, output_dir, analytics_file, analytics_200_file, navigate_error_file, navigate_200_file)
+
+# Função para (re)montar o plano de trabalho e o agendador do modo daemon. Com feed_mode, atualiza antes
+# as assinaturas. As regras adicionadas/alteradas do último ruleset só sobem de prioridade quando o feed
+# mudou (ou na primeira montagem), para não serem verificadas de novo a cada atualização.
+def refresh_daemon_plan(result_cache, feed_mode=None, approve_file=None, first=False, test_false_positives=False, result_ttl=DEFAULT_RESULT_TTL, failure_ttl=DEFAULT_FAILURE_TTL):
+    rules_changed = first
+    if feed_mode is not None:
+        try:
+            rules_changed = update_signatures(feed_mode, approve_file) or rules_changed
+        except Exception as e:
+            logging.error(f"Erro ao atualizar as assinaturas: {e}. Mantidas as regras atuais.")
+
+    if not has_rules_files('rules'):
+        logging.error("Nenhum arquivo .rules encontrado na pasta 'rules'.")
+        return None, None
+
+    plan = plan_work('rules', test_false_positives=test_false_positives)
+    ruleset_diff = load_diff() if rules_changed else None
+    changed_rules = ruleset_diff.to_check if ruleset_diff is not None else None
+    scheduler = build_scheduler(plan, result_cache, changed_rules, result_ttl, failure_ttl)
+    logging.info(f"Agendador: {len(scheduler)} URLs na fila por prioridade: {scheduler.counts()}")
+    return plan, scheduler
+
+# Função para rodar em modo daemon, sem interação: verifica as URLs continuamente em rodadas de até
+# batch_size URLs, na ordem do agendador (nunca verificadas, alteradas ou com falha, sucessos velhos),
+# com no máximo rate verificações iniciadas por segundo. O feed de assinaturas é atualizado a cada
+# feed_interval segundos e os arquivos de resultado e métricas são regravados a cada write_interval
+# segundos (ou quando a fila esvazia). Roda até stop_event ser acionado (SIGTERM/SIGINT).
+def run_daemon(feed_mode=None, approve_file=None, feed_interval=DEFAULT_FEED_INTERVAL, rate=DEFAULT_RATE, batch_size=DEFAULT_BATCH_SIZE, write_interval=DEFAULT_WRITE_INTERVAL, failure_ttl=DEFAULT_FAILURE_TTL, stop_event=None, debug_mode=False, use_selenium=False, real_mode=False, test_false_positives=False, max_workers=DEFAULT_MAX_WORKERS, max_per_host=DEFAULT_MAX_PER_HOST, selenium_pool_size=DEFAULT_POOL_SIZE, selenium_max_pages=DEFAULT_MAX_PAGES, dns_resolver=None, dns_ttl=DEFAULT_DNS_TTL, result_cache_path=DEFAULT_CACHE_PATH, result_ttl=DEFAULT_RESULT_TTL, screenshot_workers=DEFAULT_CAPTURE_WORKERS, screenshot_load_timeout=DEFAULT_LOAD_TIMEOUT, metrics_path=DEFAULT_SUMMARY_PATH, prometheus_path=DEFAULT_PROMETHEUS_PATH, max_retries=DEFAULT_MAX_RETRIES, failure_threshold=DEFAULT_FAILURE_THRESHOLD, circuit_reset=DEFAULT_CIRCUIT_RESET, screenshot_store_dir=DEFAULT_STORE_DIR):
+    stop_event = stop_event or threading.Event()
+    result_cache = ResultCache(result_cache_path, ttl=result_ttl)
+    metrics = RunMetrics()
+    configure_host_guard(max_retries=max_retries, failure_threshold=failure_threshold, circuit_reset=circuit_reset)
+    dns_cache = DnsCache(dns_resolver, ttl=dns_ttl)
+    rate_limiter = RateLimiter(rate, burst=max(1, min(max_workers, rate)))
+
+    # No daemon não há desktop: as capturas do real_mode sempre usam navegadores headless
+    selenium_pool = SeleniumDriverPool(configure_selenium, selenium_pool_size, selenium_max_pages) if use_selenium else None
+    screenshot_pool = None
+    screenshotter = None
+    screenshot_store = None
+    if real_mode:
+        screenshot_store = ScreenshotStore(screenshot_store_dir) if screenshot_store_dir else None
+        screenshot_pool = SeleniumDriverPool(configure_selenium, screenshot_workers, selenium_max_pages)
+        screenshotter = HeadlessScreenshotter(screenshot_pool, load_timeout=screenshot_load_timeout, max_workers=screenshot_workers, metrics=metrics, store=screenshot_store)
+
+    logging.info(f"Modo daemon: até {rate} verificações/s, rodadas de {batch_size} URLs, feed a cada {feed_interval}s.")
+    plan = None
+    scheduler = None
+    browser_urls = set()
+    first_refresh = True
+    next_refresh = 0.0
+    next_write = time.time() + write_interval
+    pending_write = False
+    try:
+        while not stop_event.is_set():
+            now = time.time()
+            if now >= next_refresh:
+                plan, scheduler = refresh_daemon_plan(result_cache, feed_mode, approve_file, first_refresh, test_false_positives, result_ttl, failure_ttl)
+                if plan is not None:
+                    browser_urls = {item.url for item in plan.items_for(SOURCE_HOMOLOGATED, SOURCE_CUSTOM)}
+                    pending_write = True
+                first_refresh = False
+                next_refresh = now + feed_interval
+
+            batch = scheduler.next_batch(batch_size, now) if scheduler is not None else []
+            if batch:
+                url_rules = {url: plan.items[url].rules for url, _priority in batch}
+                results = check_unique_urls(url_rules, result_cache, debug_mode, use_selenium, real_mode, False, max_workers, max_per_host, selenium_pool, dns_cache, screenshotter, browser_urls, metrics, use_cache=False, rate_limiter=rate_limiter, stop_event=stop_event)
+                checked_at = time.time()
+                for url, result in results.items():
+                    # URL não verificada por circuito aberto volta para a fila quando o circuito puder fechar
+                    retry_after = circuit_reset if result.status_code == CIRCUIT_OPEN_STATUS else None
+                    scheduler.record(url, result.status_code, checked_at, retry_after)
+                pending_write = True
+
+            now = time.time()
+            if pending_write and (not batch or now >= next_write):
+                write_daemon_results(plan, result_cache)
+                write_run_metrics(metrics, metrics_path, prometheus_path)
+                # As métricas de cada intervalo começam do zero, para não crescerem sem limite
+                metrics = RunMetrics()
+                if screenshotter is not None:
+                    screenshotter.metrics = metrics
+                pending_write = False
+                next_write = now + write_interval
+
+            if not batch:
+                next_due = scheduler.next_due() if scheduler is not None else None
+                wake_at = next_refresh if next_due is None else min(next_due, next_refresh)
+                stop_event.wait(max(wake_at - now, 1.0))
+    finally:
+        logging.info("Encerrando o modo daemon.")
+        if selenium_pool is not None:
+            selenium_pool.close()
+        if screenshot_pool is not None:
+            screenshot_pool.close()
+        if screenshot_store is not None:
+            screenshot_store.close()
+        if plan is not None and pending_write:
+            write_daemon_results(plan, result_cache)
+        write_run_metrics(metrics, metrics_path, prometheus_path)
+        result_cache.close()
+
+def format_time(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp)) if timestamp else '-'
+
+# Função para responder a uma consulta ao índice (subcomando query): regras por host, SID, classtype ou
+# último status, histórico das URLs e mudanças de status entre verificações. Com update, o índice é
+# atualizado antes (só os arquivos alterados são lidos). Retorna as linhas impressas.
+def run_query(index_path=DEFAULT_INDEX_PATH, host=None, sid=None, classtype=None, status=None, url=None, flips=False, since_days=None, runs=DEFAULT_HISTORY_RUNS, limit=DEFAULT_QUERY_LIMIT, update=True):
+    lines = []
+    with ResultsIndex(index_path) as index:
+        if update:
+            index.update()
+        start = time.perf_counter()
+
+        selectors = (
+            (host, index.rules_for_host, "host"),
+            (sid, index.rules_for_sid, "SID"),
+            (classtype, index.rules_for_classtype, "classtype"),
+            (status, index.rules_for_status, "último status"),
+        )
+        history_urls = [url] if url else []
+        for value, lookup, label in selectors:
+            if value is None:
+                continue
+            matches = lookup(value, limit)
+            lines.append(f"Regras com {label} {value}: {len(matches)}{' (limite atingido)' if len(matches) == limit else ''}")
+            for match in matches:
+                last = (f"Código: {match.status_code}, Descrição: {match.description} ({format_time(match.checked_at)})"
+                        if match.checked_at is not None else "nunca verificada")
+                lines.append(f"SID: {match.sid} ({match.path}, {match.origin}) - {match.url} - classtype: {match.classtype or '-'} - Último: {last}")
+                # Para host e SID, mostra também o histórico de cada URL
+                if label in ("host", "SID") and match.url not in history_urls:
+                    history_urls.append(match.url)
+
+        for history_url in history_urls:
+            observations = index.history(history_url, runs)
+            lines.append(f"Histórico de {history_url} (últimas {runs} verificações): {len(observations)}")
+            for observation in observations:
+                code = observation.status_code if observation.status_code is not None else "-"
+                description = observation.description or "apenas registrada como processada"
+                lines.append(f"    {format_time(observation.checked_at)} - Código: {code}, Descrição: {description}")
+
+        if flips:
+            since = time.time() - since_days * 86400 if since_days else None
+            found = index.status_flips(since, host, limit)
+            lines.append(f"URLs com mudança de status{f' nos últimos {since_days:g} dias' if since_days else ''}: {len(found)}")
+            for flip in found:
+                lines.append(f"{flip.url} - {flip.old_status} -> {flip.new_status} ({format_time(flip.previous_at)} -> {format_time(flip.changed_at)})")
+
+        elapsed = time.perf_counter() - start
+
+    for line in lines:
+        print(line)
+    logging.info(f"Consulta respondida em {elapsed * 1000:.1f} ms.")
+    return lines
+
+# Função para ler as opções da linha de comando. Sem --mode, pergunta o feed e a categoria como antes.
+# O subcomando query consulta o índice de regras e resultados.
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica as URLs referenciadas nas regras do Suricata.")
+    parser.add_argument('--daemon', action='store_true', help="verifica as URLs continuamente, sem interação")
+    parser.add_argument('--mode', choices=('p', 'h'), help="feed de produção (p) ou homologação (h), sem perguntar")
+    parser.add_argument('--approve', metavar='ARQUIVO', help="arquivo .rules de fapp_rules a homologar (obrigatório com --mode)")
+    parser.add_argument('--feed-interval', type=float, default=DEFAULT_FEED_INTERVAL, help="segundos entre atualizações do feed no modo daemon")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="máximo de verificações iniciadas por segundo no modo daemon")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="URLs por rodada no modo daemon")
+    parser.add_argument('--write-interval', type=float, default=DEFAULT_WRITE_INTERVAL, help="segundos entre regravações dos resultados no modo daemon")
+    parser.add_argument('--result-ttl', type=float, default=DEFAULT_RESULT_TTL, help="segundos até um sucesso ser verificado de novo")
+    parser.add_argument('--failure-ttl', type=float, default=DEFAULT_FAILURE_TTL, help="segundos até uma falha ser verificada de novo no modo daemon")
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument('--max-per-host', type=int, default=DEFAULT_MAX_PER_HOST)
+    parser.add_argument('--use-selenium', action='store_true', help="escala para o navegador as URLs que precisarem (modo daemon)")
+    parser.add_argument('--real-mode', action='store_true', help="captura a tela das URLs com código 200 (modo daemon)")
+    parser.add_argument('--test-false-positives', action='store_true', help="verifica também rules_navigate (modo daemon)")
+    parser.add_argument('--debug', action='store_true', help="mostra o resultado de cada URL (modo daemon)")
+    parser.add_argument('--shards', type=int, help="divide a verificação em SHARDS processos com uma fila de trabalho")
+    parser.add_argument('--enqueue', action='store_true', help="com --shards, apenas monta a fila para workers em outras máquinas")
+    parser.add_argument('--worker', type=int, metavar='SHARD', help="roda o worker da partição SHARD de uma fila já montada")
+    parser.add_argument('--merge', action='store_true', help="consolida os resultados de uma fila já processada")
+    parser.add_argument('--queue', default=DEFAULT_QUEUE_PATH, help="arquivo SQLite da fila de trabalho (em um diretório compartilhado entre as máquinas)")
+    parser.add_argument('--check-ips', action='store_true', help="verifica as listas de IPs das regras (TCP em 443/80 e DNS do host de referência)")
+    parser.add_argument('--check-hosts', action='store_true', help="verifica os hosts de tls_sni e pcre das regras, com resultado por SID")
+    parser.add_argument('--host-batch', type=int, default=DEFAULT_HOST_BATCH, help="hosts novos por rodada com --check-hosts")
+    parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS, help="prazo da concessão de um lote a um worker")
+
+    subparsers = parser.add_subparsers(dest='command')
+    query = subparsers.add_parser('query', help="consulta o índice de regras e resultados")
+    query.add_argument('--host', help="regras que referenciam o host, com o histórico das URLs")
+    query.add_argument('--sid', help="regras com o SID, com o histórico das URLs")
+    query.add_argument('--classtype', help="regras do classtype, com o último resultado")
+    query.add_argument('--status', help="regras cujas URLs têm o último status informado (ex.: 404, Erro, DNS)")
+    query.add_argument('--url', help="histórico de uma URL")
+    query.add_argument('--flips', action='store_true', help="URLs cujo status mudou entre verificações")
+    query.add_argument('--since', type=float, metavar='DIAS', help="com --flips, apenas mudanças dos últimos DIAS dias")
+    query.add_argument('--runs', type=int, default=DEFAULT_HISTORY_RUNS, help="verificações mostradas no histórico de cada URL")
+    query.add_argument('--limit', type=int, default=DEFAULT_QUERY_LIMIT, help="máximo de linhas por consulta")
+    query.add_argument('--index', default=DEFAULT_INDEX_PATH, help="arquivo SQLite do índice")
+    query.add_argument('--no-update', action='store_true', help="consulta o índice sem atualizá-lo antes")
+
+    args = parser.parse_args(argv)
+    if args.command == 'query' and not any((args.host, args.sid, args.classtype, args.status, args.url, args.flips)):
+        query.error("informe --host, --sid, --classtype, --status, --url ou --flips")
+    if args.mode is not None and args.approve is None:
+        parser.error("--approve é obrigatório com --mode")
+    if args.enqueue and not args.shards:
+        parser.error("--enqueue exige --shards")
+    return args
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    if args.command == 'query':
+        run_query(args.index, args.host, args.sid, args.classtype, args.status, args.url, args.flips, args.since, args.runs, args.limit, not args.no_update)
+    elif args.daemon:
+        stop_event = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop_event.set())
+        run_daemon(feed_mode=args.mode, approve_file=args.approve, feed_interval=args.feed_interval, rate=args.rate, batch_size=args.batch_size, write_interval=args.write_interval, failure_ttl=args.failure_ttl, stop_event=stop_event, debug_mode=args.debug, use_selenium=args.use_selenium, real_mode=args.real_mode, test_false_positives=args.test_false_positives, max_workers=args.max_workers, max_per_host=args.max_per_host, result_ttl=args.result_ttl)
+    elif args.check_ips:
+        if args.mode is not None:
+            update_signatures(args.mode, args.approve)
+        process_ip_rules()
+    elif args.check_hosts:
+        if args.mode is not None:
+            update_signatures(args.mode, args.approve)
+        process_rule_hosts(batch_size=args.host_batch, debug_mode=args.debug, use_selenium=args.use_selenium, max_workers=args.max_workers, max_per_host=args.max_per_host, result_ttl=args.result_ttl)
+    elif args.worker is not None:
+        run_shard_worker(args.queue, args.worker, args.lease_seconds)
+    elif args.merge:
+        merge_sharded(args.queue, result_ttl=args.result_ttl)
+        print("Consolidação concluída. Confira os arquivos resultantes na pasta 'result', o Analytics.txt e o Analytics_200.txt.")
+    else:
+        if args.mode is None:
+            # Chama a função no início do programa
+            ask_to_download_signatures()
+            ask_category_to_approve()
+        else:
+            update_signatures(args.mode, args.approve)
+        # Configurações
+        if args.shards:
+            process_sharded(args.shards, args.queue, args.enqueue, debug_mode=True, use_selenium=False, real_mode=True, test_false_positives=True, max_workers=args.max_workers, max_per_host=args.max_per_host, selenium_pool_size=4, selenium_max_pages=50, result_ttl=args.result_ttl, screenshot_workers=4, only_changed=True, lease_seconds=args.lease_seconds)
+        else:
+            process_all_rules_files(debug_mode=True, use_selenium=False, real_mode=True, use_flatpak=True, test_false_positives=True, max_workers=args.max_workers, max_per_host=args.max_per_host, selenium_pool_size=4, selenium_max_pages=50, result_ttl=args.result_ttl, screenshot_mode='headless', screenshot_workers=4, only_changed=True)
 
-print("Verificação concluída. Confira os arquivos resultantes na pasta 'result', o Analytics.txt e o Analytics_200.txt.")
+        if not args.enqueue:
+            print("Verificação concluída. Confira os arquivos resultantes na pasta 'result', o Analytics.txt e o Analytics_200.txt.")
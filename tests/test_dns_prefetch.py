@@ -0,0 +1,118 @@
+import socket
+
+import pytest
+
+import dns_prefetch
+import suricata_url_checker
+from dns_prefetch import DnsCache, StaticResolver, HostNotFound, prefetch_hosts, UNRESOLVED_STATUS
+from result_cache import ResultCache
+from tiered_checker import TIER_DNS
+
+# Relógio controlado pelo teste no lugar do time.monotonic do módulo
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(dns_prefetch.time, 'monotonic', fake)
+    return fake
+
+# Resolvedor que conta as chamadas por host antes de delegar
+class CountingResolver:
+    def __init__(self, resolver):
+        self.resolver = resolver
+        self.calls = {}
+
+    def __call__(self, host):
+        self.calls[host] = self.calls.get(host, 0) + 1
+        return self.resolver(host)
+
+def test_nxdomain_is_recorded_without_http(tmp_path, monkeypatch):
+    checked = []
+
+    def fake_check(url):
+        checked.append(url)
+        return 200, "Sucesso"
+
+    monkeypatch.setattr(suricata_url_checker, 'check_url_with_requests', fake_check)
+    dns_cache = DnsCache(StaticResolver({'ok.example': ['127.0.0.1']}))
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'))
+    try:
+        url_rules = {'https://ok.example/': {'1': '1'}, 'https://missing.example/a': {'2': '1'}}
+        results = suricata_url_checker.check_unique_urls(url_rules, cache, False, False, False, False, dns_cache=dns_cache, use_cache=False)
+    finally:
+        cache.close()
+
+    assert checked == ['https://ok.example/']
+    assert results['https://missing.example/a'].status_code == UNRESOLVED_STATUS
+    assert results['https://missing.example/a'].tier == TIER_DNS
+    assert results['https://ok.example/'].status_code == 200
+
+def test_prefetch_returns_unresolvable_hosts():
+    dns_cache = DnsCache(StaticResolver({'ok.example': ['127.0.0.1']}))
+    assert prefetch_hosts({'OK.example', 'missing.example', ''}, dns_cache) == {'missing.example'}
+
+def test_positive_entry_expires_at_ttl(clock):
+    resolver = CountingResolver(StaticResolver({'ok.example': ['127.0.0.1']}))
+    dns_cache = DnsCache(resolver, ttl=300, negative_ttl=60)
+
+    assert dns_cache.lookup('ok.example') == ['127.0.0.1']
+    clock.now += 299
+    assert dns_cache.lookup('ok.example') == ['127.0.0.1']
+    assert resolver.calls['ok.example'] == 1
+
+    clock.now += 2
+    assert dns_cache.lookup('ok.example') == ['127.0.0.1']
+    assert resolver.calls['ok.example'] == 2
+
+def test_negative_entry_expires_at_negative_ttl(clock):
+    resolver = CountingResolver(StaticResolver({}))
+    dns_cache = DnsCache(resolver, ttl=300, negative_ttl=60)
+
+    assert dns_cache.lookup('missing.example') is None
+    clock.now += 59
+    assert dns_cache.is_unresolvable('missing.example')
+    assert resolver.calls['missing.example'] == 1
+
+    clock.now += 2
+    with pytest.raises(KeyError):
+        dns_cache.cached('missing.example')
+    assert dns_cache.lookup('missing.example') is None
+    assert resolver.calls['missing.example'] == 2
+
+def test_temporary_failure_is_not_cached(clock):
+    answers = [socket.gaierror(socket.EAI_AGAIN, 'Temporary failure in name resolution'), ['127.0.0.1']]
+
+    def flaky_resolver(host):
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    dns_cache = DnsCache(flaky_resolver)
+
+    assert dns_cache.lookup('flaky.example') == []
+    assert not dns_cache.is_unresolvable('flaky.example')
+    assert dns_cache.lookup('flaky.example') == ['127.0.0.1']
+
+def test_temporary_failure_is_not_reported_as_unresolvable():
+    def failing_resolver(host):
+        raise OSError('network unreachable')
+
+    dns_cache = DnsCache(failing_resolver)
+    assert prefetch_hosts({'down.example'}, dns_cache) == set()
+    with pytest.raises(KeyError):
+        dns_cache.cached('down.example')
+
+def test_system_resolver_maps_noname_to_host_not_found(monkeypatch):
+    def getaddrinfo(*args, **kwargs):
+        raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+
+    monkeypatch.setattr(dns_prefetch.socket, 'getaddrinfo', getaddrinfo)
+    with pytest.raises(HostNotFound):
+        dns_prefetch.system_resolver('missing.example')
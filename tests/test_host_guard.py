@@ -0,0 +1,47 @@
+import pytest
+import requests
+
+import host_guard
+from host_guard import HostGuard, AdaptiveTimeouts, CircuitBreaker, RetryBudget, CircuitOpenError
+
+# Sondagem falsa: levanta ReadTimeout para os hosts em `slow` e registra o timeout de cada chamada
+class FakeProbe:
+    def __init__(self, slow):
+        self.slow = slow
+        self.timeouts = []
+
+    def __call__(self, url, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        if any(host in url for host in self.slow):
+            raise requests.exceptions.ReadTimeout(f"Read timed out. (read timeout={timeout})")
+        return object()
+
+@pytest.fixture
+def guard(monkeypatch):
+    fake = FakeProbe(slow={'slow.example.com'})
+    monkeypatch.setattr(host_guard, 'probe_url', fake)
+    monkeypatch.setattr(host_guard.time, 'sleep', lambda seconds: None)
+    timeouts = AdaptiveTimeouts(min_timeout=1.0, max_timeout=10.0)
+    # Orçamento vazio: nenhuma retentativa, como quando o orçamento da execução se esgota
+    budget = RetryBudget(ratio=0, min_retries=0)
+    guard = HostGuard(timeouts, budget, CircuitBreaker(failure_threshold=2), max_retries=2)
+    guard.fake = fake
+    return guard
+
+def test_shortened_read_timeout_does_not_open_circuit(guard):
+    # Um host irmão rápido deixa o timeout do domínio no mínimo
+    guard.probe('https://fast.example.com/')
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            guard.probe('https://slow.example.com/')
+    assert guard.fake.timeouts[1] < guard.timeouts.max_timeout
+    assert not guard.breaker.is_open('example.com')
+
+def test_read_timeout_at_max_timeout_counts_as_failure(guard):
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            guard.probe('https://slow.example.com/')
+    assert guard.fake.timeouts == [guard.timeouts.max_timeout] * 2
+    assert guard.breaker.is_open('example.com')
+    with pytest.raises(CircuitOpenError):
+        guard.probe('https://fast.example.com/')
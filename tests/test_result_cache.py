@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from result_cache import ResultCache, import_legacy_files, UNDATED_CHECKED_AT
+
+def write_lines(path, lines):
+    path.write_text(''.join(f"{line}\n" for line in lines))
+    return str(path)
+
+def test_undated_legacy_results_are_history_only(tmp_path):
+    dated = write_lines(tmp_path / 'processed_urls_20241002.txt', ['https://dated.example'])
+    undated = write_lines(tmp_path / 'processed_urls.txt', ['https://undated.example'])
+    navigate = write_lines(tmp_path / 'Navigate_Error.txt', [
+        'SID: 1 - https://dated.example - Código: 403, Descrição: Proibido',
+        'SID: 2 - https://result-only.example - Código: 200, Descrição: Sucesso',
+    ])
+    now = datetime(2024, 10, 2, 12).timestamp()
+
+    with ResultCache(str(tmp_path / 'cache.sqlite3'), ttl=24 * 60 * 60) as cache:
+        assert import_legacy_files(cache, [dated, undated], [navigate]) == 3
+
+        dated_entry = cache.get('https://dated.example')
+        assert dated_entry.checked_at == datetime(2024, 10, 2).timestamp()
+        assert dated_entry.status_code == 403
+        assert cache.get_fresh('https://dated.example', now=now) is not None
+
+        for url in ('https://undated.example', 'https://result-only.example'):
+            assert cache.get(url).checked_at == UNDATED_CHECKED_AT
+            assert cache.needs_check(url, now=now)
+        assert cache.get('https://result-only.example').status_code == 200
@@ -0,0 +1,89 @@
+import io
+import random
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from screenshot_store import ScreenshotStore, perceptual_hash, hamming_distance
+
+# PNG montado a partir de uma grade 9x8 de tons de cinza (cada célula vira um bloco de 20x20 pixels),
+# para controlar quais bits do dHash mudam entre duas imagens
+def grid_png(values):
+    small = Image.new('L', (9, 8))
+    small.putdata(values)
+    buffer = io.BytesIO()
+    small.resize((180, 160), Image.NEAREST).convert('RGB').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def base_grid(seed=1):
+    rng = random.Random(seed)
+    return [rng.randrange(0, 256) for _ in range(72)]
+
+# Grade com as células `cells` trocadas por um tom bem diferente
+def changed(values, cells):
+    values = list(values)
+    for index in cells:
+        values[index] = 255 - values[index]
+    return values
+
+def phash_of(png_bytes):
+    return perceptual_hash(Image.open(io.BytesIO(png_bytes)))
+
+# Primeira variação da grade base cujo dHash fica entre low e high bits de distância
+def variant(base, base_hash, cell_count, low, high):
+    rng = random.Random(cell_count)
+    for _ in range(500):
+        png = grid_png(changed(base, rng.sample(range(72), cell_count)))
+        if low <= hamming_distance(base_hash, phash_of(png)) <= high:
+            return png
+    raise AssertionError(f"nenhuma variação com {low}-{high} bits de distância")
+
+@pytest.fixture
+def images():
+    base = base_grid()
+    base_png = grid_png(base)
+    base_hash = phash_of(base_png)
+    return {
+        'base': base_png,
+        'near': variant(base, base_hash, 1, 1, 2),  # Quase idêntica: dentro do limite entre hosts
+        'far': variant(base, base_hash, 3, 4, 6),   # Mesmo layout: só dentro do limite do mesmo host
+    }
+
+def test_identical_capture_is_shared_across_hosts(tmp_path, images):
+    with ScreenshotStore(str(tmp_path / 'store'), cross_host_distance=None) as store:
+        first = store.add('https://a.example/', images['base'])
+        second = store.add('https://b.example/', images['base'])
+        assert second.duplicate and second.sha256 == first.sha256
+        assert store.urls_for(first.sha256) == ['https://a.example/', 'https://b.example/']
+
+def test_near_duplicate_within_host(tmp_path, images):
+    with ScreenshotStore(str(tmp_path / 'store')) as store:
+        first = store.add('https://a.example/x', images['base'])
+        second = store.add('https://a.example/y', images['far'])
+        assert second.duplicate and second.sha256 == first.sha256
+
+def test_cross_host_uses_tighter_distance(tmp_path, images):
+    with ScreenshotStore(str(tmp_path / 'store')) as store:
+        first = store.add('https://a.example/', images['base'])
+        near = store.add('https://parked.example/', images['near'])
+        far = store.add('https://other.example/', images['far'])
+        assert near.duplicate and near.sha256 == first.sha256
+        assert not far.duplicate and far.sha256 != first.sha256
+
+def test_cross_host_near_duplicates_can_be_disabled(tmp_path, images):
+    with ScreenshotStore(str(tmp_path / 'store'), cross_host_distance=None) as store:
+        first = store.add('https://a.example/', images['base'])
+        near = store.add('https://parked.example/', images['near'])
+        assert not near.duplicate and near.sha256 != first.sha256
+
+def test_hashes_reload_per_host(tmp_path, images):
+    root = str(tmp_path / 'store')
+    with ScreenshotStore(root, cross_host_distance=None) as store:
+        first = store.add('https://a.example/x', images['base'])
+    with ScreenshotStore(root, cross_host_distance=None) as store:
+        same_host = store.add('https://a.example/y', images['far'])
+        other_host = store.add('https://b.example/', images['far'])
+        assert same_host.sha256 == first.sha256
+        assert other_host.sha256 != first.sha256
+        assert [entry.sha256 for entry in store.history('https://a.example/y')] == [first.sha256]
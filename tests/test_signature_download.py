@@ -0,0 +1,143 @@
+import functools
+import http.server
+import io
+import os
+import tarfile
+import threading
+
+import pytest
+
+from signature_download import fetch_signatures, extract_rules_stream, load_feed_state, save_feed_state, _safe_member_path, EXTRACTED_MARKER_NAME
+
+# Monta um tar.gz em memória a partir de (nome, conteúdo); nomes com ".." ou absolutos são mantidos
+def make_tarball(members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as tar:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+# Servidor HTTP local que serve os feeds de `feeds` (caminho -> bytes) com ETag e responde 304 ao
+# If-None-Match igual; guarda os cabeçalhos de cada requisição recebida
+class FeedHandler(http.server.BaseHTTPRequestHandler):
+    def __init__(self, feeds, requests_seen, *args, **kwargs):
+        self.feeds = feeds
+        self.requests_seen = requests_seen
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests_seen.append((self.path, dict(self.headers)))
+        data = self.feeds.get(self.path)
+        if data is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = f'"{len(data)}-{hash(data) & 0xffffffff}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+@pytest.fixture
+def feed_server():
+    feeds = {}
+    requests_seen = []
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(FeedHandler, feeds, requests_seen))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.feeds = feeds
+    server.requests_seen = requests_seen
+    server.base_url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_304_skips_download(tmp_path, feed_server):
+    feed_server.feeds['/rules0.tar.gz'] = make_tarball([('a.rules', b'alert a\n')])
+    url = f"{feed_server.base_url}/rules0.tar.gz"
+    extract_path = str(tmp_path / 'fapp_rules')
+    state_path = str(tmp_path / 'feed_state.json')
+
+    assert fetch_signatures(url, extract_path, state_path) is True
+    assert fetch_signatures(url, extract_path, state_path) is False
+
+    first_headers, second_headers = (headers for _path, headers in feed_server.requests_seen)
+    assert 'If-None-Match' not in first_headers
+    assert second_headers['If-None-Match']
+    assert os.path.exists(os.path.join(extract_path, 'a.rules'))
+
+def test_same_checksum_is_unchanged(tmp_path, feed_server):
+    # Sem ETag no estado, o servidor responde 200 e o checksum igual decide
+    feed_server.feeds['/rules0.tar.gz'] = make_tarball([('a.rules', b'alert a\n')])
+    url = f"{feed_server.base_url}/rules0.tar.gz"
+    extract_path = str(tmp_path / 'fapp_rules')
+    state_path = str(tmp_path / 'feed_state.json')
+
+    assert fetch_signatures(url, extract_path, state_path) is True
+    state = load_feed_state(state_path)
+    state[url]['etag'] = None
+    save_feed_state(state, state_path)
+
+    assert fetch_signatures(url, extract_path, state_path) is False
+    assert 'If-None-Match' not in feed_server.requests_seen[-1][1]
+
+def test_switching_feeds_replaces_rules(tmp_path, feed_server):
+    feed_server.feeds['/p.tar.gz'] = make_tarball([('prod.rules', b'alert p\n')])
+    feed_server.feeds['/h.tar.gz'] = make_tarball([('homol.rules', b'alert h\n')])
+    extract_path = str(tmp_path / 'fapp_rules')
+    state_path = str(tmp_path / 'feed_state.json')
+
+    for name in ('p', 'h', 'p'):
+        assert fetch_signatures(f"{feed_server.base_url}/{name}.tar.gz", extract_path, state_path) is True
+    assert sorted(os.listdir(extract_path)) == [EXTRACTED_MARKER_NAME, 'prod.rules']
+
+def test_traversal_members_are_rejected(tmp_path):
+    dest = tmp_path / 'dest'
+    dest.mkdir()
+    tarball = make_tarball([
+        ('../escape.rules', b'x'),
+        ('sub/../../escape2.rules', b'x'),
+        (str(tmp_path / 'absolute.rules'), b'x'),
+        ('ok.rules', b'x'),
+    ])
+
+    extracted = extract_rules_stream(io.BytesIO(tarball), str(dest))
+
+    assert extracted == ['ok.rules']
+    assert not (tmp_path / 'escape.rules').exists()
+    assert not (tmp_path / 'escape2.rules').exists()
+    assert not (tmp_path / 'absolute.rules').exists()
+
+def test_safe_member_path(tmp_path):
+    assert _safe_member_path('../x.rules', str(tmp_path)) is None
+    assert _safe_member_path('/etc/x.rules', str(tmp_path)) is None
+    assert _safe_member_path('a/b.rules', str(tmp_path)) == os.path.join(os.path.realpath(tmp_path), 'a', 'b.rules')
+
+def test_only_rules_members_are_extracted(tmp_path):
+    dest = tmp_path / 'dest'
+    tarball = make_tarball([('README', b'x'), ('rules.tar', b'x'), ('a.rules', b'alert a\n'), ('sub/x.rules', b'alert x\n')])
+
+    extracted = extract_rules_stream(io.BytesIO(tarball), str(dest))
+
+    assert sorted(extracted) == ['a.rules', os.path.join('sub', 'x.rules')]
+    assert (dest / 'sub' / 'x.rules').read_bytes() == b'alert x\n'
+    assert not (dest / 'README').exists()
+    assert not (dest / 'rules.tar').exists()
+
+def test_nested_rules_are_extracted_by_fetch(tmp_path, feed_server):
+    feed_server.feeds['/rules0.tar.gz'] = make_tarball([('sub/x.rules', b'alert x\n'), ('notes.txt', b'x')])
+    extract_path = tmp_path / 'fapp_rules'
+
+    assert fetch_signatures(f"{feed_server.base_url}/rules0.tar.gz", str(extract_path), str(tmp_path / 'feed_state.json')) is True
+    assert (extract_path / 'sub' / 'x.rules').read_bytes() == b'alert x\n'
+    assert not (extract_path / 'notes.txt').exists()
@@ -0,0 +1,91 @@
+import pytest
+
+from tiered_checker import CheckResult
+from work_queue import WorkQueue, shard_for, STATE_DONE, STATE_LEASED, STATE_PENDING, ABANDONED_STATUS, ABANDONED_DESCRIPTION
+
+NOW = 1_000_000.0
+
+@pytest.fixture
+def queue(tmp_path):
+    with WorkQueue(str(tmp_path / 'work_queue.sqlite3'), max_attempts=2) as work_queue:
+        work_queue.reset(2)
+        yield work_queue
+
+# Primeira URL de cada partição entre hosts sintéticos
+def urls_by_shard(num_shards=2, per_shard=2):
+    found = {shard: [] for shard in range(num_shards)}
+    index = 0
+    while any(len(urls) < per_shard for urls in found.values()):
+        url = f"https://host{index}.example/"
+        urls = found[shard_for(url, num_shards)]
+        if len(urls) < per_shard:
+            urls.append(url)
+        index += 1
+    return found
+
+def test_shard_for_keeps_host_together():
+    assert shard_for('https://a.example/x', 8) == shard_for('https://A.example/y?z=1', 8)
+
+def test_own_shard_first(queue):
+    by_shard = urls_by_shard()
+    queue.add_pending([(url, {}, False) for urls in by_shard.values() for url in urls])
+
+    first = queue.lease('w1', shard=1, count=2, now=NOW)
+    assert sorted(item.url for item in first) == sorted(by_shard[1])
+
+    # Sem URLs da própria partição, o worker pega as das demais
+    second = queue.lease('w1', shard=1, count=5, now=NOW)
+    assert sorted(item.url for item in second) == sorted(by_shard[0])
+    assert queue.lease('w2', shard=0, count=5, now=NOW) == []
+
+def test_expired_lease_is_redelivered(queue):
+    queue.add_pending([('https://a.example/', {'1': '1'}, True)])
+
+    leased = queue.lease('w1', shard=0, lease_seconds=60, now=NOW)
+    assert [(item.url, item.attempts, item.rules, item.browser) for item in leased] == [('https://a.example/', 1, {'1': '1'}, True)]
+
+    # Dentro do prazo, ninguém mais recebe a URL
+    assert queue.lease('w2', shard=0, lease_seconds=60, now=NOW + 59) == []
+
+    redelivered = queue.lease('w2', shard=0, lease_seconds=60, now=NOW + 61)
+    assert [(item.url, item.attempts) for item in redelivered] == [('https://a.example/', 2)]
+
+def test_renew_extends_lease(queue):
+    queue.add_pending([('https://a.example/', {}, False)])
+    queue.lease('w1', shard=0, lease_seconds=60, now=NOW)
+
+    assert queue.renew('w1', lease_seconds=60, now=NOW + 50) == 1
+    assert queue.renew('w2', lease_seconds=60, now=NOW + 50) == 0
+    assert queue.lease('w2', shard=0, lease_seconds=60, now=NOW + 100) == []
+    assert len(queue.lease('w2', shard=0, lease_seconds=60, now=NOW + 111)) == 1
+
+def test_abandoned_after_max_attempts(queue):
+    queue.add_pending([('https://a.example/', {}, False)])
+    queue.lease('w1', shard=0, lease_seconds=60, now=NOW)
+    queue.lease('w2', shard=0, lease_seconds=60, now=NOW + 61)
+
+    # A segunda concessão expirou com max_attempts=2: a URL é concluída com erro, sem nova entrega
+    assert queue.lease('w3', shard=0, lease_seconds=60, now=NOW + 122) == []
+    assert queue.unfinished() == 0
+    (item,) = queue.results()
+    assert item.state == STATE_DONE
+    assert (item.status_code, item.description, item.checked_by) == (ABANDONED_STATUS, ABANDONED_DESCRIPTION, 'w2')
+
+def test_complete_keeps_first_result(queue):
+    queue.add_pending([('https://a.example/', {}, False)])
+    queue.lease('w1', shard=0, lease_seconds=60, now=NOW)
+    queue.lease('w2', shard=0, lease_seconds=60, now=NOW + 61)
+
+    queue.complete('w2', {'https://a.example/': CheckResult(200, "Sucesso")}, now=NOW + 70)
+    queue.complete('w1', {'https://a.example/': CheckResult(403, "Proibido")}, now=NOW + 80)
+
+    (item,) = queue.results()
+    assert (item.status_code, item.description, item.checked_by, item.checked_at) == (200, "Sucesso", 'w2', NOW + 70)
+
+def test_done_entries_are_not_leased(queue):
+    queue.add_done([('https://cached.example/', {}, False, 200, "Sucesso", 'http', NOW - 10)])
+    queue.add_pending([('https://a.example/', {}, False)])
+
+    assert [item.url for item in queue.lease('w1', shard=0, count=10, now=NOW)] == ['https://a.example/']
+    assert queue.counts() == {STATE_DONE: 1, STATE_LEASED: 1}
+    assert STATE_PENDING not in queue.counts()
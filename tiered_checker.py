@@ -0,0 +1,206 @@
+import logging
+import re
+import time
+
+import requests
+
+from concurrent_checker import url_host
+from host_guard import get_host_guard, CircuitOpenError, CIRCUIT_OPEN_STATUS
+from run_metrics import record_backend, record_error, BACKEND_SELENIUM
+
+# Camadas de verificação que podem produzir o veredito de uma URL
+TIER_DNS = 'dns'          # Host sem resolução de DNS, sem requisição HTTP
+TIER_HTTP = 'http'        # Sondagem HTTP com amostra limitada da resposta
+TIER_BROWSER = 'browser'  # Navegador real (Selenium), apenas para URLs escaladas
+
+# Configurações padrão da verificação em camadas
+DEFAULT_SAMPLE_BYTES = 32 * 1024   # Trecho do corpo inspecionado na camada HTTP
+DEFAULT_CHALLENGE_WAIT = 8         # Tempo máximo (s) esperando o navegador superar um desafio JavaScript
+SMALL_PAGE_BYTES = 2048            # Páginas menores que isso podem ser só um redirecionamento via JavaScript
+
+# Status que CDNs e proteções anti-bot costumam devolver para clientes que não são navegadores
+BOT_WALL_STATUS = {403, 429, 503}
+
+# Cabeçalhos e valores de Server que identificam CDNs / proteções anti-bot
+CDN_HEADERS = {
+    'cf-ray': 'Cloudflare',
+    'cf-mitigated': 'Cloudflare',
+    'x-amz-cf-id': 'CloudFront',
+    'akamai-grn': 'Akamai',
+    'x-akamai-transformed': 'Akamai',
+    'x-iinfo': 'Imperva',
+    'x-sucuri-id': 'Sucuri',
+    'x-datadome': 'DataDome',
+    'x-ddos-protection': 'DDoS-Guard',
+}
+CDN_SERVERS = {
+    'cloudflare': 'Cloudflare',
+    'cloudfront': 'CloudFront',
+    'akamaighost': 'Akamai',
+    'ddos-guard': 'DDoS-Guard',
+    'sucuri': 'Sucuri',
+}
+# Origens S3/ELB (Server: AmazonS3, awselb) não são CDN: o 403/503 delas é o status real da URL.
+# A CloudFront é reconhecida pelo x-amz-cf-id ou pelo Via (ex.: "1.1 abc.cloudfront.net (CloudFront)").
+
+# Lojas da Amazon respondem 503 com "Server: Server" na página de bloqueio de robôs
+amazon_store_pattern = re.compile(r'(^|\.)amazon\.(com|[a-z]{2}|co\.[a-z]{2}|com\.[a-z]{2})$')
+
+# Trechos (em minúsculas) de páginas de desafio JavaScript ou bloqueio de robôs
+CHALLENGE_MARKERS = (
+    'cf-browser-verification',
+    'cf_chl_opt',
+    '/cdn-cgi/challenge-platform/',
+    'just a moment...',
+    'checking your browser',
+    'attention required! | cloudflare',
+    'enable javascript and cookies to continue',
+    'ddos-guard',
+    '_incapsula_resource',
+    'px-captcha',
+    'captcha-delivery.com',
+    'automated access to amazon data',
+    'sgcaptcha',
+)
+
+# Trechos de páginas pequenas que só redirecionam via JavaScript ou meta refresh
+JS_REDIRECT_MARKERS = ('window.location', 'location.href', 'location.replace', 'http-equiv="refresh"')
+
+title_pattern = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+
+# Resultado de uma verificação: código, descrição e a camada que deu o veredito final.
+# reason explica por que a URL foi escalada para o navegador (None se não foi).
+class CheckResult:
+    __slots__ = ('status_code', 'description', 'tier', 'reason', 'title', 'final_url')
+
+    def __init__(self, status_code, description, tier=TIER_HTTP, reason=None, title=None, final_url=None):
+        self.status_code = status_code
+        self.description = description
+        self.tier = tier
+        self.reason = reason
+        self.title = title
+        self.final_url = final_url
+
+    def __repr__(self):
+        return f"CheckResult({self.status_code!r}, {self.description!r}, tier={self.tier!r})"
+
+# Converte o retorno de uma função de verificação (CheckResult ou tupla código, descrição) em CheckResult
+def as_check_result(result, tier=TIER_HTTP):
+    if isinstance(result, CheckResult):
+        return result
+    status_code, description = result
+    return CheckResult(status_code, description, tier)
+
+# Extrai o <title> de uma amostra de HTML
+def extract_title(text):
+    match = title_pattern.search(text)
+    if match is None:
+        return None
+    return ' '.join(match.group(1).split()) or None
+
+# Retorna o primeiro marcador de desafio/bloqueio encontrado no texto, ou None
+def find_challenge_marker(text):
+    text = text.lower()
+    for marker in CHALLENGE_MARKERS:
+        if marker in text:
+            return marker
+    return None
+
+# Retorna o nome da CDN / proteção anti-bot identificada pelos cabeçalhos, ou None
+def detect_cdn(headers):
+    for header, cdn in CDN_HEADERS.items():
+        if header in headers:
+            return cdn
+    if 'cloudfront' in headers.get('Via', '').lower():
+        return 'CloudFront'
+    return CDN_SERVERS.get(headers.get('Server', '').strip().lower())
+
+# Função para decidir, a partir da sondagem HTTP, se a URL precisa de um navegador real.
+# Retorna o motivo da escalada ou None.
+def escalation_reason(probe):
+    text = probe.text
+    marker = find_challenge_marker(text)
+    if marker is not None:
+        return f"desafio anti-bot na página ({marker})"
+
+    cdn = detect_cdn(probe.headers)
+    if probe.status_code in BOT_WALL_STATUS and cdn is not None:
+        return f"{probe.status_code} da CDN {cdn}"
+    if probe.status_code == 503 and amazon_store_pattern.search(url_host(probe.url)):
+        return "503 da Amazon"
+
+    if probe.status_code == 200 and len(probe.body) < SMALL_PAGE_BYTES:
+        lowered = text.lower()
+        if any(marker in lowered for marker in JS_REDIRECT_MARKERS):
+            return "redirecionamento via JavaScript"
+    return None
+
+# Função para obter o veredito do navegador: carrega a página e, enquanto ela ainda for uma página
+# de desafio, espera até challenge_wait segundos para o desafio JavaScript ser superado.
+# Retorna (código, descrição); erros de carregamento do driver são propagados.
+def browser_verdict(url, driver, challenge_wait=DEFAULT_CHALLENGE_WAIT, poll_interval=0.5, sample_bytes=DEFAULT_SAMPLE_BYTES):
+    driver.get(url)
+    deadline = time.monotonic() + challenge_wait
+    while True:
+        if driver.current_url.startswith('chrome-error://'):
+            return "Erro", "O navegador não conseguiu carregar a página"
+        marker = find_challenge_marker(f"{driver.title}\n{driver.page_source[:sample_bytes]}")
+        if marker is None:
+            return 200, "Sucesso"
+        if time.monotonic() >= deadline:
+            return "Bloqueado", f"Página de desafio anti-bot não superada pelo navegador ({marker})"
+        time.sleep(poll_interval)
+
+# Verificador em camadas: toda URL passa pela sondagem HTTP (barata) com inspeção de uma amostra
+# limitada da resposta; apenas as que parecem exigir um navegador real (desafio JavaScript,
+# bloqueio de CDN, redirecionamento via JavaScript) são escaladas para um driver do pool do Selenium.
+class TieredChecker:
+    def __init__(self, status_descriptions, selenium_pool=None, host_guard=None, sample_bytes=DEFAULT_SAMPLE_BYTES, challenge_wait=DEFAULT_CHALLENGE_WAIT):
+        self.status_descriptions = status_descriptions
+        self.selenium_pool = selenium_pool
+        self.host_guard = host_guard  # Sem ele, usa a proteção compartilhada (timeouts adaptativos e circuit breaker)
+        self.sample_bytes = sample_bytes
+        self.challenge_wait = challenge_wait
+
+    def __call__(self, url):
+        return self.check(url)
+
+    # Primeira camada: sondagem HTTP. Retorna (CheckResult, motivo da escalada ou None)
+    def check_http(self, url):
+        try:
+            probe = (self.host_guard or get_host_guard()).probe(url, sample_bytes=self.sample_bytes)
+        except CircuitOpenError as e:
+            record_error(e)
+            return CheckResult(CIRCUIT_OPEN_STATUS, str(e), TIER_HTTP), None
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Erro ao acessar URL: {url}, Erro: {e}")
+            record_error(e)
+            return CheckResult("Erro", str(e), TIER_HTTP), None
+
+        description = self.status_descriptions.get(probe.status_code, "Erro desconhecido")
+        result = CheckResult(probe.status_code, description, TIER_HTTP, title=extract_title(probe.text), final_url=probe.url)
+        return result, escalation_reason(probe)
+
+    # Segunda camada: navegador real do pool do Selenium
+    def check_browser(self, url, reason):
+        record_backend(BACKEND_SELENIUM)
+        try:
+            with self.selenium_pool.driver() as driver:
+                status_code, description = browser_verdict(url, driver, self.challenge_wait, sample_bytes=self.sample_bytes)
+                title = driver.title or None
+                final_url = driver.current_url
+        except Exception as e:
+            record_error(e)
+            return CheckResult("Erro", str(e), TIER_BROWSER, reason)
+        return CheckResult(status_code, description, TIER_BROWSER, reason, title, final_url)
+
+    def check(self, url):
+        result, reason = self.check_http(url)
+        if reason is None:
+            return result
+        if self.selenium_pool is None:
+            logging.info(f"{url} precisaria do navegador ({reason}), mas não há pool do Selenium; mantido o veredito HTTP.")
+            result.reason = reason
+            return result
+        logging.info(f"Escalando {url} para o navegador: {reason} (HTTP {result.status_code}).")
+        return self.check_browser(url, reason)
@@ -0,0 +1,151 @@
+import logging
+
+from rule_parser import iter_rules
+
+# Referência a uma regra que aponta para uma URL
+class RuleRef:
+    __slots__ = ('sid', 'gid', 'rev', 'url', 'path', 'position')
+
+    def __init__(self, sid, gid, rev, url, path, position=None):
+        self.sid = sid
+        self.gid = gid
+        self.rev = rev
+        self.url = url
+        self.path = path
+        self.position = position  # Índice da referência no arquivo, na ordem das regras
+
+    # Chave gid:sid da regra, a mesma usada no manifesto do ruleset
+    @property
+    def key(self):
+        return f"{self.gid}:{self.sid}"
+
+# Índice em memória URL -> regras (SIDs) que a referenciam, montado a partir de vários arquivos .rules.
+# Permite verificar cada URL uma única vez e gravar o resultado para todos os SIDs.
+class UrlIndex:
+    def __init__(self):
+        self._rules_by_url = {}   # URL -> [RuleRef], na ordem em que aparecem
+        self._rules_by_file = {}  # arquivo -> [RuleRef], na ordem das regras
+
+    # Indexa as regras com reference:url de um arquivo .rules, usando o parser em streaming
+    def add_file(self, path):
+        file_rules = self._rules_by_file.setdefault(path, [])
+        for rule in iter_rules(path):
+            for url in rule.urls:
+                ref = RuleRef(str(rule.sid), rule.gid, None if rule.rev is None else str(rule.rev), url, path, len(file_rules))
+                file_rules.append(ref)
+                self._rules_by_url.setdefault(url, []).append(ref)
+
+    def __len__(self):
+        return len(self._rules_by_url)
+
+    def __contains__(self, url):
+        return url in self._rules_by_url
+
+    # URLs únicas, na ordem em que aparecem
+    def urls(self):
+        return list(self._rules_by_url)
+
+    # Regras de todos os arquivos que referenciam a URL
+    def rules_for_url(self, url):
+        return self._rules_by_url.get(url, [])
+
+    # Arquivos já indexados
+    def indexed_files(self):
+        return self._rules_by_file.keys()
+
+    # Regras de um arquivo, na ordem do arquivo
+    def rules_for_file(self, path):
+        return self._rules_by_file.get(path, [])
+
+    # Dicionário SID -> rev de todas as regras que referenciam a URL
+    def sid_revs(self, url):
+        return {ref.sid: ref.rev for ref in self.rules_for_url(url)}
+
+# Função para montar o índice URL -> SIDs de uma lista de arquivos .rules
+def build_url_index(rules_paths):
+    url_index = UrlIndex()
+    for path in rules_paths:
+        url_index.add_file(path)
+    return url_index
+
+# Origens de uma URL na fila de trabalho
+SOURCE_HOMOLOGATED = 'homologated'  # Regras em rules/ (homologadas)
+SOURCE_NAVIGATE = 'navigate'        # Regras em rules_navigate/ (teste de falso positivo)
+SOURCE_CUSTOM = 'custom'            # URLs de custom_urls_navigate.txt
+
+# Item da fila de trabalho: uma URL única, as origens que a referenciam e o dicionário SID -> rev
+class WorkItem:
+    __slots__ = ('url', 'sources', 'rules')
+
+    def __init__(self, url):
+        self.url = url
+        self.sources = set()
+        self.rules = {}
+
+# Plano de trabalho de uma execução: o índice URL -> SIDs de todos os arquivos, a origem de cada
+# arquivo e a fila deduplicada de URLs, já sem as URLs de exceção.
+class WorkPlan:
+    def __init__(self, except_urls=frozenset()):
+        self.url_index = UrlIndex()
+        self.except_urls = except_urls
+        self.items = {}         # URL -> WorkItem, na ordem em que aparecem
+        self._file_sources = {}  # arquivo -> origem
+
+    def _item(self, url, source):
+        item = self.items.get(url)
+        if item is None:
+            item = self.items[url] = WorkItem(url)
+        item.sources.add(source)
+        return item
+
+    # Adiciona as regras de um arquivo .rules com a origem informada
+    def add_rules_file(self, path, source):
+        self._file_sources[path] = source
+        self.url_index.add_file(path)
+        for ref in self.url_index.rules_for_file(path):
+            if ref.url in self.except_urls:
+                logging.info(f"URL ignorada por estar na lista de exceções (except_urls): {ref.url} (SID: {ref.sid})")
+                continue
+            self._item(ref.url, source).rules[ref.sid] = ref.rev
+
+    # Adiciona URLs avulsas (sem regra), como as de custom_urls_navigate.txt
+    def add_urls(self, urls, source):
+        for url in urls:
+            if url in self.except_urls:
+                logging.info(f"URL personalizada ignorada por estar na lista de exceções (except_urls): {url}")
+                continue
+            self._item(url, source)
+
+    def __len__(self):
+        return len(self.items)
+
+    # Origem de um arquivo de regras (None se o arquivo não faz parte do plano)
+    def source_for_file(self, path):
+        return self._file_sources.get(path)
+
+    # Arquivos de uma origem, na ordem em que foram adicionados
+    def files_for(self, source):
+        return [path for path, file_source in self._file_sources.items() if file_source == source]
+
+    # Regras de um arquivo, na ordem do arquivo, sem as URLs de exceção
+    def rules_for_file(self, path):
+        return [ref for ref in self.url_index.rules_for_file(path) if ref.url not in self.except_urls]
+
+    # Itens que têm ao menos uma das origens informadas
+    def items_for(self, *sources):
+        return [item for item in self.items.values() if item.sources.intersection(sources)]
+
+    # Indica se a URL tem alguma regra entre as chaves gid:sid informadas
+    def touches_rules(self, url, rule_keys):
+        return any(ref.key in rule_keys for ref in self.url_index.rules_for_url(url))
+
+# Função para montar o plano de trabalho em uma única etapa: lê cada arquivo de regras uma vez e
+# monta a fila deduplicada de URLs, marcada pela origem (homologated, navigate, custom).
+def build_work_plan(rules_paths=(), navigate_paths=(), custom_urls=(), except_urls=frozenset()):
+    plan = WorkPlan(except_urls)
+    for path in rules_paths:
+        plan.add_rules_file(path, SOURCE_HOMOLOGATED)
+    for path in navigate_paths:
+        plan.add_rules_file(path, SOURCE_NAVIGATE)
+    plan.add_urls(custom_urls, SOURCE_CUSTOM)
+    return plan
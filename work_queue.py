@@ -0,0 +1,220 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from concurrent_checker import url_host
+
+# Configurações padrão da fila de trabalho das execuções particionadas
+DEFAULT_QUEUE_PATH = 'work_queue.sqlite3'
+DEFAULT_LEASE_SECONDS = 300   # Tempo que um worker pode ficar com um lote sem renovar a concessão
+DEFAULT_LEASE_BATCH = 50      # URLs concedidas a um worker de cada vez
+DEFAULT_MAX_ATTEMPTS = 3      # Concessões expiradas antes de desistir da URL
+
+# Estados de uma URL na fila
+STATE_PENDING = 'pending'
+STATE_LEASED = 'leased'
+STATE_DONE = 'done'
+
+# Resultado registrado para URLs cujas concessões expiraram max_attempts vezes (worker travado ou morto)
+ABANDONED_STATUS = "Erro"
+ABANDONED_DESCRIPTION = "Verificação interrompida: a concessão expirou em todas as tentativas"
+
+# Quem produziu o resultado de URLs que já entram concluídas na fila (resultado válido em cache)
+CHECKED_BY_CACHE = 'cache'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    url TEXT PRIMARY KEY,
+    shard INTEGER NOT NULL,
+    rules TEXT NOT NULL DEFAULT '{}',
+    browser INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status,
+    description TEXT,
+    tier TEXT,
+    checked_at REAL,
+    checked_by TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_items_state ON items(state);
+'''
+
+_COLUMNS = 'url, shard, rules, browser, state, attempts, status, description, tier, checked_at, checked_by'
+
+# Função para escolher a partição de uma URL pelo hash do host: todas as URLs de um host ficam na
+# mesma partição, para o limite de conexões por host continuar valendo dentro de cada worker
+def shard_for(url, num_shards):
+    digest = hashlib.sha1(url_host(url).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % num_shards
+
+# URL da fila com o resultado, quando já concluída
+class QueueItem:
+    __slots__ = ('url', 'shard', 'rules', 'browser', 'state', 'attempts', 'status_code', 'description', 'tier', 'checked_at', 'checked_by')
+
+    def __init__(self, url, shard, rules, browser, state, attempts=0, status_code=None, description=None, tier=None, checked_at=None, checked_by=None):
+        self.url = url
+        self.shard = shard
+        self.rules = rules      # Dicionário SID -> rev das regras que referenciam a URL
+        self.browser = browser  # Se a URL pode usar o Selenium e a captura de tela (homologadas e personalizadas)
+        self.state = state
+        self.attempts = attempts
+        self.status_code = status_code
+        self.description = description
+        self.tier = tier
+        self.checked_at = checked_at
+        self.checked_by = checked_by
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row[0], row[1], json.loads(row[2]), bool(row[3]), *row[4:])
+
+# Fila de trabalho em SQLite compartilhada pelos workers de uma execução particionada, na mesma máquina
+# ou em várias máquinas com o arquivo em um diretório compartilhado. Cada worker recebe lotes por
+# concessão (lease) com prazo: se o worker morrer, a concessão expira e as URLs voltam a ser entregues
+# a outro worker. Os workers dão preferência à própria partição e, quando ela acaba, pegam URLs das demais.
+class WorkQueue:
+    def __init__(self, path=DEFAULT_QUEUE_PATH, max_attempts=DEFAULT_MAX_ATTEMPTS, timeout=60):
+        self.path = path
+        self.max_attempts = max_attempts
+        # Transações explícitas (BEGIN IMMEDIATE) para que duas concessões nunca entreguem a mesma URL
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+    # Esvazia a fila para uma nova execução com num_shards partições e as opções dos workers
+    def reset(self, num_shards, options=None):
+        with self._transaction():
+            self._conn.execute('DELETE FROM items')
+            self._conn.execute('DELETE FROM meta')
+            self._conn.executemany('INSERT INTO meta (key, value) VALUES (?, ?)', [
+                ('num_shards', json.dumps(num_shards)),
+                ('options', json.dumps(options or {}, sort_keys=True)),
+                ('created_at', json.dumps(time.time())),
+            ])
+
+    def _meta(self, key, default=None):
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    @property
+    def num_shards(self):
+        return self._meta('num_shards', 1)
+
+    # Opções da execução gravadas pelo coordenador (use_selenium, real_mode etc.), lidas pelos workers
+    @property
+    def options(self):
+        return self._meta('options', {})
+
+    # Adiciona URLs pendentes. Cada entrada é (url, rules, browser)
+    def add_pending(self, entries):
+        num_shards = self.num_shards
+        with self._transaction():
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO items (url, shard, rules, browser, state) VALUES (?, ?, ?, ?, ?)',
+                ((url, shard_for(url, num_shards), json.dumps(rules or {}, sort_keys=True), int(browser), STATE_PENDING)
+                 for url, rules, browser in entries),
+            )
+
+    # Adiciona URLs já concluídas (ex.: resultado válido em cache). Cada entrada é
+    # (url, rules, browser, código, descrição, tier, checked_at)
+    def add_done(self, entries, checked_by=CHECKED_BY_CACHE):
+        num_shards = self.num_shards
+        with self._transaction():
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO items (url, shard, rules, browser, state, status, description, tier, checked_at, checked_by) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                ((url, shard_for(url, num_shards), json.dumps(rules or {}, sort_keys=True), int(browser), STATE_DONE,
+                  status_code, description, tier, checked_at, checked_by)
+                 for url, rules, browser, status_code, description, tier, checked_at in entries),
+            )
+
+    # Concede até count URLs ao worker owner: pendentes ou com concessão expirada, primeiro as da
+    # partição shard. URLs que já esgotaram max_attempts concessões são concluídas com erro.
+    def lease(self, owner, shard, count=DEFAULT_LEASE_BATCH, lease_seconds=DEFAULT_LEASE_SECONDS, now=None):
+        now = now or time.time()
+        with self._transaction():
+            abandoned = self._conn.execute(
+                'UPDATE items SET state = ?, status = ?, description = ?, checked_at = ?, checked_by = lease_owner, lease_owner = NULL '
+                'WHERE state = ? AND lease_expires < ? AND attempts >= ?',
+                (STATE_DONE, ABANDONED_STATUS, ABANDONED_DESCRIPTION, now, STATE_LEASED, now, self.max_attempts),
+            ).rowcount
+            if abandoned:
+                logging.warning(f"{abandoned} URLs abandonadas após {self.max_attempts} concessões expiradas.")
+
+            rows = self._conn.execute(
+                f'SELECT {_COLUMNS} FROM items WHERE state = ? OR (state = ? AND lease_expires < ?) '
+                'ORDER BY shard != ?, url LIMIT ?',
+                (STATE_PENDING, STATE_LEASED, now, shard, count),
+            ).fetchall()
+            self._conn.executemany(
+                'UPDATE items SET state = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE url = ?',
+                ((STATE_LEASED, owner, now + lease_seconds, row[0]) for row in rows),
+            )
+        items = [QueueItem.from_row(row) for row in rows]
+        for item in items:
+            item.state = STATE_LEASED
+            item.attempts += 1
+        return items
+
+    # Renova o prazo de todas as concessões do worker (chamado periodicamente enquanto ele trabalha)
+    def renew(self, owner, lease_seconds=DEFAULT_LEASE_SECONDS, now=None):
+        now = now or time.time()
+        with self._transaction():
+            renewed = self._conn.execute(
+                'UPDATE items SET lease_expires = ? WHERE state = ? AND lease_owner = ?',
+                (now + lease_seconds, STATE_LEASED, owner),
+            ).rowcount
+        return renewed
+
+    # Conclui as URLs do worker com os resultados (dicionário URL -> CheckResult). Se outro worker já
+    # concluiu a URL (concessão expirada e entregue de novo), o primeiro resultado é mantido.
+    def complete(self, owner, results, now=None):
+        now = now or time.time()
+        with self._transaction():
+            self._conn.executemany(
+                'UPDATE items SET state = ?, status = ?, description = ?, tier = ?, checked_at = ?, checked_by = ?, lease_owner = NULL '
+                'WHERE url = ? AND state != ?',
+                ((STATE_DONE, result.status_code, result.description, result.tier, now, owner, url, STATE_DONE)
+                 for url, result in results.items()),
+            )
+
+    # Quantidade de URLs ainda não concluídas
+    def unfinished(self):
+        return self._conn.execute('SELECT COUNT(*) FROM items WHERE state != ?', (STATE_DONE,)).fetchone()[0]
+
+    # Quantidade de URLs por estado
+    def counts(self):
+        return dict(self._conn.execute('SELECT state, COUNT(*) FROM items GROUP BY state ORDER BY state').fetchall())
+
+    # Percorre as URLs concluídas, em ordem de URL
+    def results(self):
+        rows = self._conn.execute(f'SELECT {_COLUMNS} FROM items WHERE state = ? ORDER BY url', (STATE_DONE,)).fetchall()
+        for row in rows:
+            yield QueueItem.from_row(row)